@@ -1,62 +1,372 @@
 import sqlite3
 import os
+import json
+import queue
+import hashlib
+import threading
+import zlib
+import logging
 from pathlib import Path
 
+logger = logging.getLogger(__name__)
+
 db_path = Path(os.path.expanduser("~/.flint/chat_history.db"))
 
-def init_db():
-    if not db_path.parent.exists():
-        db_path.parent.mkdir(parents=True, exist_ok=True)
-    with sqlite3.connect(db_path) as conn:
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS sessions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+# Pending writes are committed together, up to this many per transaction
+WRITE_BATCH_SIZE = 256
+# Bumped by each one-time migration in HistoryStore._migrate
+SCHEMA_VERSION = 1
+
+
+class Attachment(str):
+    """
+    Prompt text (an attached file, a retrieved snippet) stored once in the
+    blob table and referenced by hash from every message that includes it.
+    """
+
+    @property
+    def hash(self):
+        return hashlib.sha256(self.encode("utf-8")).hexdigest()
+
+
+def _compress(text):
+    return zlib.compress(text.encode("utf-8"))
+
+
+class HistoryStore:
+    """
+    Chat history on one long-lived SQLite connection.
+
+    Inserts, renames and deletes are queued and committed in batches by a
+    background writer thread, so saving streamed messages never blocks the
+    UI thread on disk I/O. Reads wait for queued writes first, so they always
+    see everything written before them. Each write runs under its own
+    savepoint, so one that fails (say, a reply for a session deleted while it
+    streamed) is skipped without losing the rest of its batch; failures are
+    logged and passed to ``on_error``, which is called on the writer thread.
+
+    A message's ``content`` is what the chat shows. The prompt actually sent
+    to the model is kept as segments, with attachments deduplicated into a
+    content-addressed, compressed blob table; ``get_prompt`` rebuilds it.
+    ``message_blobs`` records which messages reference which blobs, so
+    deleting a session only has to check that session's blobs.
+    """
+
+    def __init__(self, path=db_path, on_error=None):
+        self.path = Path(path)
+        self.on_error = on_error
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        # Blobs are compressed inside the writer's transaction, off the caller's thread
+        self._conn.create_function("compress", 1, _compress, deterministic=True)
+        self._lock = threading.Lock()
+        self._init_db()
+
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(
+            target=self._write_loop, name="history-writer", daemon=True
+        )
+        self._writer.start()
+
+    def _init_db(self):
+        conn = self._conn
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-8000")
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    title TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id INTEGER,
+                    role TEXT,
+                    content TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (session_id) REFERENCES sessions(id) ON DELETE CASCADE
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS blobs (
+                    hash TEXT PRIMARY KEY,
+                    size INTEGER,
+                    content BLOB
+                )
+            """)
+            columns = {
+                row["name"] for row in conn.execute("PRAGMA table_info(messages)")
+            }
+            if "prompt" not in columns:
+                # JSON list of text segments and {"blob": hash} references
+                conn.execute("ALTER TABLE messages ADD COLUMN prompt TEXT")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_id, id)"
+            )
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS message_blobs (
+                    message_id INTEGER,
+                    hash TEXT,
+                    PRIMARY KEY (message_id, hash),
+                    FOREIGN KEY (message_id) REFERENCES messages(id) ON DELETE CASCADE
+                ) WITHOUT ROWID
+            """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_message_blobs_hash ON message_blobs (hash)"
+            )
+            self._migrate(conn)
+
+    def _migrate(self, conn):
+        """One-time upgrades of older databases; each runs once, tracked by user_version."""
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < 1:
+            # Older databases never enforced the cascade; drop what it should have removed
+            conn.execute(
+                "DELETE FROM messages WHERE session_id NOT IN (SELECT id FROM sessions)"
             )
-        """)
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS messages (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                session_id INTEGER,
-                role TEXT,
-                content TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (session_id) REFERENCES sessions(id) ON DELETE CASCADE
+            conn.execute(
+                "INSERT OR IGNORE INTO message_blobs (message_id, hash) "
+                "SELECT messages.id, json_extract(segment.value, '$.blob') "
+                "FROM messages, json_each(messages.prompt) AS segment "
+                "WHERE messages.prompt IS NOT NULL AND segment.type = 'object'"
             )
-        """)
-
-def create_session(title="New Chat"):
-    with sqlite3.connect(db_path) as conn:
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO sessions (title) VALUES (?)", (title,))
-        return cursor.lastrowid
-
-def add_message(session_id, role, content):
-    with sqlite3.connect(db_path) as conn:
-        conn.execute(
-            "INSERT INTO messages (session_id, role, content) VALUES (?, ?, ?)",
-            (session_id, role, content)
+        if version < SCHEMA_VERSION:
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < WRITE_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            writes = [item for item in batch if item is not None]
+            try:
+                if writes:
+                    self._commit(writes)
+            except sqlite3.Error as e:
+                self._report(f"Error saving chat history: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if len(writes) < len(batch):
+                return
+
+    def _commit(self, writes):
+        """Run queued writes in one transaction, each under a savepoint of its own."""
+        failures = []
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            for write in writes:
+                self._conn.execute("SAVEPOINT write")
+                try:
+                    if callable(write):
+                        write(self._conn)
+                    else:
+                        self._conn.execute(*write)
+                except sqlite3.Error as e:
+                    # Undo just this write; the rest of the batch still commits
+                    self._conn.execute("ROLLBACK TO write")
+                    failures.append(e)
+                self._conn.execute("RELEASE write")
+        for e in failures:
+            self._report(f"Error saving chat history: {e}")
+
+    def _report(self, message):
+        logger.error(message)
+        if self.on_error is not None:
+            self.on_error(message)
+
+    def _enqueue(self, sql, params):
+        self._queue.put((sql, params))
+
+    def flush(self):
+        """Block until every queued write has been committed."""
+        self._queue.join()
+
+    def _query(self, sql, params=()):
+        self.flush()
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params).fetchall()]
+
+    def create_session(self, title="New Chat"):
+        # Written immediately: the caller needs the new id
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "INSERT INTO sessions (title) VALUES (?)", (title,)
+            ).lastrowid
+
+    def add_message(self, session_id, role, content, prompt=None):
+        """
+        Queue a message. ``prompt`` optionally lists the segments the model was
+        sent (joined, they are the exact prompt); ``Attachment`` segments are
+        stored in the blob table and only referenced from the message.
+        """
+        segments = None
+        attachments = {}
+        if prompt is not None:
+            segments = []
+            for part in prompt:
+                if isinstance(part, Attachment):
+                    attachments[part.hash] = part
+                    segments.append({"blob": part.hash})
+                elif segments and isinstance(segments[-1], str):
+                    segments[-1] += part
+                else:
+                    segments.append(str(part))
+            segments = json.dumps(segments)
+
+        def write(conn):
+            # One queued write, so a message that can't be saved leaves no blobs behind
+            message_id = conn.execute(
+                "INSERT INTO messages (session_id, role, content, prompt) VALUES (?, ?, ?, ?)",
+                (session_id, role, content, segments),
+            ).lastrowid
+            for digest, part in attachments.items():
+                conn.execute(
+                    "INSERT INTO blobs (hash, size, content) SELECT ?, ?, compress(?) "
+                    "WHERE NOT EXISTS (SELECT 1 FROM blobs WHERE hash = ?)",
+                    (digest, len(part), str(part), digest),
+                )
+                conn.execute(
+                    "INSERT OR IGNORE INTO message_blobs (message_id, hash) VALUES (?, ?)",
+                    (message_id, digest),
+                )
+
+        self._queue.put(write)
+
+    def rename_session(self, session_id, new_title):
+        self._enqueue(
+            "UPDATE sessions SET title = ? WHERE id = ?", (new_title, session_id)
+        )
+
+    def delete_session(self, session_id):
+        def write(conn):
+            hashes = [
+                row[0]
+                for row in conn.execute(
+                    "SELECT DISTINCT message_blobs.hash FROM messages "
+                    "JOIN message_blobs ON message_blobs.message_id = messages.id "
+                    "WHERE messages.session_id = ?",
+                    (session_id,),
+                )
+            ]
+            # Cascades to the session's messages and their message_blobs rows
+            conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            # Only this session's blobs can have lost their last reference
+            for i in range(0, len(hashes), 500):
+                batch = hashes[i : i + 500]
+                marks = ",".join("?" * len(batch))
+                conn.execute(
+                    f"DELETE FROM blobs WHERE hash IN ({marks}) AND NOT EXISTS "
+                    "(SELECT 1 FROM message_blobs WHERE message_blobs.hash = blobs.hash)",
+                    batch,
+                )
+
+        self._queue.put(write)
+
+    def get_sessions(self, limit=None, before_id=None):
+        """Sessions newest first; pass the last id seen as ``before_id`` for the next page."""
+        sql = "SELECT id, title, created_at FROM sessions"
+        params = []
+        if before_id is not None:
+            sql += " WHERE id < ?"
+            params.append(before_id)
+        sql += " ORDER BY id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self._query(sql, params)
+
+    def get_messages(self, session_id, limit=None, before_id=None):
+        """
+        Messages of a session in chronological order. With ``limit``, only the
+        most recent ones before ``before_id`` (keyset pagination: pass the
+        oldest id already loaded to fetch the previous page).
+        """
+        if limit is None and before_id is None:
+            return self._query(
+                "SELECT id, role, content FROM messages WHERE session_id = ? ORDER BY id ASC",
+                (session_id,),
+            )
+        # Walks the (session_id, id) index backwards: cost is O(limit), not O(session)
+        sql = "SELECT id, role, content FROM messages WHERE session_id = ?"
+        params = [session_id]
+        if before_id is not None:
+            sql += " AND id < ?"
+            params.append(before_id)
+        sql += " ORDER BY id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self._query(sql, params)[::-1]
+
+    def _load_blobs(self, hashes):
+        blobs = {}
+        hashes = list(hashes)
+        for i in range(0, len(hashes), 500):
+            batch = hashes[i : i + 500]
+            marks = ",".join("?" * len(batch))
+            for row in self._query(
+                f"SELECT hash, content FROM blobs WHERE hash IN ({marks})", batch
+            ):
+                blobs[row["hash"]] = zlib.decompress(row["content"]).decode("utf-8")
+        return blobs
+
+    def _rebuild(self, rows):
+        """Full prompt text of each message row (its content when no prompt was stored)."""
+        segments = [
+            json.loads(row["prompt"]) if row["prompt"] else None for row in rows
+        ]
+        blobs = self._load_blobs(
+            {
+                s["blob"]
+                for parts in segments
+                if parts
+                for s in parts
+                if isinstance(s, dict)
+            }
+        )
+        return [
+            (
+                row["content"]
+                if parts is None
+                else "".join(
+                    blobs[s["blob"]] if isinstance(s, dict) else s for s in parts
+                )
+            )
+            for row, parts in zip(rows, segments)
+        ]
+
+    def get_prompt(self, message_id):
+        """The exact prompt a message was sent with (its content when none was stored)."""
+        rows = self._query(
+            "SELECT content, prompt FROM messages WHERE id = ?", (message_id,)
+        )
+        return self._rebuild(rows)[0] if rows else None
+
+    def get_conversation(self, session_id):
+        """A session as chat messages (``role``/``content``), with user turns as the exact prompts sent."""
+        rows = self._query(
+            "SELECT role, content, prompt FROM messages WHERE session_id = ? ORDER BY id ASC",
+            (session_id,),
         )
+        return [
+            {"role": row["role"], "content": text}
+            for row, text in zip(rows, self._rebuild(rows))
+        ]
 
-def get_sessions():
-    with sqlite3.connect(db_path) as conn:
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, title, created_at FROM sessions ORDER BY id DESC")
-        return [dict(row) for row in cursor.fetchall()]
-
-def get_messages(session_id):
-    with sqlite3.connect(db_path) as conn:
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute("SELECT role, content FROM messages WHERE session_id = ? ORDER BY id ASC", (session_id,))
-        return [dict(row) for row in cursor.fetchall()]
-
-def rename_session(session_id, new_title):
-    with sqlite3.connect(db_path) as conn:
-        conn.execute("UPDATE sessions SET title = ? WHERE id = ?", (new_title, session_id))
-
-def delete_session(session_id):
-    with sqlite3.connect(db_path) as conn:
-        conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+    def close(self):
+        """Commit pending writes and close the connection."""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+        self._conn.close()
@@ -0,0 +1,126 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+# Inline styles that make pre/code blocks look good in Qt's rich text renderer
+_TAG_STYLES = {
+    "pre": "background-color: #0f172a; color: #e2e8f0; padding: 12px; border-radius: 8px; border: 1px solid #334155; overflow-x: auto; margin-top: 8px; margin-bottom: 8px;",
+    "code": "background-color: #0f172a; padding: 2px 6px; border-radius: 4px; font-family: Consolas, Monaco, monospace; font-size: 13px; color: #cbd5e1;",
+}
+_TAG_RE = re.compile(r"<(pre|code)>")
+_FENCES = ("```", "~~~")
+_LIST_ITEM_RE = re.compile(r" {0,3}([-*+]|\d+[.)])(\s|$)")
+# A line cut off mid-stream that may still turn out to be a list item
+_PARTIAL_ITEM_RE = re.compile(r"(\d+[.)]?|[-*+])$")
+
+
+def style_html(html):
+    """Inject the inline pre/code styles in a single pass over the HTML."""
+    return _TAG_RE.sub(
+        lambda m: f'<{m.group(1)} style="{_TAG_STYLES[m.group(1)]}">', html
+    )
+
+
+def _continues_block(line, in_list):
+    """
+    Whether ``line``, following a blank line, belongs to the block before it:
+    indented continuations do, and so do further items of a list (a loose
+    list). None while a partial line could still go either way.
+    """
+    if line[0] in " \t":
+        return True
+    if not in_list:
+        return False
+    if _LIST_ITEM_RE.match(line):
+        return True
+    if not line.endswith("\n") and _PARTIAL_ITEM_RE.match(line):
+        return None
+    return False
+
+
+def closed_prefix(text):
+    """
+    Length of the leading part of ``text`` made of finished markdown blocks.
+    A blank line only ends a block once the next line shows it doesn't go on:
+    loose lists, indented continuations and code fences stay in one block, so
+    streamed output renders the same as the whole message. Streaming renders
+    this part while the rest is still being generated.
+    """
+    end = 0
+    pos = 0
+    in_fence = False
+    in_list = False
+    # Where the block would end if the next line doesn't continue it
+    pending = None
+    for line in text.splitlines(keepends=True):
+        start, pos = pos, pos + len(line)
+        stripped = line.strip()
+        if pending is not None and stripped:
+            continues = _continues_block(line, in_list)
+            if continues is None:
+                break
+            if not continues:
+                end, in_list = pending, False
+            pending = None
+        if not line.endswith("\n"):
+            break
+        if in_fence:
+            if stripped.startswith(_FENCES):
+                in_fence = False
+                if not in_list and line[0] not in " \t":
+                    end = pos
+        elif stripped.startswith(_FENCES):
+            in_fence = True
+        elif not stripped:
+            pending = pos
+        elif _LIST_ITEM_RE.match(line):
+            in_list = True
+    return end
+
+
+class RenderCache:
+    """Thread-safe LRU of rendered HTML keyed by the hash of the markdown source."""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(text):
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+            return html
+
+    def put(self, key, html):
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+cache = RenderCache()
+
+
+def render_markdown(text):
+    """Markdown to styled HTML for the chat view, served from ``cache`` when possible."""
+    key = RenderCache.key(text)
+    html = cache.get(key)
+    if html is None:
+        import markdown
+
+        body = style_html(markdown.markdown(text, extensions=["fenced_code", "tables"]))
+        html = f"""
+        <div style="font-family: 'Inter', 'Roboto', 'Segoe UI', Arial, sans-serif; font-size: 14px; color: #f8fafc;">
+            {body}
+        </div>
+        """
+        cache.put(key, html)
+    return html
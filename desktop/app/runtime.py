@@ -0,0 +1,80 @@
+import asyncio
+import threading
+
+from flint.backends import get_backend, get_backend_names
+
+
+class AsyncRuntime:
+    """
+    One asyncio event loop on a background thread, shared by all async work
+    in the desktop app. Backends are created once per name and reused, so
+    their pooled HTTP connections stay open between messages.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._backends = {}
+        # name -> future of a shared object built once on the thread pool
+        self._shared = {}
+        self._thread = threading.Thread(
+            target=self._run, name="flint-async", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def backend(self, name):
+        """Cached backend instance for ``name``."""
+        if name not in self._backends:
+            self._backends[name] = get_backend(name)
+        return self._backends[name]
+
+    def backends(self):
+        return [self.backend(name) for name in get_backend_names()]
+
+    def shared(self, name, factory):
+        """
+        Awaitable of the object ``factory()`` builds, created once per ``name``
+        on the thread pool (use from coroutines). Callers that arrive while it
+        is still being built wait for the same instance; a failed build is
+        retried by the next caller.
+        """
+        future = self._shared.get(name)
+        if future is None or (future.done() and future.exception() is not None):
+            future = self._shared[name] = self.loop.run_in_executor(None, factory)
+        return asyncio.shield(future)
+
+    def submit(self, coro):
+        """Schedule a coroutine on the loop; the returned future can be cancelled from any thread."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run_blocking(self, func, *args):
+        """Awaitable running a blocking call on the loop's thread pool (use from coroutines)."""
+        return self.loop.run_in_executor(None, func, *args)
+
+    def shutdown(self, timeout=5.0):
+        """Close pooled backends and shared objects, then stop the loop."""
+        if not self.loop.is_running():
+            return
+
+        async def _close():
+            await asyncio.gather(
+                *(b.aclose() for b in self._backends.values()), return_exceptions=True
+            )
+            for future in self._shared.values():
+                if (
+                    future.done()
+                    and future.exception() is None
+                    and hasattr(future.result(), "close")
+                ):
+                    future.result().close()
+
+        try:
+            self.submit(_close()).result(timeout)
+        except Exception:
+            pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+        self.loop.close()
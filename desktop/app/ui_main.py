@@ -1,24 +1,48 @@
 import sys
 import asyncio
+from collections import deque
+from functools import partial
 from PySide6.QtWidgets import (
-    QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-    QComboBox, QTextEdit, QPushButton, QLabel, QSplitter,
-    QScrollArea, QFileDialog, QCheckBox, QListWidget, QListWidgetItem
+    QMainWindow,
+    QWidget,
+    QVBoxLayout,
+    QHBoxLayout,
+    QComboBox,
+    QTextEdit,
+    QPushButton,
+    QLabel,
+    QSplitter,
+    QScrollArea,
+    QFileDialog,
+    QCheckBox,
+    QListWidget,
+    QListWidgetItem,
 )
 
 try:
-    from memory.vector_store import VectorStore
+    from memory.vector_store import VectorStore, dependencies_available
 except ImportError:
     VectorStore = None
-from PySide6.QtCore import Qt
+    dependencies_available = None
+from PySide6.QtCore import Qt, QTimer, Signal
 from PySide6.QtGui import QFont, QTextCursor
 
-from flint.backends import get_all_backends
-from app.worker import GenerationWorker
-from app.history import init_db, create_session, get_sessions, get_messages, add_message
+from app.runtime import AsyncRuntime
+from app.worker import AsyncTask, ContextTask, GenerationTask, RenderWorker
+from app.history import Attachment, HistoryStore
+from app.render import closed_prefix
+
+# Streamed tokens are painted at most once per frame (~60 fps)
+RENDER_INTERVAL_MS = 16
+# History is loaded in pages: messages when scrolling up, sessions when scrolling the sidebar
+MESSAGE_PAGE_SIZE = 50
+SESSION_PAGE_SIZE = 100
 
 
 class MainWindow(QMainWindow):
+    # Emitted from the history writer thread when a message could not be saved
+    history_error = Signal(str)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Flint - Local AI Desktop")
@@ -125,28 +149,57 @@ class MainWindow(QMainWindow):
         self.splitter = QSplitter(Qt.Horizontal)
         self.main_layout.addWidget(self.splitter)
 
+        # Chat history database (one connection, writes batched in the background)
+        self.history_store = HistoryStore(on_error=self.history_error.emit)
+        # Event loop thread running generations, model listing and memory search
+        self.runtime = AsyncRuntime()
+        # Paging state for the open session (scroll handlers can fire during setup)
+        self.current_session_id = None
+        # Chat messages of the open session sent with each turn; None until loaded
+        self.conversation = []
+        self.has_older_messages = False
+        self.loading_older = False
+        self.streaming = False
+
         self._init_sidebar()
         self._init_chat_area()
 
         self.worker = None
-        self.current_session_id = None
-        
-        # Initialize Database
-        init_db()
+        self.answer_note = ""
+        self.context_task = None
+        self.warm_task = None
+
+        # Streamed chunks are buffered and painted together by a frame timer,
+        # so the per-frame UI cost does not depend on the model's token rate
+        self.current_ai_parts = []
+        self.pending_chunks = []
+        self.render_timer = QTimer(self)
+        self.render_timer.setInterval(RENDER_INTERVAL_MS)
+        self.render_timer.timeout.connect(self.flush_chunks)
+
+        # Markdown is converted to HTML on a background thread. Results tagged
+        # with an older epoch belong to a view that has since been replaced.
+        self.render_epoch = 0
+        self.stream_tail = ""
+        self.blocks_in_flight = deque()
+        self.renderer = RenderWorker(self)
+        self.renderer.rendered.connect(self.handle_rendered)
+        self.renderer.start()
 
         # Populate models on startup
         self.populate_models()
+        self.warm_memory()
 
     def _init_sidebar(self):
         self.sidebar_widget = QWidget()
         sidebar_layout = QVBoxLayout(self.sidebar_widget)
         sidebar_layout.setAlignment(Qt.AlignTop)
-        
+
         # Model Selection Label
         model_label = QLabel("Select Model")
         model_label.setFont(QFont("Arial", 12, QFont.Bold))
         sidebar_layout.addWidget(model_label)
-        
+
         # Model Dropdown
         self.model_combo = QComboBox()
         sidebar_layout.addWidget(self.model_combo)
@@ -155,7 +208,7 @@ class MainWindow(QMainWindow):
         self.refresh_btn = QPushButton("Refresh Models")
         self.refresh_btn.clicked.connect(self.populate_models)
         sidebar_layout.addWidget(self.refresh_btn)
-        
+
         # Separator
         sidebar_layout.addSpacing(20)
         history_label = QLabel("Chat History")
@@ -189,36 +242,43 @@ class MainWindow(QMainWindow):
             }
         """)
         self.history_list.itemClicked.connect(self.select_session)
+        self.history_list.verticalScrollBar().valueChanged.connect(
+            self.on_history_list_scrolled
+        )
         sidebar_layout.addWidget(self.history_list)
-        
+
         self.refresh_history_list()
 
         self.splitter.addWidget(self.sidebar_widget)
         self.sidebar_widget.setMinimumWidth(250)
         self.sidebar_widget.setMaximumWidth(350)
 
-
     def _init_chat_area(self):
         self.chat_widget = QWidget()
         self.chat_widget.setStyleSheet("background-color: #212121;")
         chat_layout = QVBoxLayout(self.chat_widget)
         chat_layout.setContentsMargins(0, 0, 0, 0)
         chat_layout.setSpacing(0)
-        
+
         # --- Chat History Area (Scrollable & Centered) ---
         self.chat_history_container = QWidget()
         history_layout = QVBoxLayout(self.chat_history_container)
         history_layout.setAlignment(Qt.AlignHCenter)
         history_layout.setContentsMargins(0, 20, 0, 0)
-        
+
         self.chat_history = QTextEdit()
         self.chat_history.setObjectName("ChatHistory")
         self.chat_history.setReadOnly(True)
         self.chat_history.setMaximumWidth(800)
+        self.chat_history.verticalScrollBar().valueChanged.connect(
+            self.on_chat_scrolled
+        )
         # Add welcome message
-        self.chat_history.append("<div style='text-align: center; margin-top: 40px;'><h2>Flint Desktop</h2><p style='color: #ececec;'>Welcome! Select a model and start chatting.</p></div>")
+        self.chat_history.append(
+            "<div style='text-align: center; margin-top: 40px;'><h2>Flint Desktop</h2><p style='color: #ececec;'>Welcome! Select a model and start chatting.</p></div>"
+        )
         history_layout.addWidget(self.chat_history, stretch=1)
-        
+
         chat_layout.addWidget(self.chat_history_container, stretch=1)
 
         # --- Input Area Container (Bottom & Centered) ---
@@ -232,10 +292,10 @@ class MainWindow(QMainWindow):
         self.input_wrapper.setMaximumWidth(800)
         input_wrapper_layout = QVBoxLayout(self.input_wrapper)
         input_wrapper_layout.setContentsMargins(0, 0, 0, 0)
-        
+
         # We store files attached for the current context
         self.attached_files = []
-        
+
         # Tools bar above input
         tools_layout = QHBoxLayout()
         self.attach_btn = QPushButton("📎 Attach")
@@ -254,20 +314,32 @@ class MainWindow(QMainWindow):
         """)
         self.attach_btn.clicked.connect(self.handle_attach)
         tools_layout.addWidget(self.attach_btn)
-        
+
         self.memory_checkbox = QCheckBox("🧠 Codebase Memory")
-        self.memory_checkbox.setStyleSheet("color: #ececec; font-size: 13px; margin-left: 10px; spacing: 5px;")
-        if VectorStore is None:
+        self.memory_checkbox.setStyleSheet(
+            "color: #ececec; font-size: 13px; margin-left: 10px; spacing: 5px;"
+        )
+        if VectorStore is None or not dependencies_available():
             self.memory_checkbox.setEnabled(False)
-            self.memory_checkbox.setToolTip("Install chromadb and tiktoken to enable memory.")
+            self.memory_checkbox.setToolTip(
+                "Install chromadb and tiktoken to enable memory."
+            )
         tools_layout.addWidget(self.memory_checkbox)
-        
+
         self.attached_files_label = QLabel()
         self.attached_files_label.setStyleSheet("font-size: 11px; color: #ececec;")
         tools_layout.addWidget(self.attached_files_label)
         tools_layout.addStretch()
+
+        # Progress of background work (loading memory, gathering context)
+        self.status_label = QLabel()
+        self.status_label.setStyleSheet(
+            "font-size: 11px; color: #8e8e8e; font-style: italic;"
+        )
+        tools_layout.addWidget(self.status_label)
+        self.history_error.connect(self.status_label.setText)
         input_wrapper_layout.addLayout(tools_layout)
-        
+
         # Input Text Box & Send Button Row
         input_layout = QHBoxLayout()
         self.input_box = QTextEdit()
@@ -295,18 +367,41 @@ class MainWindow(QMainWindow):
         """)
         self.send_btn.clicked.connect(self.handle_send)
         input_layout.addWidget(self.send_btn, alignment=Qt.AlignBottom)
-        
+
+        # Stop Button, shown in place of Send while a response streams
+        self.stop_btn = QPushButton("■")
+        self.stop_btn.setFixedSize(40, 40)
+        self.stop_btn.setToolTip("Stop generating")
+        self.stop_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #ececec;
+                color: #171717;
+                border-radius: 20px;
+                font-size: 14px;
+                margin-left: 10px;
+                margin-top: 20px;
+            }
+            QPushButton:hover {
+                background-color: #ffffff;
+            }
+        """)
+        self.stop_btn.clicked.connect(self.handle_stop)
+        self.stop_btn.hide()
+        input_layout.addWidget(self.stop_btn, alignment=Qt.AlignBottom)
+
         input_wrapper_layout.addLayout(input_layout)
-        
+
         # Disclaimer text
-        disclaimer = QLabel("Flint can make mistakes. Consider verifying important information.")
+        disclaimer = QLabel(
+            "Flint can make mistakes. Consider verifying important information."
+        )
         disclaimer.setStyleSheet("color: #676767; font-size: 11px; padding-top: 10px;")
         disclaimer.setAlignment(Qt.AlignCenter)
         input_wrapper_layout.addWidget(disclaimer)
 
         input_container_layout.addWidget(self.input_wrapper)
         chat_layout.addWidget(self.input_container_widget)
-        
+
         self.splitter.addWidget(self.chat_widget)
 
     def populate_models(self):
@@ -317,38 +412,18 @@ class MainWindow(QMainWindow):
         self.refresh_btn.setEnabled(False)
         self.send_btn.setEnabled(False)
 
-        # Use a QThread to fetch models so we don't block or break the async event loop
-        
-        # Define a single-use worker inline so we don't pollute the global scope
-        from PySide6.QtCore import QThread, Signal
-        
-        class ModelFetchWorker(QThread):
-            models_fetched = Signal(list)
-            error_occurred = Signal(str)
-
-            def run(self):
-                try:
-                    backends = get_all_backends()
-                    
-                    async def _fetch():
-                        tasks = [b.list_models() for b in backends]
-                        results = await asyncio.gather(*tasks, return_exceptions=True)
-                        all_models = []
-                        for res in results:
-                            if isinstance(res, list):
-                                all_models.extend(res)
-                        return all_models
-                        
-                    # Standard asyncio event loop safe inside a QThread run() method
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    models = loop.run_until_complete(_fetch())
-                    loop.close()
-                    
-                    self.models_fetched.emit(models)
-                except Exception as e:
-                    self.error_occurred.emit(str(e))
-                    
+        async def fetch_models():
+            # Concurrently fetch models from all (pooled) backends
+            backends = self.runtime.backends()
+            results = await asyncio.gather(
+                *(b.list_models() for b in backends), return_exceptions=True
+            )
+            all_models = []
+            for res in results:
+                if isinstance(res, list):
+                    all_models.extend(res)
+            return all_models
+
         def on_models_fetched(models):
             self.model_combo.clear()
             if not models:
@@ -364,8 +439,8 @@ class MainWindow(QMainWindow):
             print(f"Error fetching models: {err}")
             self._cleanup_fetcher()
 
-        self._fetch_worker = ModelFetchWorker(self)
-        self._fetch_worker.models_fetched.connect(on_models_fetched)
+        self._fetch_worker = AsyncTask(self.runtime, fetch_models, self)
+        self._fetch_worker.succeeded.connect(on_models_fetched)
         self._fetch_worker.error_occurred.connect(on_models_error)
         self._fetch_worker.start()
 
@@ -373,7 +448,7 @@ class MainWindow(QMainWindow):
         self.model_combo.setEnabled(True)
         self.refresh_btn.setEnabled(True)
         self.send_btn.setEnabled(True)
-        if hasattr(self, '_fetch_worker') and self._fetch_worker:
+        if hasattr(self, "_fetch_worker") and self._fetch_worker:
             self._fetch_worker.deleteLater()
             self._fetch_worker = None
 
@@ -385,6 +460,38 @@ class MainWindow(QMainWindow):
             filenames = [f.split("/")[-1] for f in self.attached_files]
             self.attached_files_label.setText("Attached: " + ", ".join(filenames))
 
+    def warm_memory(self):
+        """Open the shared VectorStore in the background so the first search does not wait for it."""
+        if not self.memory_checkbox.isEnabled():
+            return
+
+        def on_warm_error(err):
+            self.memory_checkbox.setToolTip(f"Codebase memory failed to load: {err}")
+
+        self.status_label.setText("Loading codebase memory...")
+        self.warm_task = AsyncTask(
+            self.runtime, lambda: self.runtime.shared("memory", VectorStore), self
+        )
+        self.warm_task.error_occurred.connect(on_warm_error)
+        self.warm_task.finished.connect(self.on_warm_finished)
+        self.warm_task.start()
+
+    def on_warm_finished(self):
+        if self.context_task is None:
+            self.status_label.setText("")
+        self.warm_task.deleteLater()
+        self.warm_task = None
+
+    def set_generating(self, active):
+        """Swap Send for Stop and lock the inputs while a message is being answered."""
+        self.send_btn.setVisible(not active)
+        self.send_btn.setEnabled(not active)
+        self.stop_btn.setVisible(active)
+        self.stop_btn.setEnabled(active)
+        self.attach_btn.setEnabled(not active)
+        if VectorStore is not None and dependencies_available():
+            self.memory_checkbox.setEnabled(not active)
+
     def handle_send(self):
         model_data = self.model_combo.currentData()
         prompt = self.input_box.toPlainText().strip()
@@ -394,67 +501,119 @@ class MainWindow(QMainWindow):
 
         # Disable inputs during generation
         self.input_box.clear()
-        self.send_btn.setEnabled(False)
-        self.attach_btn.setEnabled(False)
-        if hasattr(self, 'memory_checkbox'):
-            self.memory_checkbox.setEnabled(False)
-            
+        self.set_generating(True)
+
         # Ensure session exists
         if self.current_session_id is None:
             title = prompt[:30] + "..." if len(prompt) > 30 else prompt
-            self.current_session_id = create_session(title)
-            self.refresh_history_list()
-        
-        # Build context from memory and attached files
-        context_block = ""
-        
-        # 1. Codebase Memory
-        if hasattr(self, 'memory_checkbox') and self.memory_checkbox.isChecked() and VectorStore is not None:
-            try:
-                self.chat_history.append(f"<div style='color: #676767; font-size: 11px; font-style: italic; margin-bottom: 5px;'>Searching codebase memory for '{prompt}'...</div>")
-                
-                store = VectorStore()
-                results = store.search(prompt, k=4)
-                if results:
-                    context_block += "I am providing the following code snippets from the local codebase vector database as context:\n\n"
-                    for res in results:
-                        meta = res.get('metadata', {})
-                        doc = res.get('document', '')
-                        context_block += f"--- FILE: {meta.get('file', 'Unknown')} ---\n{doc}\n\n"
-            except Exception as e:
-                self.chat_history.append(f"<b style='color: red;'>Memory Search Error: {e}</b><br>")
+            self.current_session_id = self.history_store.create_session(title)
+            self.conversation = []
+            self.add_session_item(self.current_session_id, title, at_top=True)
+
+        attached_files, self.attached_files = self.attached_files, []
+        self.attached_files_label.setText("")
+
+        use_memory = self.memory_checkbox.isChecked() and VectorStore is not None
+        if not use_memory and not attached_files:
+            self.start_generation(model_data, prompt, attached_files, None)
+            return
+
+        # Memory search and file reads run on the runtime; the status label shows progress
+        task = ContextTask(
+            self.runtime,
+            prompt,
+            attached_files,
+            model_name=model_data.name,
+            backend_name=model_data.backend_name,
+            store_factory=VectorStore if use_memory else None,
+            parent=self,
+        )
+        task.progress.connect(self.status_label.setText)
+        task.succeeded.connect(
+            lambda context: self.on_context_ready(
+                task, model_data, prompt, attached_files, context
+            )
+        )
+        task.error_occurred.connect(partial(self.handle_error, task=task))
+        task.finished.connect(lambda: self.on_context_finished(task))
+        self.context_task = task
+        task.start()
+
+    def on_context_ready(self, task, model_data, prompt, attached_files, context):
+        # Dropped if the user switched chats while the context was gathered
+        if self.context_task is task:
+            self.start_generation(model_data, prompt, attached_files, context)
+
+    def on_context_finished(self, task):
+        # Still set when the context was never delivered (stopped or failed)
+        if self.context_task is task:
+            self.context_task = None
+            self.status_label.setText("")
+            self.set_generating(False)
+        task.deleteLater()
+
+    def start_generation(self, model_data, prompt, attached_files, context):
+        """Assemble the prompt from the gathered context, then stream the answer."""
+        self.context_task = None
+        self.status_label.setText("")
+        context = context or {"memory_results": [], "files": [], "warnings": []}
+        for warning in context["warnings"]:
+            self.chat_history.append(f"<b style='color: red;'>{warning}</b><br>")
+
+        # The prompt is built from segments; file contents and snippets are
+        # Attachments, which history stores once by hash instead of per message
+        parts = []
+        memory_results = context["memory_results"]
+        if memory_results:
+            parts.append(
+                "I am providing the following code snippets from the local codebase vector database as context:\n\n"
+            )
+            for res in memory_results:
+                meta = res.get("metadata", {})
+                doc = res.get("document", "")
+                parts += [
+                    f"--- FILE: {meta.get('file', 'Unknown')} ---\n",
+                    Attachment(doc),
+                    "\n\n",
+                ]
 
         # 2. Attached Files
-        if self.attached_files:
-            context_block += "I am attaching the following specific files for context as well:\n\n"
-            for file_path in self.attached_files:
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    filename = file_path.split("/")[-1]
-                    context_block += f"--- BEGIN FILE: {filename} ---\n{content}\n--- END FILE: {filename} ---\n\n"
-                except Exception as e:
-                    self.chat_history.append(f"<b style='color: red;'>Warning: Could not read file {file_path}: {e}</b><br>")
-                    
+        if context["files"]:
+            parts.append(
+                "I am attaching the following specific files for context as well:\n\n"
+            )
+            for file_path, content in context["files"]:
+                filename = file_path.split("/")[-1]
+                parts += [
+                    f"--- BEGIN FILE: {filename} ---\n",
+                    Attachment(content),
+                    f"\n--- END FILE: {filename} ---\n\n",
+                ]
+
         # 3. Final Prompt Assembly
-        if context_block:
-            context_block += f"My instructions/prompt:\n{prompt}"
+        if parts:
+            parts.append(f"My instructions/prompt:\n{prompt}")
         else:
-            context_block = prompt
-            
+            parts = [prompt]
+        context_block = "".join(parts)
+
         # Display the shortened version to user so chat isn't clustered with massive file text
         display_prompt = prompt
-        if self.attached_files:
-            filenames = [f.split("/")[-1] for f in self.attached_files]
-            display_prompt = f"<i>[Attached: {', '.join(filenames)}]</i><br>" + display_prompt
-        
-        # Clear attached files state
-        self.attached_files = []
-        self.attached_files_label.setText("")
-        
-        # Save user message to DB
-        add_message(self.current_session_id, "user", context_block)
-        
+        if attached_files:
+            filenames = [f.split("/")[-1] for f in attached_files]
+            display_prompt = (
+                f"<i>[Attached: {', '.join(filenames)}]</i><br>" + display_prompt
+            )
+        if memory_results:
+            display_prompt = (
+                "<i>🧠 [Codebase Memory Snippets Hidden]</i><br>" + display_prompt
+            )
+
+        # Save user message to DB: the short version to show, the full prompt by reference
+        self.history_store.add_message(
+            self.current_session_id, "user", display_prompt, prompt=parts
+        )
+
         # Append User Message (ChatGPT right-aligned rounded bubble style)
         self.chat_history.append(f"""
         <div style='display: flex; justify-content: flex-end; margin-bottom: 20px;'>
@@ -463,7 +622,7 @@ class MainWindow(QMainWindow):
             </div>
         </div>
         """)
-        
+
         # Start AI Message (ChatGPT transparent background, left aligned)
         self.chat_history.append(f"""
         <div style='display: flex; justify-content: flex-start; margin-bottom: 5px; margin-top: 20px;'>
@@ -472,108 +631,292 @@ class MainWindow(QMainWindow):
         """)
         self.scrollToBottom()
 
-        self.current_ai_message = ""
-
-        # Start QThread worker for generation (send the full context_block to LLM)
-        self.worker = GenerationWorker(
-            prompt=context_block,
+        # Everything after this position is streamed text not yet rendered as markdown
+        self.raw_start = self.chat_history.document().characterCount() - 1
+        self.render_epoch += 1
+        self.streaming = True
+        self.loading_older = False
+        self.stream_tail = ""
+        self.blocks_in_flight.clear()
+        self.current_ai_parts = []
+        self.pending_chunks = []
+
+        # Stream on the shared runtime (send the full context_block to LLM)
+        # The whole conversation goes to the backend's chat API. Turns are only
+        # appended, so the backend reuses its cache for everything before this one
+        if self.conversation is not None:
+            self.conversation.append({"role": "user", "content": context_block})
+        worker = GenerationTask(
+            self.runtime,
+            messages=self.conversation,
             model_name=model_data.name,
-            backend_name=model_data.backend_name
+            backend_name=model_data.backend_name,
+            load_messages=partial(
+                self.history_store.get_conversation, self.current_session_id
+            ),
+            session_id=self.current_session_id,
+            parent=self,
         )
-        self.worker.chunk_received.connect(self.handle_chunk)
-        self.worker.error_occurred.connect(self.handle_error)
-        self.worker.finished.connect(self.handle_finished)
-        self.worker.start()
-
-    def handle_chunk(self, chunk: str):
-        self.current_ai_message += chunk
-        # Update dynamically without rendering full markdown every token for performance
-        # We replace the entire block of the current AI message
-        cursor = self.chat_history.textCursor()
+        # Bound to the task: one left running by a session switch must not touch the new chat
+        worker.chunk_received.connect(partial(self.handle_chunk, worker))
+        worker.error_occurred.connect(partial(self.handle_error, task=worker))
+        worker.finished.connect(partial(self.handle_finished, worker))
+        self.worker = worker
+        worker.start()
+
+    def handle_stop(self):
+        # Cancels the task on the runtime; its finished handler still runs afterwards
+        self.stop_btn.setEnabled(False)
+        task = self.context_task or self.worker
+        if task:
+            task.cancel()
+
+    def cancel_generation(self):
+        """Stop answering in the chat being left; the answer so far is saved to its own session."""
+        for task in (self.context_task, self.worker):
+            if task is not None:
+                task.cancel()
+        self.context_task = None
+        self.worker = None
+        self.render_timer.stop()
+        self.pending_chunks = []
+        self.stream_tail = ""
+        # Blocks of the abandoned answer that are still rendering are ignored
+        self.render_epoch += 1
+        self.streaming = False
+        self.set_generating(False)
+
+    def save_partial_reply(self, worker):
+        """Store what a cancelled task streamed in its own session, unless it is empty or already stored."""
+        reply = "".join(worker.reply_parts)
+        if reply and not worker.saved:
+            worker.saved = True
+            self.history_store.add_message(worker.session_id, "assistant", reply)
+
+    def handle_chunk(self, worker, chunk: str):
+        if worker is not self.worker:
+            return
+        self.current_ai_parts.append(chunk)
+        self.pending_chunks.append(chunk)
+        if not self.render_timer.isActive():
+            self.render_timer.start()
+
+    def flush_chunks(self):
+        """Paint every chunk received since the last frame in a single insert."""
+        if not self.pending_chunks:
+            self.render_timer.stop()
+            return
+        text = "".join(self.pending_chunks)
+        self.pending_chunks = []
+        # Shown as plain text until the block it belongs to is complete
+        cursor = QTextCursor(self.chat_history.document())
         cursor.movePosition(QTextCursor.End)
-        self.chat_history.setTextCursor(cursor)
-        self.chat_history.insertPlainText(chunk)
+        cursor.insertText(text)
         self.scrollToBottom()
 
-    def handle_error(self, err: str):
+        # Hand finished paragraphs and code fences to the renderer as they close
+        self.stream_tail += text
+        cut = closed_prefix(self.stream_tail)
+        if cut:
+            block, self.stream_tail = self.stream_tail[:cut], self.stream_tail[cut:]
+            self.blocks_in_flight.append(block)
+            self.renderer.submit(("block", self.render_epoch), [block])
+
+    def handle_error(self, err: str, task=None):
+        if task is not None and task not in (self.worker, self.context_task):
+            return
+        self.flush_chunks()
         self.chat_history.append(f"<br><br><b style='color: red;'>Error: {err}</b><br>")
         self.scrollToBottom()
 
-    def handle_finished(self):
-        # When fully done, re-render the entire message nicely formatting code blocks
-        import markdown
-        
-        # We need to find the start of the current message in the chat history
-        # A simpler approach in v1.1 is just appending the rendered HTML
-        # However, because we already inserted plaintext token-by-token, we 
-        # need to replace the plaintext block. 
-        # Let's use a simpler mechanism: we will clear the current raw text we just typed
-        cursor = self.chat_history.textCursor()
-        # Move back by the length of the string we appended
-        cursor.movePosition(QTextCursor.Left, QTextCursor.KeepAnchor, len(self.current_ai_message))
+    def handle_finished(self, worker):
+        if worker is not self.worker:
+            # Cancelled by a session switch: only the session it was answering is updated
+            self.save_partial_reply(worker)
+            worker.deleteLater()
+            return
+
+        self.flush_chunks()
+        self.render_timer.stop()
+        self.current_ai_message = "".join(self.current_ai_parts)
+
+        # Only the unfinished last block is left to render; earlier blocks already are
+        self.renderer.submit(("final", self.render_epoch), [self.stream_tail])
+        self.stream_tail = ""
+
+        # Save AI message to DB
+        worker.saved = True
+        self.history_store.add_message(
+            self.current_session_id, "assistant", self.current_ai_message
+        )
+
+        # The task holds the conversation, loaded from history if it was not in memory
+        self.conversation = worker.messages
+        if self.conversation is not None:
+            self.conversation.append(
+                {"role": "assistant", "content": self.current_ai_message}
+            )
+
+        # Shown in small print under the answer
+        notes = []
+        if worker.dropped_messages:
+            notes.append(
+                f"{worker.dropped_messages} earlier messages left out to fit the context window"
+            )
+        if worker.stats.get("cancelled"):
+            saved = worker.stats.get("tokens_saved", 0)
+            notes.append(f"Stopped (~{saved} tokens saved)" if saved else "Stopped")
+        self.answer_note = " · ".join(notes)
+
+        worker.deleteLater()
+        self.worker = None
+
+    def handle_rendered(self, key, htmls):
+        kind, epoch = key[0], key[1]
+        if epoch != self.render_epoch:
+            return
+        if kind == "session":
+            self.show_session(self.session_messages, htmls)
+        elif kind == "older":
+            self.prepend_messages(self.older_messages, htmls)
+        elif kind == "block":
+            self.blocks_in_flight.popleft()
+            self.replace_raw_text(
+                htmls[0], "".join(self.blocks_in_flight) + self.stream_tail
+            )
+        elif kind == "final":
+            self.replace_raw_text(htmls[0])
+            if self.answer_note:
+                self.chat_history.append(
+                    f"<span style='color: #8e8e8e; font-size: 11px;'>{self.answer_note}</span>"
+                )
+            # Close the AI message div block
+            self.chat_history.append("</div></div><br>")
+            self.scrollToBottom()
+            self.streaming = False
+            self.set_generating(False)
+
+    def replace_raw_text(self, html, remainder=None):
+        """Swap the raw streamed text for rendered HTML, keeping ``remainder`` as raw text after it."""
+        cursor = QTextCursor(self.chat_history.document())
+        cursor.setPosition(self.raw_start)
+        cursor.movePosition(QTextCursor.End, QTextCursor.KeepAnchor)
         cursor.removeSelectedText()
-        
-        # Convert markdown code blocks to HTML with syntax styles
-        # Add basic styling to code blocks for Qt's rich text renderer
-        html = markdown.markdown(self.current_ai_message, extensions=['fenced_code', 'tables'])
-        
-        # Inject custom CSS style into the block to make pre/code look good in Qt
-        styled_html = f"""
-        <div style="font-family: 'Inter', 'Roboto', 'Segoe UI', Arial, sans-serif; font-size: 14px; color: #f8fafc;">
-            {html.replace('<pre>', '<pre style="background-color: #0f172a; color: #e2e8f0; padding: 12px; border-radius: 8px; border: 1px solid #334155; overflow-x: auto; margin-top: 8px; margin-bottom: 8px;">')
-                 .replace('<code>', '<code style="background-color: #0f172a; padding: 2px 6px; border-radius: 4px; font-family: Consolas, Monaco, monospace; font-size: 13px; color: #cbd5e1;">')}
-        </div>
-        """
-        
-        self.chat_history.append(styled_html)
-        # Close the AI message div block
-        self.chat_history.append("</div></div><br>")
+        cursor.insertHtml(html)
+        if remainder is not None:
+            cursor.insertBlock()
+            self.raw_start = cursor.position()
+            cursor.insertText(remainder)
         self.scrollToBottom()
-        
-        # Save AI message to DB
-        add_message(self.current_session_id, "assistant", self.current_ai_message)
-        
-        self.send_btn.setEnabled(True)
-        self.attach_btn.setEnabled(True)
-        if hasattr(self, 'memory_checkbox'):
-            self.memory_checkbox.setEnabled(True)
-        if self.worker:
-            self.worker.deleteLater()
-            self.worker = None
 
     def refresh_history_list(self):
+        """Load the first page of sessions; older ones are fetched as the list is scrolled."""
         self.history_list.clear()
-        sessions = get_sessions()
+        self.has_more_sessions = True
+        self.load_more_sessions()
+
+    def load_more_sessions(self):
+        if not self.has_more_sessions:
+            return
+        before_id = None
+        if self.history_list.count():
+            before_id = self.history_list.item(self.history_list.count() - 1).data(
+                Qt.UserRole
+            )
+        sessions = self.history_store.get_sessions(
+            limit=SESSION_PAGE_SIZE, before_id=before_id
+        )
+        self.has_more_sessions = len(sessions) == SESSION_PAGE_SIZE
         for session in sessions:
-            item = QListWidgetItem(session["title"])
-            item.setData(Qt.UserRole, session["id"])
+            self.add_session_item(session["id"], session["title"])
+
+    def add_session_item(self, session_id, title, at_top=False):
+        item = QListWidgetItem(title)
+        item.setData(Qt.UserRole, session_id)
+        if at_top:
+            self.history_list.insertItem(0, item)
+        else:
             self.history_list.addItem(item)
-            
+
+    def on_history_list_scrolled(self, value):
+        if value == self.history_list.verticalScrollBar().maximum():
+            self.load_more_sessions()
+
     def select_session(self, item):
         session_id = item.data(Qt.UserRole)
+        self.cancel_generation()
         self.current_session_id = session_id
+        # Loaded with the exact prompts by the next generation, off the UI thread
+        self.conversation = None
         self.chat_history.clear()
-        
-        # Check if disabled
-        self.send_btn.setEnabled(True)
-        self.attach_btn.setEnabled(True)
-        
-        messages = get_messages(session_id)
+
+        # Only the latest page is loaded; older messages follow when scrolling up
+        messages = self.history_store.get_messages(session_id, limit=MESSAGE_PAGE_SIZE)
+        self.has_older_messages = len(messages) == MESSAGE_PAGE_SIZE
+        self.oldest_message_id = messages[0]["id"] if messages else None
+        self.loading_older = False
         if not messages:
-            self.chat_history.append("<div style='text-align: center; margin-top: 40px;'><h2>Flint Desktop</h2><p style='color: #ececec;'>Empty Chat.</p></div>")
+            self.chat_history.append(
+                "<div style='text-align: center; margin-top: 40px;'><h2>Flint Desktop</h2><p style='color: #ececec;'>Empty Chat.</p></div>"
+            )
+            return
+
+        # Render the answers off the UI thread; show_session runs once they are ready
+        self.render_epoch += 1
+        self.session_messages = messages
+        self.chat_history.append(
+            "<div style='color: #676767; font-size: 11px; font-style: italic;'>Loading chat...</div>"
+        )
+        answers = [msg["content"] for msg in messages if msg["role"] != "user"]
+        self.renderer.submit(("session", self.render_epoch), answers)
+
+    def on_chat_scrolled(self, value):
+        # Prepending would shift the positions of an answer that is still streaming
+        if value != self.chat_history.verticalScrollBar().minimum() or self.streaming:
             return
-            
-        import markdown
+        if (
+            self.current_session_id is None
+            or not self.has_older_messages
+            or self.loading_older
+        ):
+            return
+        messages = self.history_store.get_messages(
+            self.current_session_id,
+            limit=MESSAGE_PAGE_SIZE,
+            before_id=self.oldest_message_id,
+        )
+        self.has_older_messages = len(messages) == MESSAGE_PAGE_SIZE
+        if not messages:
+            return
+        self.oldest_message_id = messages[0]["id"]
+        self.loading_older = True
+        self.older_messages = messages
+        answers = [msg["content"] for msg in messages if msg["role"] != "user"]
+        self.renderer.submit(("older", self.render_epoch), answers)
+
+    def message_fragments(self, messages, htmls):
+        """HTML for each message, with assistant answers taken in order from ``htmls``."""
+        rendered = iter(htmls)
+        fragments = []
         for msg in messages:
             if msg["role"] == "user":
                 content = msg["content"]
-                # A quick hack to hide massive file attachments from history view
+                # Messages saved before attachments moved to the blob table hold the full prompt
                 if "I am attaching the following specific files" in content:
-                    content = "<i>[Attached Files Hidden in History]</i><br>" + content.split("My instructions/prompt:\\n")[-1]
-                elif "I am providing the following code snippets from the local codebase" in content:
-                    content = "<i>🧠 [Codebase Memory Snippets Hidden]</i><br>" + content.split("My instructions/prompt:\\n")[-1]
-
-                self.chat_history.append(f"""
+                    content = (
+                        "<i>[Attached Files Hidden in History]</i><br>"
+                        + content.split("My instructions/prompt:\\n")[-1]
+                    )
+                elif (
+                    "I am providing the following code snippets from the local codebase"
+                    in content
+                ):
+                    content = (
+                        "<i>🧠 [Codebase Memory Snippets Hidden]</i><br>"
+                        + content.split("My instructions/prompt:\\n")[-1]
+                    )
+
+                fragments.append(f"""
                 <div style='display: flex; justify-content: flex-end; margin-bottom: 20px;'>
                     <div style='background-color: #2f2f2f; color: #ececec; border-radius: 18px; padding: 10px 18px; max-width: 80%; text-align: left; font-size: 15px;'>
                         {content}
@@ -581,27 +924,57 @@ class MainWindow(QMainWindow):
                 </div>
                 """)
             else:
-                html = markdown.markdown(msg["content"], extensions=['fenced_code', 'tables'])
-                styled_html = f"""
-                <div style="font-family: 'Inter', 'Roboto', 'Segoe UI', Arial, sans-serif; font-size: 14px; color: #f8fafc;">
-                    {html.replace('<pre>', '<pre style="background-color: #0f172a; color: #e2e8f0; padding: 12px; border-radius: 8px; border: 1px solid #334155; overflow-x: auto; margin-top: 8px; margin-bottom: 8px;">')
-                         .replace('<code>', '<code style="background-color: #0f172a; padding: 2px 6px; border-radius: 4px; font-family: Consolas, Monaco, monospace; font-size: 13px; color: #cbd5e1;">')}
-                </div>
-                """
-                self.chat_history.append(f"""
+                fragments.append(f"""
                 <div style='display: flex; justify-content: flex-start; margin-bottom: 5px; margin-top: 20px;'>
                     <div style='color: #ececec; text-align: left; width: 100%; font-size: 15px;'>
                         <b style='font-size: 16px;'>AI</b><br><br>
-                        {styled_html}
+                        {next(rendered)}
                     </div>
                 </div><br>
                 """)
+        return fragments
+
+    def show_session(self, messages, htmls):
+        self.chat_history.clear()
+        for fragment in self.message_fragments(messages, htmls):
+            self.chat_history.append(fragment)
         self.scrollToBottom()
-        
+
+    def prepend_messages(self, messages, htmls):
+        """Insert an older page above the loaded messages without moving the viewport."""
+        scrollbar = self.chat_history.verticalScrollBar()
+        distance_from_bottom = scrollbar.maximum() - scrollbar.value()
+        cursor = QTextCursor(self.chat_history.document())
+        cursor.movePosition(QTextCursor.Start)
+        for fragment in self.message_fragments(messages, htmls):
+            cursor.insertHtml(fragment)
+            cursor.insertBlock()
+        scrollbar.setValue(scrollbar.maximum() - distance_from_bottom)
+        self.loading_older = False
+
     def new_chat(self):
+        self.cancel_generation()
         self.current_session_id = None
+        self.conversation = []
+        self.has_older_messages = False
         self.chat_history.clear()
-        self.chat_history.append("<div style='text-align: center; margin-top: 40px;'><h2>Flint Desktop</h2><p style='color: #ececec;'>Welcome! Select a model and start chatting.</p></div>")
+        self.chat_history.append(
+            "<div style='text-align: center; margin-top: 40px;'><h2>Flint Desktop</h2><p style='color: #ececec;'>Welcome! Select a model and start chatting.</p></div>"
+        )
+
+    def closeEvent(self, event):
+        # Make sure queued history writes reach the disk before exiting
+        workers = self.findChildren(GenerationTask)
+        for task in [*workers, self.context_task, self.warm_task]:
+            if task is not None:
+                task.cancel()
+        self.runtime.shutdown()
+        # Their finished signals are never delivered now: keep the answers streamed so far
+        for worker in workers:
+            self.save_partial_reply(worker)
+        self.renderer.stop()
+        self.history_store.close()
+        super().closeEvent(event)
 
     def scrollToBottom(self):
         scrollbar = self.chat_history.verticalScrollBar()
@@ -1,36 +1,244 @@
 import asyncio
-from PySide6.QtCore import QThread, Signal
-from flint.backends import get_backend
+import queue
+from PySide6.QtCore import QObject, QThread, Signal
+from app.render import render_markdown
+from flint.core.context import ContextBuilder, fit_messages, prompt_budget
 
-class GenerationWorker(QThread):
-    chunk_received = Signal(str)
-    finished_generation = Signal()
+
+class AsyncTask(QObject):
+    """
+    A coroutine run on the shared AsyncRuntime. Outcomes come back as Qt
+    signals, which are delivered on the UI thread; ``finished`` is always
+    emitted last, also after ``cancel()``.
+    """
+
+    succeeded = Signal(object)
     error_occurred = Signal(str)
+    finished = Signal()
+
+    def __init__(self, runtime, coro_factory=None, parent=None):
+        super().__init__(parent)
+        self.runtime = runtime
+        self.coro_factory = coro_factory
+        self.future = None
+
+    def start(self):
+        self.future = self.runtime.submit(self._run())
+
+    def cancel(self):
+        if self.future is not None:
+            self.future.cancel()
+
+    async def work(self):
+        return await self.coro_factory()
+
+    async def _run(self):
+        try:
+            self.succeeded.emit(await self.work())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.error_occurred.emit(str(e))
+        finally:
+            self.finished.emit()
+
+
+def read_attachment(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+class ContextTask(AsyncTask):
+    """
+    Gathers the context for a message on the runtime: a codebase memory
+    search on the shared VectorStore and the attached file reads, run
+    concurrently on the thread pool, then packs them into the model's
+    context budget. ``progress`` reports what is still running; failures
+    and cuts become warnings so the message is still sent.
+    """
+
+    progress = Signal(str)
 
-    def __init__(self, prompt: str, model_name: str, backend_name: str):
-        super().__init__()
+    def __init__(
+        self,
+        runtime,
+        prompt: str,
+        attached_files,
+        model_name: str,
+        backend_name: str,
+        store_factory=None,
+        parent=None,
+    ):
+        super().__init__(runtime, parent=parent)
         self.prompt = prompt
+        self.attached_files = list(attached_files)
         self.model_name = model_name
         self.backend_name = backend_name
+        # Builds the VectorStore the first time memory is searched; None disables memory
+        self.store_factory = store_factory
+        self._steps = {}
 
-    def run(self):
-        # We need a new event loop for this thread to run async backend calls
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
+    def _report(self, step, text=None):
+        if text is None:
+            self._steps.pop(step, None)
+        else:
+            self._steps[step] = text
+        self.progress.emit(" · ".join(self._steps.values()))
+
+    async def _search(self, warnings):
+        self._report("memory", "Searching codebase memory...")
         try:
-            backend = get_backend(self.backend_name)
-            loop.run_until_complete(self._generate_stream(backend))
+            store = await self.runtime.shared("memory", self.store_factory)
+            return await self.runtime.run_blocking(store.search, self.prompt, 4)
         except Exception as e:
-            self.error_occurred.emit(str(e))
+            warnings.append(f"Memory Search Error: {e}")
+            return []
         finally:
+            self._report("memory")
+
+    async def _read_files(self, warnings):
+        files = []
+        total = len(self.attached_files)
+        reads = [
+            self.runtime.run_blocking(read_attachment, path)
+            for path in self.attached_files
+        ]
+        for done, (path, read) in enumerate(zip(self.attached_files, reads), 1):
+            self._report("files", f"Reading attached files ({done}/{total})...")
             try:
-                loop.run_until_complete(loop.shutdown_asyncgens())
-            except Exception:
-                pass
-            loop.close()
-
-    async def _generate_stream(self, backend):
-        async for chunk in backend.generate_stream(self.prompt, self.model_name):
-            if chunk:
-                self.chunk_received.emit(chunk)
+                files.append((path, await read))
+            except Exception as e:
+                warnings.append(f"Warning: Could not read file {path}: {e}")
+        self._report("files")
+        return files
+
+    def _pack(self, budget, memory_results, files):
+        """Keep what fits the budget: the prompt, then attached files, then memory hits."""
+        builder = ContextBuilder(budget)
+        builder.add("prompt", self.prompt, required=True)
+        for path, content in files:
+            builder.add(f"file:{path}", content, priority=2, truncate=True)
+        for i, res in enumerate(memory_results):
+            builder.add(f"memory:{i}", res.get("document", ""), priority=1)
+        packed, report = builder.pack()
+
+        kept = dict(packed)
+        files = [
+            (path, kept[f"file:{path}"]) for path, _ in files if f"file:{path}" in kept
+        ]
+        memory_results = [
+            res for i, res in enumerate(memory_results) if f"memory:{i}" in kept
+        ]
+        return memory_results, files, report
+
+    async def work(self):
+        warnings = []
+        search = (
+            self._search(warnings)
+            if self.store_factory is not None
+            else asyncio.sleep(0, [])
+        )
+        memory_results, files = await asyncio.gather(search, self._read_files(warnings))
+
+        self._report("pack", "Fitting context to the model...")
+        budget = await prompt_budget(
+            self.runtime.backend(self.backend_name), self.model_name
+        )
+        memory_results, files, report = await self.runtime.run_blocking(
+            self._pack, budget, memory_results, files
+        )
+        self._report("pack")
+        if report.cuts:
+            warnings.append(
+                f"Context shortened to fit {self.model_name} ({report.budget:,} tokens): "
+                + "; ".join(report.describe())
+            )
+        return {"memory_results": memory_results, "files": files, "warnings": warnings}
+
+
+class GenerationTask(AsyncTask):
+    """
+    Streams the next assistant turn of a conversation from the runtime's
+    pooled backend. ``messages`` is the whole conversation so far; when it is
+    None, ``load_messages`` is called on the thread pool to fetch it first.
+    ``session_id`` is the chat the answer belongs to, which may no longer be
+    the one on screen when the task finishes.
+    """
+
+    chunk_received = Signal(str)
+
+    def __init__(
+        self,
+        runtime,
+        messages,
+        model_name: str,
+        backend_name: str,
+        load_messages=None,
+        session_id=None,
+        parent=None,
+    ):
+        super().__init__(runtime, parent=parent)
+        self.session_id = session_id
+        self.messages = messages
+        self.load_messages = load_messages
+        self.model_name = model_name
+        self.backend_name = backend_name
+        # Filled in by BaseBackend.stream_chat: chunks, cancelled, tokens_saved
+        self.stats = {}
+        # Oldest messages left out because the conversation outgrew the context window
+        self.dropped_messages = 0
+        # Everything streamed so far, and whether it was stored in history
+        self.reply_parts = []
+        self.saved = False
+
+    async def work(self):
+        if self.messages is None:
+            self.messages = await self.runtime.run_blocking(self.load_messages)
+        backend = self.runtime.backend(self.backend_name)
+        budget = await prompt_budget(backend, self.model_name)
+        messages, self.dropped_messages = await self.runtime.run_blocking(
+            fit_messages, self.messages, budget
+        )
+        # Cancelling the task closes the HTTP stream, so the server stops decoding
+        stream = backend.stream_chat(messages, self.model_name, stats=self.stats)
+        try:
+            async for chunk in stream:
+                if chunk:
+                    self.reply_parts.append(chunk)
+                    self.chunk_received.emit(chunk)
+        finally:
+            await stream.aclose()
+
+
+class RenderWorker(QThread):
+    """
+    Long-lived thread that converts markdown to HTML off the UI thread.
+    Jobs run in submission order, and each emits ``rendered(key, htmls)``.
+    """
+
+    rendered = Signal(object, list)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.jobs = queue.Queue()
+
+    def submit(self, key, texts):
+        self.jobs.put((key, texts))
+
+    def stop(self):
+        self.jobs.put(None)
+        self.wait()
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            key, texts = job
+            htmls = []
+            for text in texts:
+                try:
+                    htmls.append(render_markdown(text))
+                except Exception as e:
+                    htmls.append(f"<b style='color: red;'>Render Error: {e}</b>")
+            self.rendered.emit(key, htmls)
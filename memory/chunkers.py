@@ -0,0 +1,216 @@
+import ast
+import os
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+# A chunk is a dict with "text" plus optional "symbol", "start_line" and "end_line"
+Chunk = Dict[str, Any]
+Chunker = Callable[[str, Any, int], List[Chunk]]
+
+_CHUNKERS: Dict[str, Chunker] = {}
+
+# ast.parse is not thread-safe on some CPython versions (3.11 can raise
+# "AST constructor recursion depth mismatch"), and in-process chunking runs
+# on the indexer's read threads
+_PARSE_LOCK = threading.Lock()
+
+
+def register_chunker(*extensions: str):
+    """Register a syntax-aware chunker for the given file extensions."""
+
+    def decorator(func: Chunker) -> Chunker:
+        for ext in extensions:
+            _CHUNKERS[ext.lower()] = func
+        return func
+
+    return decorator
+
+
+def get_chunker(path: str) -> Chunker:
+    """Chunker registered for the path's extension, falling back to `chunk_blocks`."""
+    return _CHUNKERS.get(os.path.splitext(path)[1].lower(), chunk_blocks)
+
+
+def chunk_document(
+    tokenizer,
+    path: str,
+    text: str,
+    chunk_size: int,
+    chunk_overlap: int,
+    mode: str = "syntax",
+) -> List[Chunk]:
+    """Chunk a file's text either by syntax ("syntax") or by raw token windows ("tokens")."""
+    if mode == "tokens":
+        return [
+            {"text": t}
+            for t in split_tokens(tokenizer, text, chunk_size, chunk_overlap)
+        ]
+    return get_chunker(path)(text, tokenizer, chunk_size)
+
+
+def split_tokens(
+    tokenizer, text: str, chunk_size: int, chunk_overlap: int
+) -> List[str]:
+    """Slice text into overlapping windows of ``chunk_size`` tokens."""
+    tokens = tokenizer.encode(text)
+    chunks = []
+
+    for i in range(0, len(tokens), chunk_size - chunk_overlap):
+        chunk_tokens = tokens[i : i + chunk_size]
+        chunks.append(tokenizer.decode(chunk_tokens))
+
+    return chunks
+
+
+def _blocks(lines: List[str]) -> Iterator[Tuple[int, List[str]]]:
+    """Yield (start index, lines) for runs of lines ending in blank lines."""
+    start = 0
+    for i, line in enumerate(lines):
+        next_blank = i + 1 < len(lines) and not lines[i + 1].strip()
+        if not line.strip() and not next_blank:
+            yield start, lines[start : i + 1]
+            start = i + 1
+    if start < len(lines):
+        yield start, lines[start:]
+
+
+def chunk_blocks(
+    text: str, tokenizer, chunk_size: int, first_line: int = 1, symbol: str = ""
+) -> List[Chunk]:
+    """
+    Language-agnostic chunker: packs blank-line separated blocks into chunks
+    of at most ``chunk_size`` tokens without overlap. Oversized blocks are
+    split by line, and oversized lines by token windows.
+    """
+    lines = text.splitlines(keepends=True)
+    chunks = []
+    buf = []
+    buf_tokens = 0
+    buf_start = first_line
+
+    def flush():
+        nonlocal buf, buf_tokens
+        if "".join(buf).strip():
+            chunks.append(
+                {
+                    "text": "".join(buf),
+                    "symbol": symbol,
+                    "start_line": buf_start,
+                    "end_line": buf_start + len(buf) - 1,
+                }
+            )
+        buf, buf_tokens = [], 0
+
+    def add(unit: List[str], line_no: int, n_tokens: int):
+        nonlocal buf_tokens, buf_start
+        if buf_tokens + n_tokens > chunk_size:
+            flush()
+        if not buf:
+            buf_start = line_no
+        buf.extend(unit)
+        buf_tokens += n_tokens
+
+    for start, block in _blocks(lines):
+        n_tokens = len(tokenizer.encode("".join(block)))
+        if n_tokens <= chunk_size:
+            add(block, first_line + start, n_tokens)
+            continue
+        for offset, line in enumerate(block):
+            line_no = first_line + start + offset
+            n_tokens = len(tokenizer.encode(line))
+            if n_tokens <= chunk_size:
+                add([line], line_no, n_tokens)
+                continue
+            flush()
+            for piece in split_tokens(tokenizer, line, chunk_size, 0):
+                chunks.append(
+                    {
+                        "text": piece,
+                        "symbol": symbol,
+                        "start_line": line_no,
+                        "end_line": line_no,
+                    }
+                )
+    flush()
+    return chunks
+
+
+def _node_start(node: ast.AST) -> int:
+    decorators = getattr(node, "decorator_list", [])
+    return min([node.lineno] + [d.lineno for d in decorators])
+
+
+def _chunk_python_nodes(
+    nodes: List[ast.stmt],
+    lines: List[str],
+    tokenizer,
+    chunk_size: int,
+    start: int,
+    end: int,
+    prefix: str,
+) -> List[Chunk]:
+    """
+    Emit one chunk per function/class in ``nodes`` (lines ``start``..``end``),
+    with the statements between them packed as ``prefix``-level code.
+    """
+    definitions = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+    chunks = []
+    gap_start = start
+
+    def emit_gap(gap_end: int):
+        if gap_end >= gap_start:
+            text = "".join(lines[gap_start - 1 : gap_end])
+            chunks.extend(
+                chunk_blocks(text, tokenizer, chunk_size, gap_start, prefix.rstrip("."))
+            )
+
+    for node in nodes:
+        if not isinstance(node, definitions):
+            continue
+        node_start, node_end = _node_start(node), node.end_lineno
+        emit_gap(node_start - 1)
+        symbol = f"{prefix}{node.name}"
+        text = "".join(lines[node_start - 1 : node_end])
+
+        if len(tokenizer.encode(text)) <= chunk_size:
+            chunks.append(
+                {
+                    "text": text,
+                    "symbol": symbol,
+                    "start_line": node_start,
+                    "end_line": node_end,
+                }
+            )
+        elif isinstance(node, ast.ClassDef):
+            # Too big as a whole: split the class at its methods
+            chunks.extend(
+                _chunk_python_nodes(
+                    node.body,
+                    lines,
+                    tokenizer,
+                    chunk_size,
+                    node_start,
+                    node_end,
+                    f"{symbol}.",
+                )
+            )
+        else:
+            chunks.extend(chunk_blocks(text, tokenizer, chunk_size, node_start, symbol))
+        gap_start = node_end + 1
+
+    emit_gap(end)
+    return chunks
+
+
+@register_chunker(".py", ".pyw")
+def chunk_python(text: str, tokenizer, chunk_size: int) -> List[Chunk]:
+    """Split Python source at function and class boundaries using `ast`."""
+    try:
+        with _PARSE_LOCK:
+            tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        return chunk_blocks(text, tokenizer, chunk_size)
+    lines = text.splitlines(keepends=True)
+    return _chunk_python_nodes(
+        tree.body, lines, tokenizer, chunk_size, 1, len(lines), ""
+    )
@@ -0,0 +1,208 @@
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+_WORD_RE = re.compile(r"[A-Za-z0-9_]+")
+_CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z]|\d|\b)|[A-Z]?[a-z]+|[A-Z]+|\d+")
+_STOPWORDS = {
+    "a",
+    "an",
+    "and",
+    "are",
+    "as",
+    "at",
+    "be",
+    "by",
+    "for",
+    "from",
+    "how",
+    "in",
+    "is",
+    "it",
+    "of",
+    "on",
+    "or",
+    "the",
+    "this",
+    "to",
+    "what",
+    "where",
+    "with",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Identifier-aware tokenizer: keeps whole identifiers and also their
+    snake_case / camelCase parts, so `getUserName` matches `user`.
+    """
+    terms = []
+    for word in _WORD_RE.findall(text):
+        lower = word.lower()
+        if lower not in _STOPWORDS:
+            terms.append(lower)
+        parts = [
+            p.lower() for piece in word.split("_") for p in _CAMEL_RE.findall(piece)
+        ]
+        if len(parts) > 1:
+            terms.extend(p for p in parts if p not in _STOPWORDS)
+    return terms
+
+
+class LexicalIndex:
+    """
+    On-disk BM25 inverted index (SQLite) over the same chunks as the vector store.
+    Querying it needs neither chromadb nor the embedding model. The connection
+    may be shared across threads; a lock serializes its use.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                id TEXT PRIMARY KEY,
+                file TEXT,
+                length INTEGER,
+                document TEXT,
+                metadata TEXT
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT,
+                chunk_id TEXT,
+                tf INTEGER
+            )
+        """)
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_postings_term ON postings (term)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_postings_chunk ON postings (chunk_id)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_file ON chunks (file)")
+        self.conn.commit()
+
+    @classmethod
+    def for_store(
+        cls, db_path: str = "~/.flint/vector_db", collection_name: str = "codebase"
+    ) -> "LexicalIndex":
+        """Open the lexical index that sits next to a VectorStore collection."""
+        return cls(cls.store_path(db_path, collection_name))
+
+    @staticmethod
+    def store_path(
+        db_path: str = "~/.flint/vector_db", collection_name: str = "codebase"
+    ) -> str:
+        """Where ``for_store`` keeps the index; it is created on first open."""
+        return os.path.join(
+            os.path.expanduser(db_path), f"{collection_name}_lexical.db"
+        )
+
+    def __enter__(self) -> "LexicalIndex":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def count(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def upsert(
+        self, documents: List[str], metadatas: List[Dict[str, Any]], ids: List[str]
+    ):
+        with self._lock, self.conn:
+            self._delete_ids(ids)
+            postings = []
+            rows = []
+            for doc, meta, id_ in zip(documents, metadatas, ids):
+                # Path terms are indexed too, so "register in auth.py" hits auth.py's chunks
+                terms = Counter(tokenize(doc) + tokenize(meta.get("file", "")))
+                rows.append(
+                    (id_, meta.get("file"), sum(terms.values()), doc, json.dumps(meta))
+                )
+                postings.extend((term, id_, tf) for term, tf in terms.items())
+            self.conn.executemany("INSERT INTO chunks VALUES (?, ?, ?, ?, ?)", rows)
+            self.conn.executemany("INSERT INTO postings VALUES (?, ?, ?)", postings)
+
+    def delete(self, ids: Optional[List[str]] = None, file: Optional[str] = None):
+        with self._lock, self.conn:
+            if ids:
+                self._delete_ids(ids)
+            if file is not None:
+                file_ids = [
+                    r[0]
+                    for r in self.conn.execute(
+                        "SELECT id FROM chunks WHERE file = ?", (file,)
+                    )
+                ]
+                self._delete_ids(file_ids)
+
+    def _delete_ids(self, ids: List[str]):
+        for i in range(0, len(ids), 500):
+            batch = ids[i : i + 500]
+            marks = ",".join("?" * len(batch))
+            self.conn.execute(
+                f"DELETE FROM postings WHERE chunk_id IN ({marks})", batch
+            )
+            self.conn.execute(f"DELETE FROM chunks WHERE id IN ({marks})", batch)
+
+    def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+        """Rank chunks by BM25 against the query terms."""
+        terms = set(tokenize(query))
+        with self._lock:
+            return self._search(terms, k)
+
+    def _search(self, terms, k: int) -> List[Dict[str, Any]]:
+        n_docs, avg_len = self.conn.execute(
+            "SELECT COUNT(*), AVG(length) FROM chunks"
+        ).fetchone()
+        if not terms or not n_docs:
+            return []
+
+        scores: Counter = Counter()
+        for term in terms:
+            rows = self.conn.execute(
+                "SELECT p.chunk_id, p.tf, c.length FROM postings p JOIN chunks c ON c.id = p.chunk_id "
+                "WHERE p.term = ?",
+                (term,),
+            ).fetchall()
+            if not rows:
+                continue
+            idf = math.log(1 + (n_docs - len(rows) + 0.5) / (len(rows) + 0.5))
+            for chunk_id, tf, length in rows:
+                norm = tf + K1 * (1 - B + B * length / (avg_len or 1))
+                scores[chunk_id] += idf * tf * (K1 + 1) / norm
+
+        results = []
+        for chunk_id, score in scores.most_common(k):
+            document, metadata = self.conn.execute(
+                "SELECT document, metadata FROM chunks WHERE id = ?", (chunk_id,)
+            ).fetchone()
+            results.append(
+                {
+                    "id": chunk_id,
+                    "document": document,
+                    "metadata": json.loads(metadata),
+                    "score": score,
+                }
+            )
+        return results
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
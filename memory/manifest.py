@@ -0,0 +1,78 @@
+import json
+import os
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+
+class FileManifest:
+    """
+    Persisted record of what has been indexed under one root directory:
+    relative path -> mtime, size, content hash and the chunk ids it produced.
+    """
+
+    def __init__(self, path: str, root: str):
+        self.path = Path(path)
+        self.root = root
+        self._data: Dict[str, Dict[str, Any]] = {}
+        self._settings: Dict[str, Dict[str, Any]] = {}
+        if self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    raw = json.load(f)
+                self._data = raw.get("roots", {})
+                self._settings = raw.get("settings", {})
+            except (OSError, ValueError):
+                # A corrupt manifest only costs a full re-index
+                self._data, self._settings = {}, {}
+        self.entries: Dict[str, Dict[str, Any]] = self._data.setdefault(root, {})
+
+    @property
+    def settings(self) -> Dict[str, Any]:
+        """Chunking settings the recorded chunks were produced with."""
+        return self._settings.get(self.root, {})
+
+    @settings.setter
+    def settings(self, value: Dict[str, Any]):
+        self._settings[self.root] = dict(value)
+
+    def invalidate(self):
+        """Force every recorded file to be re-chunked while keeping its chunk ids."""
+        for entry in self.entries.values():
+            entry["mtime"] = None
+            entry["hash"] = None
+
+    def get(self, rel_path: str) -> Optional[Dict[str, Any]]:
+        return self.entries.get(rel_path)
+
+    def is_unchanged(self, rel_path: str, stat: os.stat_result) -> bool:
+        """Cheap check that skips reading files whose mtime and size still match."""
+        entry = self.entries.get(rel_path)
+        return (
+            bool(entry)
+            and entry["mtime"] == stat.st_mtime
+            and entry["size"] == stat.st_size
+        )
+
+    def update(self, rel_path: str, stat: os.stat_result, digest: str, ids: List[str]):
+        self.entries[rel_path] = {
+            "mtime": stat.st_mtime,
+            "size": stat.st_size,
+            "hash": digest,
+            "ids": ids,
+        }
+
+    def remove(self, rel_path: str) -> List[str]:
+        """Forget a file and return the chunk ids it owned."""
+        entry = self.entries.pop(rel_path, None)
+        return entry["ids"] if entry else []
+
+    def paths(self) -> List[str]:
+        return list(self.entries.keys())
+
+    def save(self):
+        """Atomically write the manifest so an interrupted save never corrupts it."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"roots": self._data, "settings": self._settings}, f)
+        os.replace(tmp_path, self.path)
@@ -1,129 +1,531 @@
+import hashlib
+import importlib.util
 import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Iterator, Optional, Tuple
+
+from memory.chunkers import Chunk, chunk_document, split_tokens
+from memory.lexical import LexicalIndex
+from memory.manifest import FileManifest
+
+# chromadb and tiktoken take most of a second to import, so they are only
+# loaded once a VectorStore is actually created (see `_load_dependencies`)
+chromadb = None
+tiktoken = None
+
+# Reciprocal rank fusion constant: dampens the weight of top ranks
+RRF_K = 60
+
+_worker_tokenizer = None
+
+
+def dependencies_available() -> bool:
+    """Whether chromadb and tiktoken are installed, without importing them."""
+    return all(
+        importlib.util.find_spec(name) is not None for name in ("chromadb", "tiktoken")
+    )
+
+
+def _load_dependencies():
+    global chromadb, tiktoken
+    if chromadb is None or tiktoken is None:
+        try:
+            import chromadb as _chromadb
+            import tiktoken as _tiktoken
+        except ImportError:
+            raise ImportError(
+                "Please install chromadb and tiktoken to use Vector Memory."
+            )
+        chromadb, tiktoken = _chromadb, _tiktoken
+
+
+def _init_chunk_worker(encoding_name: str):
+    """Load the tokenizer once per chunking process."""
+    global _worker_tokenizer
+    _load_dependencies()
+    _worker_tokenizer = tiktoken.get_encoding(encoding_name)
+
+
+def _chunk_in_worker(
+    path: str, text: str, chunk_size: int, chunk_overlap: int, mode: str
+) -> List[Chunk]:
+    return chunk_document(
+        _worker_tokenizer, path, text, chunk_size, chunk_overlap, mode
+    )
+
+
+class _UpsertBatch:
+    """
+    Buffers chunks and hands them to ``write`` in fixed-size batches.
+    A batch is also flushed once its documents exceed ``max_bytes``. Files
+    handed to ``finish_file`` are reported to ``on_commit`` only after their
+    last chunk has been written, so a checkpoint never claims unwritten work.
+    """
+
+    def __init__(
+        self,
+        write: Callable[..., None],
+        size: int,
+        max_bytes: int,
+        on_commit: Callable[[Tuple], None],
+    ):
+        self.write = write
+        self.size = size
+        self.max_bytes = max_bytes
+        self.on_commit = on_commit
+        self.docs = []
+        self.metadatas = []
+        self.ids = []
+        self.nbytes = 0
+        self.finished_files = []
+
+    def add(self, doc: str, metadata: Dict[str, Any], id_: str):
+        self.docs.append(doc)
+        self.metadatas.append(metadata)
+        self.ids.append(id_)
+        self.nbytes += len(doc)
+        if len(self.ids) >= self.size or self.nbytes >= self.max_bytes:
+            self.flush()
+
+    def finish_file(self, record: Tuple):
+        self.finished_files.append(record)
+        if not self.ids:
+            self.flush()
+
+    def flush(self):
+        if self.ids:
+            self.write(documents=self.docs, metadatas=self.metadatas, ids=self.ids)
+            self.docs, self.metadatas, self.ids = [], [], []
+            self.nbytes = 0
+        finished, self.finished_files = self.finished_files, []
+        for record in finished:
+            self.on_commit(record)
 
-try:
-    import chromadb
-    import tiktoken
-except ImportError:
-    chromadb = None
-    tiktoken = None
 
 class VectorStore:
-    def __init__(self, db_path: str = "~/.flint/vector_db", collection_name: str = "codebase"):
-        if chromadb is None or tiktoken is None:
-            raise ImportError("Please install chromadb and tiktoken to use Vector Memory.")
-            
+    def __init__(
+        self, db_path: str = "~/.flint/vector_db", collection_name: str = "codebase"
+    ):
+        _load_dependencies()
+
         db_path = os.path.expanduser(db_path)
         os.makedirs(db_path, exist_ok=True)
-        
+
         # Initialize ChromaDB client
         self.client = chromadb.PersistentClient(path=db_path)
         self.collection = self.client.get_or_create_collection(name=collection_name)
-        
+        self.manifest_path = os.path.join(db_path, f"{collection_name}_manifest.json")
+        # BM25 index over the same chunks, for exact identifier and path matches
+        self.lexical = LexicalIndex.for_store(db_path, collection_name)
+
         # Tokenizer for chunking text
-        self.tokenizer = tiktoken.get_encoding("cl100k_base")
+        self.encoding_name = "cl100k_base"
+        self.tokenizer = tiktoken.get_encoding(self.encoding_name)
         self.chunk_size = 500
         self.chunk_overlap = 50
+        # "syntax" splits at function/class or block boundaries; "tokens" uses raw windows
+        self.chunk_mode = "syntax"
+
+        # Ingestion pipeline sizing
+        self.workers = os.cpu_count() or 1
+        self.io_threads = min(32, (os.cpu_count() or 1) + 4)
+        self.max_pending = 4 * self.io_threads
+        self.batch_size = 100
+        self.max_buffer_bytes = 64 * 1024 * 1024
+        self.checkpoint_interval = 2.0
 
     def chunk_text(self, text: str) -> List[str]:
-        tokens = self.tokenizer.encode(text)
-        chunks = []
-        
-        for i in range(0, len(tokens), self.chunk_size - self.chunk_overlap):
-            chunk_tokens = tokens[i:i + self.chunk_size]
-            chunks.append(self.tokenizer.decode(chunk_tokens))
-            
-        return chunks
-
-    def index_directory(self, dir_path: str, extensions: List[str] = None):
-        """Recursively index all text files matching the extensions."""
+        return split_tokens(self.tokenizer, text, self.chunk_size, self.chunk_overlap)
+
+    def chunk_file(self, path: str, text: str) -> List[Chunk]:
+        """Chunk a file with the chunker registered for its extension (see `memory.chunkers`)."""
+        return chunk_document(
+            self.tokenizer,
+            path,
+            text,
+            self.chunk_size,
+            self.chunk_overlap,
+            self.chunk_mode,
+        )
+
+    def index_directory(
+        self,
+        dir_path: str,
+        extensions: List[str] = None,
+        force: bool = False,
+        on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ):
+        """
+        Recursively index all text files matching the extensions.
+        Only files that changed since the last run are re-chunked, and chunks
+        left behind by deleted or shrunken files are removed.
+
+        Files stream through a pipeline: a thread pool reads and hashes them, a
+        process pool (when ``self.workers > 1``) chunks them with the chunker
+        registered for their extension, and
+        the calling thread upserts finished chunks in batches while later files
+        are still being processed. ``self.max_buffer_bytes`` caps the memory
+        held by files in flight and by the pending upsert batch.
+
+        The manifest is checkpointed as batches are committed, so an
+        interrupted run resumes from the last committed batch when re-run.
+        ``on_progress`` receives running counters after every file. Files that
+        can't be read or decoded are skipped; files whose chunking raised are
+        counted as failed, listed in the summary and retried on the next run.
+        """
         if extensions is None:
-            extensions = [".py", ".md", ".txt", ".js", ".ts", ".html", ".css", ".json", ".rs", ".go"]
-            
+            extensions = [
+                ".py",
+                ".md",
+                ".txt",
+                ".js",
+                ".ts",
+                ".html",
+                ".css",
+                ".json",
+                ".rs",
+                ".go",
+            ]
+
         dir_path = Path(dir_path).resolve()
-        
+        manifest = FileManifest(self.manifest_path, root=str(dir_path))
+        had_records = self.collection.count() > 0
+
+        # Chunks made with other settings must be rebuilt; their ids are still known
+        chunk_settings = {
+            "mode": self.chunk_mode,
+            "size": self.chunk_size,
+            "overlap": self.chunk_overlap,
+        }
+        if manifest.settings != chunk_settings:
+            manifest.invalidate()
+            manifest.settings = chunk_settings
+        elif had_records and not self.lexical.count():
+            # Index built before the lexical index existed: re-chunk to backfill it
+            manifest.invalidate()
+
+        stats = {
+            "files": 0,
+            "changed": 0,
+            "unchanged": 0,
+            "skipped": 0,
+            "failed": 0,
+            "chunks": 0,
+            "elapsed": 0.0,
+        }
+        failures = []
+        seen = set()
+        start = time.perf_counter()
+        last_checkpoint = start
+
+        def commit(record):
+            nonlocal last_checkpoint
+            manifest.update(*record)
+            # Throttle checkpoints: the manifest is rewritten as a whole
+            if time.perf_counter() - last_checkpoint >= self.checkpoint_interval:
+                manifest.save()
+                last_checkpoint = time.perf_counter()
+
+        batch = _UpsertBatch(
+            self._upsert, self.batch_size, self.max_buffer_bytes // 2, commit
+        )
+
+        print(f"Indexing directory: {dir_path}")
+
+        try:
+            for rel_path, stat, entry, result in self._iter_prepared(
+                dir_path, extensions, manifest, force, stats, seen
+            ):
+                if result is None:
+                    stats["skipped"] += 1
+                elif result[0] == "failed":
+                    # Left out of the manifest, so the next run retries it
+                    failures.append((rel_path, result[1]))
+                    stats["failed"] += 1
+                elif result[0] == "unchanged":
+                    # Touched but identical content: just refresh mtime/size
+                    manifest.update(rel_path, stat, result[1], entry["ids"])
+                    stats["unchanged"] += 1
+                else:
+                    _, digest, chunks = result
+                    file_ids = [f"{rel_path}_{i}" for i in range(len(chunks))]
+                    if entry:
+                        stale_ids = list(set(entry["ids"]) - set(file_ids))
+                        if stale_ids:
+                            self._delete(ids=stale_ids)
+                    elif had_records:
+                        # No manifest record (e.g. an index built before manifests existed)
+                        self._delete(file=rel_path)
+                    for i, chunk in enumerate(chunks):
+                        metadata = {k: v for k, v in chunk.items() if k != "text"}
+                        metadata.update({"file": rel_path, "chunk_index": i})
+                        batch.add(chunk["text"], metadata, file_ids[i])
+                    batch.finish_file((rel_path, stat, digest, file_ids))
+                    stats["changed"] += 1
+                    stats["chunks"] += len(chunks)
+                stats["files"] += 1
+                stats["elapsed"] = time.perf_counter() - start
+                if on_progress:
+                    on_progress(dict(stats))
+
+            batch.flush()
+
+            removed_files = [p for p in manifest.paths() if p not in seen]
+            stale_ids = []
+            for rel_path in removed_files:
+                stale_ids.extend(manifest.get(rel_path)["ids"])
+            for i in range(0, len(stale_ids), self.batch_size):
+                self._delete(ids=stale_ids[i : i + self.batch_size])
+            # Only forgotten once their chunks are gone, so a failed delete is retried
+            for rel_path in removed_files:
+                manifest.remove(rel_path)
+        finally:
+            # Persist whatever was committed, including on Ctrl+C or a crash
+            manifest.save()
+
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        if stats["chunks"] or stale_ids:
+            print(
+                f"Indexed {stats['chunks']} chunks from {stats['changed']} changed files in '{dir_path.name}' "
+                f"({stats['unchanged']} unchanged, {len(removed_files)} removed) in {elapsed:.1f}s "
+                f"[{stats['files'] / elapsed:.1f} files/s, {stats['chunks'] / elapsed:.1f} chunks/s]."
+            )
+        elif stats["unchanged"]:
+            print(f"Index is up to date ({stats['unchanged']} files unchanged).")
+        else:
+            print("No valid text files found to index.")
+        if failures:
+            print(f"Failed to chunk {len(failures)} files:")
+            for rel_path, error in failures:
+                print(f"  {rel_path}: {error}")
+
+    def _upsert(
+        self, documents: List[str], metadatas: List[Dict[str, Any]], ids: List[str]
+    ):
+        """Write chunks to both the vector collection and the lexical index."""
+        self.collection.upsert(documents=documents, metadatas=metadatas, ids=ids)
+        self.lexical.upsert(documents, metadatas, ids)
+
+    def _delete(self, ids: Optional[List[str]] = None, file: Optional[str] = None):
+        if ids:
+            self.collection.delete(ids=ids)
+        if file is not None:
+            self.collection.delete(where={"file": file})
+        self.lexical.delete(ids=ids, file=file)
+
+    def _iter_prepared(
+        self,
+        dir_path: Path,
+        extensions: List[str],
+        manifest: FileManifest,
+        force: bool,
+        stats: Dict[str, Any],
+        seen: set,
+    ) -> Iterator[Tuple]:
+        """
+        Generator over the read/chunk stages. Yields (rel_path, stat, entry,
+        result) in walk order while keeping a bounded number of files, and at
+        most half of ``max_buffer_bytes``, in flight.
+        """
+        max_inflight_bytes = self.max_buffer_bytes // 2
+        pending = deque()
+        pending_bytes = 0
+        chunk_pool = None
+        try:
+            with ThreadPoolExecutor(max_workers=self.io_threads) as read_pool:
+                for file_path, rel_path in self._iter_files(dir_path, extensions):
+                    seen.add(rel_path)
+                    try:
+                        stat = os.stat(file_path)
+                    except OSError:
+                        continue
+                    if not force and manifest.is_unchanged(rel_path, stat):
+                        stats["files"] += 1
+                        stats["unchanged"] += 1
+                        continue
+
+                    # Only pay for worker processes once a file actually needs chunking
+                    if chunk_pool is None and self.workers > 1:
+                        chunk_pool = ProcessPoolExecutor(
+                            max_workers=self.workers,
+                            initializer=_init_chunk_worker,
+                            initargs=(self.encoding_name,),
+                        )
+                    pending.append(
+                        (
+                            stat.st_size,
+                            read_pool.submit(
+                                self._prepare_file,
+                                file_path,
+                                rel_path,
+                                stat,
+                                manifest.get(rel_path),
+                                force,
+                                chunk_pool,
+                            ),
+                        )
+                    )
+                    pending_bytes += stat.st_size
+                    # Bounded queue: hand back the oldest file before reading more
+                    while pending and (
+                        len(pending) >= self.max_pending
+                        or pending_bytes >= max_inflight_bytes
+                    ):
+                        size, future = pending.popleft()
+                        pending_bytes -= size
+                        yield future.result()
+
+                while pending:
+                    yield pending.popleft()[1].result()
+        finally:
+            for _, future in pending:
+                future.cancel()
+            if chunk_pool is not None:
+                chunk_pool.shutdown(cancel_futures=True)
+
+    def _prepare_file(
+        self,
+        file_path: str,
+        rel_path: str,
+        stat: os.stat_result,
+        entry: Optional[Dict[str, Any]],
+        force: bool,
+        chunk_pool: Optional[ProcessPoolExecutor],
+    ):
+        """Pipeline stage run on the read pool: read, hash and chunk a single file."""
+        try:
+            with open(file_path, "rb") as f:
+                raw = f.read()
+            digest = hashlib.sha256(raw).hexdigest()
+            if not force and entry and entry["hash"] == digest:
+                return rel_path, stat, entry, ("unchanged", digest)
+
+            content = raw.decode("utf-8")
+            if chunk_pool is not None:
+                chunks = chunk_pool.submit(
+                    _chunk_in_worker,
+                    rel_path,
+                    content,
+                    self.chunk_size,
+                    self.chunk_overlap,
+                    self.chunk_mode,
+                ).result()
+            else:
+                chunks = self.chunk_file(rel_path, content)
+            return rel_path, stat, entry, ("changed", digest, chunks)
+        except (OSError, UnicodeDecodeError):
+            # Unreadable or not text (e.g. binary disguised as text)
+            return rel_path, stat, entry, None
+        except Exception as e:
+            return rel_path, stat, entry, ("failed", f"{type(e).__name__}: {e}")
+
+    def _iter_files(
+        self, dir_path: Path, extensions: List[str]
+    ) -> Iterator[Tuple[str, str]]:
+        """Yield (absolute path, relative path) for indexable files, honouring ignore rules."""
         # Build ignore specifications from .gitignore and defaults
-        ignore_patterns = [".git/", ".svn/", "node_modules/", "venv/", "env/", ".env/", "__pycache__/", ".pytest_cache/", "build/", "dist/"]
+        ignore_patterns = [
+            ".git/",
+            ".svn/",
+            "node_modules/",
+            "venv/",
+            "env/",
+            ".env/",
+            "__pycache__/",
+            ".pytest_cache/",
+            "build/",
+            "dist/",
+        ]
         for ignore_file in [".gitignore", ".flintignore"]:
             ignore_path = dir_path / ignore_file
             if ignore_path.exists():
                 try:
-                    with open(ignore_path, 'r', encoding='utf-8') as f:
-                        ignore_patterns.extend([line.strip() for line in f if line.strip() and not line.startswith('#')])
+                    with open(ignore_path, "r", encoding="utf-8") as f:
+                        ignore_patterns.extend(
+                            [
+                                line.strip()
+                                for line in f
+                                if line.strip() and not line.startswith("#")
+                            ]
+                        )
                 except Exception:
                     pass
-                    
+
         import pathspec
-        spec = pathspec.PathSpec.from_lines(pathspec.patterns.GitWildMatchPattern, ignore_patterns)
-        
-        docs = []
-        metadatas = []
-        ids = []
-        
-        print(f"Indexing directory: {dir_path}")
-        
+
+        spec = pathspec.PathSpec.from_lines(
+            pathspec.patterns.GitWildMatchPattern, ignore_patterns
+        )
+
         for root, _, files in os.walk(dir_path):
             # Skip hidden directories like .git
-            if any(part.startswith('.') for part in Path(root).parts):
+            if any(part.startswith(".") for part in Path(root).parts):
                 continue
-                
+
             for file in files:
                 ext = os.path.splitext(file)[1].lower()
                 if ext in extensions:
                     file_path = os.path.join(root, file)
                     rel_path = os.path.relpath(file_path, dir_path).replace("\\", "/")
-                    
+
                     # Ignore files matched by pathspec (.gitignore)
                     if spec.match_file(rel_path):
                         continue
-                        
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                            
-                        chunks = self.chunk_text(content)
-                        
-                        for i, chunk in enumerate(chunks):
-                            docs.append(chunk)
-                            metadatas.append({"file": rel_path, "chunk_index": i})
-                            ids.append(f"{rel_path}_{i}")
-                            
-                    except Exception as e:
-                        # Skip files that can't be read (e.g. binary disguised as text)
-                        pass
-                        
-        if docs:
-            # Batch upsert to chroma
-            batch_size = 100
-            for i in range(0, len(docs), batch_size):
-                self.collection.upsert(
-                    documents=docs[i:i+batch_size],
-                    metadatas=metadatas[i:i+batch_size],
-                    ids=ids[i:i+batch_size]
-                )
-            print(f"Successfully indexed {len(docs)} chunks from '{dir_path.name}'.")
-        else:
-            print("No valid text files found to index.")
+                    yield file_path, rel_path
 
-    def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
-        """Search the indexed codebase."""
+    def search(
+        self, query: str, k: int = 5, mode: str = "hybrid"
+    ) -> List[Dict[str, Any]]:
+        """
+        Search the indexed codebase.
+
+        ``mode`` is "vector" (embedding similarity), "lexical" (BM25 over
+        identifiers and paths, no embedding model needed) or "hybrid", which
+        fuses both rankings with reciprocal rank fusion.
+        """
+        if mode not in ("vector", "lexical", "hybrid"):
+            raise ValueError(f"Unknown search mode: {mode}")
+        if mode == "lexical":
+            return self.lexical.search(query, k)
         if not self.collection.count():
             print("Vector store is empty. Please run `flint memory index` first.")
             return []
-            
-        results = self.collection.query(
-            query_texts=[query],
-            n_results=k
-        )
-        
+        if mode == "vector":
+            return self._vector_search(query, k)
+
+        # Over-fetch from both sides so fusion can promote results ranked lower by one of them
+        candidates = k * 4
+        fused: Dict[str, Dict[str, Any]] = {}
+        for ranking in (
+            self._vector_search(query, candidates),
+            self.lexical.search(query, candidates),
+        ):
+            for rank, result in enumerate(ranking):
+                hit = fused.setdefault(result["id"], dict(result, score=0.0))
+                hit["score"] += 1.0 / (RRF_K + rank + 1)
+        return sorted(fused.values(), key=lambda r: r["score"], reverse=True)[:k]
+
+    def _vector_search(self, query: str, k: int) -> List[Dict[str, Any]]:
+        results = self.collection.query(query_texts=[query], n_results=k)
+
         formatted_results = []
         if results and results.get("documents") and len(results["documents"]) > 0:
             for idx in range(len(results["documents"][0])):
-                formatted_results.append({
-                    "id": results["ids"][0][idx],
-                    "document": results["documents"][0][idx],
-                    "metadata": results["metadatas"][0][idx] if results["metadatas"] else {}
-                })
-                
+                formatted_results.append(
+                    {
+                        "id": results["ids"][0][idx],
+                        "document": results["documents"][0][idx],
+                        "metadata": (
+                            results["metadatas"][0][idx] if results["metadatas"] else {}
+                        ),
+                    }
+                )
+
         return formatted_results
+
+    def close(self):
+        """Release the lexical index connection (Chroma manages its own)."""
+        self.lexical.close()
@@ -6,6 +6,6 @@ __version__ = "0.1.0"
 
 from flint.core.model import Model
 from flint.core.prompt import Prompt
-from flint.core.chain import Chain
+from flint.core.chain import Chain, incremental
 
-__all__ = ["Model", "Prompt", "Chain"]
+__all__ = ["Model", "Prompt", "Chain", "incremental"]
@@ -1,7 +1,11 @@
+from typing import Optional
 from flint.backends.ollama import OllamaBackend
 from flint.backends.lmstudio import LMStudioBackend
 from flint.backends.llamacpp import LlamaCppBackend
 from flint.backends.base import BaseBackend
+from flint.backends.cache import CachedBackend
+from flint.backends.singleflight import SingleFlightBackend
+from flint.core.config import config
 
 _BACKENDS = {
     "ollama": OllamaBackend,
@@ -10,16 +14,42 @@ _BACKENDS = {
 }
 
 
-def get_backend(name: str) -> BaseBackend:
+def get_backend(
+    name: str,
+    cache: Optional[bool] = None,
+    single_flight: Optional[bool] = None,
+    **kwargs,
+) -> BaseBackend:
     """
     Factory function to get a backend instance by name.
+    Extra keyword arguments (e.g. pool limits) are passed to the backend.
+    With ``cache`` (default: ``[cache] enabled`` in the config), identical
+    generations are answered from the on-disk response cache. With
+    ``single_flight`` (default: ``single_flight`` under ``[backends]``),
+    identical generations running at the same time share one upstream call.
     """
     if name not in _BACKENDS:
         raise ValueError(
             f"Unknown backend: {name}. Supported backends: {', '.join(_BACKENDS.keys())}"
         )
 
-    return _BACKENDS[name]()
+    backend = _BACKENDS[name](**kwargs)
+    if cache is None:
+        cache = config.get("cache", {}).get("enabled", False)
+    if single_flight is None:
+        single_flight = config.get("backends", {}).get("single_flight", True)
+    if cache:
+        backend = CachedBackend(backend)
+    if single_flight:
+        backend = SingleFlightBackend(backend)
+    return backend
+
+
+def get_backend_names() -> list[str]:
+    """
+    Names of all supported backends, in the order get_all_backends() uses.
+    """
+    return list(_BACKENDS.keys())
 
 
 def get_all_backends() -> list[BaseBackend]:
@@ -2,15 +2,147 @@
 Base backend interface for Flint.
 """
 
-from typing import List, AsyncGenerator, Dict, Any, Optional
+import asyncio
+import httpx
+from typing import List, AsyncGenerator, Dict, Any, Optional, Tuple
 from abc import ABC, abstractmethod
+from flint.core.config import config
+from flint.core.cancellation import generation_metrics
+
+# Sampling options callers may pass as keyword arguments, with OpenAI names
+_SAMPLING_OPTIONS = ("temperature", "top_p", "max_tokens", "stop")
+
+
+def _sampling_payload(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """The sampling options set in ``kwargs``, as OpenAI-style request fields."""
+    return {k: kwargs[k] for k in _SAMPLING_OPTIONS if kwargs.get(k) is not None}
+
+
+def _record_usage(data: Dict[str, Any], stats: Dict[str, Any]) -> None:
+    """Copy token counts from an OpenAI-style stream chunk into ``stats``."""
+    usage = data.get("usage")
+    if usage:
+        stats["prompt_tokens"] = usage.get("prompt_tokens")
+        stats["completion_tokens"] = usage.get("completion_tokens")
+    # llama.cpp's server also reports its own decode timings
+    timings = data.get("timings")
+    if timings and timings.get("predicted_ms"):
+        stats["completion_tokens"] = timings.get("predicted_n")
+        stats["eval_duration"] = timings["predicted_ms"] / 1000
+
+
+def _prompt_messages(prompt: str, system: Optional[str] = None) -> List[Dict[str, str]]:
+    """A single-turn message list for chat-style APIs."""
+    messages = []
+    if system:
+        messages.append({"role": "system", "content": system})
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+
+def _flatten_messages(messages: List[Dict[str, str]]) -> Tuple[Optional[str], str]:
+    """Collapse a message list into a (system, prompt) pair for prompt-only APIs."""
+    system_parts = [m["content"] for m in messages if m["role"] == "system"]
+    turns = [m for m in messages if m["role"] != "system"]
+    system = "\n\n".join(system_parts) if system_parts else None
+    if len(turns) == 1 and turns[0]["role"] == "user":
+        return system, turns[0]["content"]
+    transcript = "\n\n".join(f"{m['role'].capitalize()}: {m['content']}" for m in turns)
+    return system, f"{transcript}\n\nAssistant:"
+
+
+async def _tracked(
+    inner: AsyncGenerator[str, None],
+    model_name: str,
+    stats: Dict[str, Any],
+    max_tokens: Optional[int],
+) -> AsyncGenerator[str, None]:
+    """Relay a backend stream, closing it on cancellation and recording metrics."""
+    tokens = 0
+    finished = cancelled = False
+    try:
+        async for chunk in inner:
+            if chunk:
+                tokens += 1
+                stats["chunks"] = tokens
+            yield chunk
+        finished = True
+    except (asyncio.CancelledError, GeneratorExit):
+        cancelled = True
+        raise
+    finally:
+        # Leaves the backend's `client.stream(...)` block, dropping the connection
+        await inner.aclose()
+        if cancelled:
+            stats["cancelled"] = True
+            stats["tokens_saved"] = generation_metrics.record_cancelled(
+                model_name, tokens, max_tokens
+            )
+        elif finished:
+            generation_metrics.record_completed(
+                model_name, stats.get("completion_tokens") or tokens
+            )
 
 
 class BaseBackend(ABC):
     """
     Abstract base class for all Flint backends (Ollama, llama.cpp, etc.)
+
+    Each backend instance owns a single pooled ``httpx.AsyncClient`` that is
+    created lazily on first use and reused by every request. Close it with
+    ``await backend.aclose()`` or use the backend as an async context manager.
     """
 
+    def __init__(
+        self,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+    ):
+        backend_config = config.get("backends", {})
+        self.limits = httpx.Limits(
+            max_connections=max_connections or backend_config["max_connections"],
+            max_keepalive_connections=max_keepalive_connections
+            or backend_config["max_keepalive_connections"],
+            keepalive_expiry=keepalive_expiry or backend_config["keepalive_expiry"],
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """
+        The shared connection pool for this backend.
+        Connections are bound to the event loop they were opened on, so a
+        fresh pool is created if the backend is used from a different loop.
+        """
+        loop = asyncio.get_running_loop()
+        if (
+            self._client is None
+            or self._client.is_closed
+            or self._client_loop is not loop
+        ):
+            self._client = httpx.AsyncClient(limits=self.limits)
+            self._client_loop = loop
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close the pooled HTTP client, if one was opened."""
+        client, self._client = self._client, None
+        if client is not None and not client.is_closed:
+            try:
+                await client.aclose()
+            except RuntimeError:
+                # The loop that owned the connections is already gone
+                pass
+        self._client_loop = None
+
+    async def __aenter__(self) -> "BaseBackend":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
     @property
     @abstractmethod
     def name(self) -> str:
@@ -49,5 +181,139 @@ class BaseBackend(ABC):
     ) -> AsyncGenerator[str, None]:
         """
         Generate text from the model as an async stream.
+        If a ``stats`` dict is passed, backends fill it with the token counts
+        they report once the stream ends (``prompt_tokens``,
+        ``completion_tokens`` and, when known, ``eval_duration`` in seconds).
         """
         pass
+
+    async def context_length(self, model_name: str) -> Optional[int]:
+        """
+        The model's context window in tokens, from the backend's model
+        metadata, or None if the backend does not report it.
+        """
+        return None
+
+    async def chat(
+        self, messages: List[Dict[str, str]], model_name: str, **kwargs
+    ) -> str:
+        """
+        Answer the last turn of a conversation, given as OpenAI-style
+        ``{"role", "content"}`` messages.
+        Backends with a native chat endpoint override this; the default
+        flattens the conversation into a single prompt.
+        """
+        system, prompt = _flatten_messages(messages)
+        return await self.generate(prompt, model_name, system=system, **kwargs)
+
+    async def chat_stream(
+        self, messages: List[Dict[str, str]], model_name: str, **kwargs
+    ) -> AsyncGenerator[str, None]:
+        """
+        Streaming ``chat``. Callers should only ever append to ``messages``
+        between turns: an unchanged prefix lets the server reuse its prompt
+        cache, so each turn only prefills the new messages.
+        Accepts a ``stats`` dict like ``generate_stream``.
+        """
+        system, prompt = _flatten_messages(messages)
+        async for chunk in self.generate_stream(
+            prompt, model_name, system=system, **kwargs
+        ):
+            yield chunk
+
+    def stream(
+        self,
+        prompt: str,
+        model_name: str,
+        system: Optional[str] = None,
+        stats: Optional[Dict[str, Any]] = None,
+        **kwargs,
+    ) -> AsyncGenerator[str, None]:
+        """
+        ``generate_stream`` with cancellation support.
+
+        Cancelling the consuming task, or closing this generator early, closes
+        the HTTP stream right away so the server stops decoding. Each
+        generation is counted in ``flint.core.cancellation.generation_metrics``.
+        ``stats`` keeps a running ``chunks`` count; a cancelled generation also
+        sets ``cancelled`` and ``tokens_saved``.
+        """
+        stats = {} if stats is None else stats
+        inner = self.generate_stream(
+            prompt, model_name, system=system, stats=stats, **kwargs
+        )
+        return _tracked(inner, model_name, stats, kwargs.get("max_tokens"))
+
+    def stream_chat(
+        self,
+        messages: List[Dict[str, str]],
+        model_name: str,
+        stats: Optional[Dict[str, Any]] = None,
+        **kwargs,
+    ) -> AsyncGenerator[str, None]:
+        """``chat_stream`` with the cancellation support and metrics of ``stream``."""
+        stats = {} if stats is None else stats
+        inner = self.chat_stream(messages, model_name, stats=stats, **kwargs)
+        return _tracked(inner, model_name, stats, kwargs.get("max_tokens"))
+
+
+class BackendWrapper(BaseBackend):
+    """
+    A backend that adds behaviour around another one.
+    Everything is delegated to the wrapped ``backend``, which also owns the
+    connection pool; subclasses override the calls they change.
+    """
+
+    def __init__(self, backend: BaseBackend):
+        self.backend = backend
+
+    @property
+    def name(self) -> str:
+        return self.backend.name
+
+    def __getattr__(self, attr: str) -> Any:
+        # base_url, limits and backend-specific helpers
+        return getattr(self.backend, attr)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self.backend.client
+
+    async def aclose(self) -> None:
+        await self.backend.aclose()
+
+    async def list_models(self):
+        return await self.backend.list_models()
+
+    async def pull_model(self, model_name: str) -> None:
+        await self.backend.pull_model(model_name)
+
+    async def context_length(self, model_name: str) -> Optional[int]:
+        return await self.backend.context_length(model_name)
+
+    async def generate(
+        self,
+        prompt: str,
+        model_name: str,
+        stream: bool = False,
+        system: Optional[str] = None,
+        **kwargs,
+    ) -> str:
+        return await self.backend.generate(
+            prompt, model_name, stream=stream, system=system, **kwargs
+        )
+
+    def generate_stream(
+        self, prompt: str, model_name: str, system: Optional[str] = None, **kwargs
+    ) -> AsyncGenerator[str, None]:
+        return self.backend.generate_stream(prompt, model_name, system=system, **kwargs)
+
+    async def chat(
+        self, messages: List[Dict[str, str]], model_name: str, **kwargs
+    ) -> str:
+        return await self.backend.chat(messages, model_name, **kwargs)
+
+    def chat_stream(
+        self, messages: List[Dict[str, str]], model_name: str, **kwargs
+    ) -> AsyncGenerator[str, None]:
+        return self.backend.chat_stream(messages, model_name, **kwargs)
@@ -0,0 +1,234 @@
+"""
+Response cache for Flint backends.
+Stores generated text on disk, keyed by everything that determined it, so
+repeating an identical generation is answered without running the model.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+from flint.backends.base import BackendWrapper, BaseBackend
+from flint.core.config import config
+
+# Arguments that change how a result is delivered, not what is generated
+_UNCACHED_KWARGS = ("stats", "stream")
+
+
+def _normalize(text: Optional[str]) -> Optional[str]:
+    """Ignore line-ending and trailing-whitespace differences between prompts."""
+    if text is None:
+        return None
+    lines = text.replace("\r\n", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip()
+
+
+class ResponseCache:
+    """
+    Generated text in SQLite, evicted least recently used first once it holds
+    more than ``max_entries`` responses or ``max_bytes`` of text, and expired
+    ``ttl`` seconds after it was stored (0 keeps entries until evicted).
+    Hit and miss counts are kept in the database. Safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        ttl: Optional[float] = None,
+    ):
+        cache_config = config.get("cache", {})
+        self.path = os.path.expanduser(path or cache_config["path"])
+        self.max_entries = max_entries or cache_config["max_entries"]
+        self.max_bytes = max_bytes or cache_config["max_bytes"]
+        self.ttl = cache_config["ttl"] if ttl is None else ttl
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT, "
+                "size INTEGER, created_at REAL, accessed_at REAL)"
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER)"
+            )
+
+    @staticmethod
+    def key(
+        backend: str,
+        model_name: str,
+        system: Optional[str],
+        prompt: str,
+        params: Dict[str, Any],
+    ) -> str:
+        """Cache key of a generation; ``params`` are its sampling options."""
+        params = {k: v for k, v in params.items() if k not in _UNCACHED_KWARGS}
+        parts = [backend, model_name, _normalize(system), _normalize(prompt), params]
+        payload = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _count(self, name: str) -> None:
+        self.conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,),
+        )
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock, self.conn:
+            row = self.conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row and self.ttl and row[1] + self.ttl < now:
+                self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self._count("misses")
+                return None
+            self.conn.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self._count("hits")
+        return row[0]
+
+    def put(self, key: str, response: str) -> None:
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, response, size, now, now),
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        count, total = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        stale = []
+        for key, size in self.conn.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at"
+        ):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            stale.append((key,))
+            count -= 1
+            total -= size
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+        self.conn.execute(
+            "INSERT INTO counters (name, value) VALUES ('evictions', ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (len(stale),),
+        )
+
+    def stats(self) -> Dict[str, int]:
+        """Entries, stored bytes, and hit/miss/eviction counts."""
+        with self._lock:
+            entries, size = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+            counters = dict(self.conn.execute("SELECT name, value FROM counters"))
+        return {
+            "entries": entries,
+            "bytes": size,
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+            "evictions": counters.get("evictions", 0),
+        }
+
+    def clear(self) -> None:
+        """Remove every stored response and reset the counters."""
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM responses")
+            self.conn.execute("DELETE FROM counters")
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
+
+
+def _replay(text: str) -> List[str]:
+    """Split a stored response into word-sized chunks, as a backend streams it."""
+    return re.findall(r"\s*\S+|\s+", text)
+
+
+class CachedBackend(BackendWrapper):
+    """
+    Wraps a backend so that ``generate`` and ``generate_stream`` are answered
+    from a ResponseCache when the same backend, model, system prompt, prompt
+    and sampling options were seen before. Cached responses are streamed back
+    in word-sized chunks, so callers don't need to know about the cache.
+    Chat conversations are not cached. ``aclose()`` also closes the cache,
+    unless it was passed in by the caller.
+    """
+
+    def __init__(self, backend: BaseBackend, cache: Optional[ResponseCache] = None):
+        super().__init__(backend)
+        self._owns_cache = cache is None
+        self.cache = cache or ResponseCache()
+
+    async def aclose(self) -> None:
+        await super().aclose()
+        if self._owns_cache:
+            self.cache.close()
+
+    def _key(self, prompt: str, model_name: str, system: Optional[str], kwargs) -> str:
+        return ResponseCache.key(self.name, model_name, system, prompt, kwargs)
+
+    async def generate(
+        self,
+        prompt: str,
+        model_name: str,
+        stream: bool = False,
+        system: Optional[str] = None,
+        **kwargs,
+    ) -> str:
+        key = self._key(prompt, model_name, system, kwargs)
+        response = self.cache.get(key)
+        if response is None:
+            response = await self.backend.generate(
+                prompt, model_name, stream=stream, system=system, **kwargs
+            )
+            self.cache.put(key, response)
+        return response
+
+    async def generate_stream(
+        self, prompt: str, model_name: str, system: Optional[str] = None, **kwargs
+    ) -> AsyncGenerator[str, None]:
+        key = self._key(prompt, model_name, system, kwargs)
+        response = self.cache.get(key)
+        if response is not None:
+            stats = kwargs.get("stats")
+            if stats is not None:
+                stats["cached"] = True
+            for chunk in _replay(response):
+                yield chunk
+            return
+
+        parts = []
+        inner = self.backend.generate_stream(
+            prompt, model_name, system=system, **kwargs
+        )
+        try:
+            async for chunk in inner:
+                parts.append(chunk)
+                yield chunk
+        finally:
+            await inner.aclose()
+        # Only complete responses are stored; a cancelled stream raised above
+        self.cache.put(key, "".join(parts))
@@ -4,13 +4,19 @@ llama.cpp Backend implementation for Flint.
 
 import httpx
 import json
-from typing import List, AsyncGenerator, Optional
-from flint.backends.base import BaseBackend
+from typing import List, Dict, Any, AsyncGenerator, Optional
+from flint.backends.base import (
+    BaseBackend,
+    _prompt_messages,
+    _record_usage,
+    _sampling_payload,
+)
 from flint.core.model import Model
 
 
 class LlamaCppBackend(BaseBackend):
-    def __init__(self, base_url: str = "http://localhost:8080/v1"):
+    def __init__(self, base_url: str = "http://localhost:8080/v1", **client_kwargs):
+        super().__init__(**client_kwargs)
         self.base_url = base_url.rstrip("/")
 
     @property
@@ -19,25 +25,24 @@ class LlamaCppBackend(BaseBackend):
 
     async def list_models(self) -> List[Model]:
         """Fetch models from local llama.cpp instance."""
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(f"{self.base_url}/models")
-                response.raise_for_status()
-                data = response.json()
+        try:
+            response = await self.client.get(f"{self.base_url}/models")
+            response.raise_for_status()
+            data = response.json()
 
-                models = []
-                for m in data.get("data", []):
-                    models.append(
-                        Model(
-                            name=m["id"],
-                            backend_name=self.name,
-                            size="Unknown",
-                            status="Ready",
-                        )
+            models = []
+            for m in data.get("data", []):
+                models.append(
+                    Model(
+                        name=m["id"],
+                        backend_name=self.name,
+                        size="Unknown",
+                        status="Ready",
                     )
-                return models
-            except (httpx.RequestError, httpx.HTTPStatusError):
-                return []
+                )
+            return models
+        except (httpx.RequestError, httpx.HTTPStatusError):
+            return []
 
     async def pull_model(self, model_name: str) -> None:
         """Pulling via API isn't natively supported by llama.cpp server out of the box in the same way."""
@@ -45,6 +50,20 @@ class LlamaCppBackend(BaseBackend):
             "llama.cpp backend does not support model pulling via API. Please download models manually."
         )
 
+    async def context_length(self, model_name: str) -> Optional[int]:
+        """Context size the server was started with, from /props."""
+        root = (
+            self.base_url[: -len("/v1")]
+            if self.base_url.endswith("/v1")
+            else self.base_url
+        )
+        response = await self.client.get(f"{root}/props")
+        response.raise_for_status()
+        data = response.json()
+        return data.get("default_generation_settings", {}).get("n_ctx") or data.get(
+            "n_ctx"
+        )
+
     async def generate(
         self,
         prompt: str,
@@ -54,47 +73,69 @@ class LlamaCppBackend(BaseBackend):
         **kwargs,
     ) -> str:
         """Non-streaming generation."""
-        messages = []
-        if system:
-            messages.append({"role": "system", "content": system})
-        messages.append({"role": "user", "content": prompt})
-
-        payload = {"model": model_name, "messages": messages, "stream": False}
-
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/chat/completions", json=payload, timeout=None
-            )
-            response.raise_for_status()
-            data = response.json()
-            return data["choices"][0]["message"]["content"]
+        return await self.chat(_prompt_messages(prompt, system), model_name, **kwargs)
 
     async def generate_stream(
-        self, prompt: str, model_name: str, system: Optional[str] = None, **kwargs
+        self,
+        prompt: str,
+        model_name: str,
+        system: Optional[str] = None,
+        stats: Optional[Dict[str, Any]] = None,
+        **kwargs,
     ) -> AsyncGenerator[str, None]:
         """Streaming generation."""
-        messages = []
-        if system:
-            messages.append({"role": "system", "content": system})
-        messages.append({"role": "user", "content": prompt})
+        async for chunk in self.chat_stream(
+            _prompt_messages(prompt, system), model_name, stats=stats, **kwargs
+        ):
+            yield chunk
+
+    async def chat(
+        self, messages: List[Dict[str, str]], model_name: str, **kwargs
+    ) -> str:
+        """Non-streaming chat completion."""
+        payload = {"model": model_name, "messages": messages, "stream": False}
+        payload.update(_sampling_payload(kwargs))
+        # Reuse the server's KV cache for the unchanged prefix of the conversation
+        payload["cache_prompt"] = True
+        response = await self.client.post(
+            f"{self.base_url}/chat/completions", json=payload, timeout=None
+        )
+        response.raise_for_status()
+        data = response.json()
+        return data["choices"][0]["message"]["content"]
 
+    async def chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        model_name: str,
+        stats: Optional[Dict[str, Any]] = None,
+        **kwargs,
+    ) -> AsyncGenerator[str, None]:
+        """Streaming chat completion."""
         payload = {"model": model_name, "messages": messages, "stream": True}
+        payload.update(_sampling_payload(kwargs))
+        # Reuse the server's KV cache for the unchanged prefix of the conversation
+        payload["cache_prompt"] = True
+        if stats is not None:
+            # Ask for a final usage chunk so callers get real token counts
+            payload["stream_options"] = {"include_usage": True}
 
-        async with httpx.AsyncClient() as client:
-            async with client.stream(
-                "POST", f"{self.base_url}/chat/completions", json=payload, timeout=None
-            ) as response:
-                response.raise_for_status()
-                async for line in response.aiter_lines():
-                    if line.startswith("data: "):
-                        json_str = line[6:]
-                        if json_str.strip() == "[DONE]":
-                            break
-                        try:
-                            data = json.loads(json_str)
-                            if data.get("choices") and data["choices"][0].get(
-                                "delta", {}
-                            ).get("content"):
-                                yield data["choices"][0]["delta"]["content"]
-                        except json.JSONDecodeError:
-                            continue
+        async with self.client.stream(
+            "POST", f"{self.base_url}/chat/completions", json=payload, timeout=None
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line.startswith("data: "):
+                    json_str = line[6:]
+                    if json_str.strip() == "[DONE]":
+                        break
+                    try:
+                        data = json.loads(json_str)
+                        if stats is not None:
+                            _record_usage(data, stats)
+                        if data.get("choices") and data["choices"][0].get(
+                            "delta", {}
+                        ).get("content"):
+                            yield data["choices"][0]["delta"]["content"]
+                    except json.JSONDecodeError:
+                        continue
@@ -4,14 +4,20 @@ LM Studio Backend implementation for Flint.
 
 import httpx
 import json
-from typing import List, AsyncGenerator, Optional
-from flint.backends.base import BaseBackend
+from typing import List, Dict, Any, AsyncGenerator, Optional
+from flint.backends.base import (
+    BaseBackend,
+    _prompt_messages,
+    _record_usage,
+    _sampling_payload,
+)
 from flint.core.model import Model
 from flint.core.config import config
 
 
 class LMStudioBackend(BaseBackend):
-    def __init__(self, base_url: str = None):
+    def __init__(self, base_url: str = None, **client_kwargs):
+        super().__init__(**client_kwargs)
         if base_url is None:
             port = config.get("backends", {}).get("lmstudio_port", 1234)
             base_url = f"http://localhost:{port}/v1"
@@ -23,26 +29,25 @@ class LMStudioBackend(BaseBackend):
 
     async def list_models(self) -> List[Model]:
         """Fetch models from local LM Studio instance."""
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(f"{self.base_url}/models")
-                response.raise_for_status()
-                data = response.json()
+        try:
+            response = await self.client.get(f"{self.base_url}/models")
+            response.raise_for_status()
+            data = response.json()
 
-                models = []
-                for m in data.get("data", []):
-                    # LM Studio's /v1/models might not return size, so we default to Unknown
-                    models.append(
-                        Model(
-                            name=m["id"],
-                            backend_name=self.name,
-                            size="Unknown",
-                            status="Ready",
-                        )
+            models = []
+            for m in data.get("data", []):
+                # LM Studio's /v1/models might not return size, so we default to Unknown
+                models.append(
+                    Model(
+                        name=m["id"],
+                        backend_name=self.name,
+                        size="Unknown",
+                        status="Ready",
                     )
-                return models
-            except (httpx.RequestError, httpx.HTTPStatusError):
-                return []
+                )
+            return models
+        except (httpx.RequestError, httpx.HTTPStatusError):
+            return []
 
     async def pull_model(self, model_name: str) -> None:
         """Pulling via API isn't natively supported by LM Studio /v1 endpoint gracefully."""
@@ -50,6 +55,18 @@ class LMStudioBackend(BaseBackend):
             "LM Studio backend does not support model pulling via API yet. Please load models through the LM Studio app."
         )
 
+    async def context_length(self, model_name: str) -> Optional[int]:
+        """Context window from LM Studio's REST API (loaded length when the model is loaded)."""
+        root = (
+            self.base_url[: -len("/v1")]
+            if self.base_url.endswith("/v1")
+            else self.base_url
+        )
+        response = await self.client.get(f"{root}/api/v0/models/{model_name}")
+        response.raise_for_status()
+        data = response.json()
+        return data.get("loaded_context_length") or data.get("max_context_length")
+
     async def generate(
         self,
         prompt: str,
@@ -59,47 +76,65 @@ class LMStudioBackend(BaseBackend):
         **kwargs,
     ) -> str:
         """Non-streaming generation."""
-        messages = []
-        if system:
-            messages.append({"role": "system", "content": system})
-        messages.append({"role": "user", "content": prompt})
-
-        payload = {"model": model_name, "messages": messages, "stream": False}
-
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/chat/completions", json=payload, timeout=None
-            )
-            response.raise_for_status()
-            data = response.json()
-            return data["choices"][0]["message"]["content"]
+        return await self.chat(_prompt_messages(prompt, system), model_name, **kwargs)
 
     async def generate_stream(
-        self, prompt: str, model_name: str, system: Optional[str] = None, **kwargs
+        self,
+        prompt: str,
+        model_name: str,
+        system: Optional[str] = None,
+        stats: Optional[Dict[str, Any]] = None,
+        **kwargs,
     ) -> AsyncGenerator[str, None]:
         """Streaming generation."""
-        messages = []
-        if system:
-            messages.append({"role": "system", "content": system})
-        messages.append({"role": "user", "content": prompt})
+        async for chunk in self.chat_stream(
+            _prompt_messages(prompt, system), model_name, stats=stats, **kwargs
+        ):
+            yield chunk
+
+    async def chat(
+        self, messages: List[Dict[str, str]], model_name: str, **kwargs
+    ) -> str:
+        """Non-streaming chat completion."""
+        payload = {"model": model_name, "messages": messages, "stream": False}
+        payload.update(_sampling_payload(kwargs))
+        response = await self.client.post(
+            f"{self.base_url}/chat/completions", json=payload, timeout=None
+        )
+        response.raise_for_status()
+        data = response.json()
+        return data["choices"][0]["message"]["content"]
 
+    async def chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        model_name: str,
+        stats: Optional[Dict[str, Any]] = None,
+        **kwargs,
+    ) -> AsyncGenerator[str, None]:
+        """Streaming chat completion."""
         payload = {"model": model_name, "messages": messages, "stream": True}
+        payload.update(_sampling_payload(kwargs))
+        if stats is not None:
+            # Ask for a final usage chunk so callers get real token counts
+            payload["stream_options"] = {"include_usage": True}
 
-        async with httpx.AsyncClient() as client:
-            async with client.stream(
-                "POST", f"{self.base_url}/chat/completions", json=payload, timeout=None
-            ) as response:
-                response.raise_for_status()
-                async for line in response.aiter_lines():
-                    if line.startswith("data: "):
-                        json_str = line[6:]
-                        if json_str.strip() == "[DONE]":
-                            break
-                        try:
-                            data = json.loads(json_str)
-                            if data.get("choices") and data["choices"][0].get(
-                                "delta", {}
-                            ).get("content"):
-                                yield data["choices"][0]["delta"]["content"]
-                        except json.JSONDecodeError:
-                            continue
+        async with self.client.stream(
+            "POST", f"{self.base_url}/chat/completions", json=payload, timeout=None
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line.startswith("data: "):
+                    json_str = line[6:]
+                    if json_str.strip() == "[DONE]":
+                        break
+                    try:
+                        data = json.loads(json_str)
+                        if stats is not None:
+                            _record_usage(data, stats)
+                        if data.get("choices") and data["choices"][0].get(
+                            "delta", {}
+                        ).get("content"):
+                            yield data["choices"][0]["delta"]["content"]
+                    except json.JSONDecodeError:
+                        continue
@@ -5,18 +5,38 @@ Ollama Backend implementation for Flint.
 import httpx
 import json
 from typing import List, Dict, Any, AsyncGenerator, Optional
-from flint.backends.base import BaseBackend
+from flint.backends.base import BaseBackend, _sampling_payload
 from flint.core.model import Model
 from flint.core.config import config
 
 
+def _options(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """Sampling options in ``kwargs`` as Ollama's ``options`` object."""
+    options = _sampling_payload(kwargs)
+    if "max_tokens" in options:
+        options["num_predict"] = options.pop("max_tokens")
+    if isinstance(options.get("stop"), str):
+        options["stop"] = [options["stop"]]
+    return options
+
+
+# What the runner allocates when neither the model nor the request sets num_ctx
+RUNNER_DEFAULT_NUM_CTX = 4096
+
+
 class OllamaBackend(BaseBackend):
-    def __init__(self, base_url: str = None):
-        super().__init__()
+    def __init__(
+        self, base_url: str = None, num_ctx: Optional[int] = None, **client_kwargs
+    ):
+        super().__init__(**client_kwargs)
+        backend_config = config.get("backends", {})
         if base_url is None:
-            port = config.get("backends", {}).get("ollama_port", 11434)
+            port = backend_config.get("ollama_port", 11434)
             base_url = f"http://localhost:{port}"
         self.base_url = base_url.rstrip("/")
+        # Sent as options.num_ctx with every request, so all commands load the
+        # model with the same context; None leaves it to the model or runner
+        self.num_ctx = num_ctx or backend_config.get("ollama_num_ctx") or None
 
     @property
     def name(self) -> str:
@@ -24,31 +44,30 @@ class OllamaBackend(BaseBackend):
 
     async def list_models(self) -> List[Model]:
         """Fetch models from local Ollama instance."""
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(f"{self.base_url}/api/tags")
-                response.raise_for_status()
-                data = response.json()
-
-                models = []
-                for m in data.get("models", []):
-                    size_bytes = m.get("size", 0)
-                    # Convert bytes to GB roughly
-                    size_gb = round(size_bytes / (1024**3), 1)
-                    size_str = f"{size_gb} GB" if size_gb > 0 else "Unknown"
-
-                    models.append(
-                        Model(
-                            name=m["name"],
-                            backend_name=self.name,
-                            size=size_str,
-                            status="Ready",
-                        )
+        try:
+            response = await self.client.get(f"{self.base_url}/api/tags")
+            response.raise_for_status()
+            data = response.json()
+
+            models = []
+            for m in data.get("models", []):
+                size_bytes = m.get("size", 0)
+                # Convert bytes to GB roughly
+                size_gb = round(size_bytes / (1024**3), 1)
+                size_str = f"{size_gb} GB" if size_gb > 0 else "Unknown"
+
+                models.append(
+                    Model(
+                        name=m["name"],
+                        backend_name=self.name,
+                        size=size_str,
+                        status="Ready",
                     )
-                return models
-            except httpx.RequestError as e:
-                # Log or handle warning about backend being offline
-                return []
+                )
+            return models
+        except httpx.RequestError as e:
+            # Log or handle warning about backend being offline
+            return []
 
     async def pull_model(self, model_name: str) -> None:
         """Pull a model via Ollama API."""
@@ -56,6 +75,52 @@ class OllamaBackend(BaseBackend):
         # This implementation just does it in one go (or streams without yielding).
         pass
 
+    async def context_length(self, model_name: str) -> Optional[int]:
+        """
+        The context the runner will actually allocate: ``num_ctx`` when set on
+        the backend, else the model's num_ctx parameter, else the runner's
+        default. The trained window from /api/show caps all of them.
+        """
+        response = await self.client.post(
+            f"{self.base_url}/api/show", json={"model": model_name}
+        )
+        response.raise_for_status()
+        data = response.json()
+        length = self.num_ctx
+        if length is None:
+            for line in (data.get("parameters") or "").splitlines():
+                parts = line.split()
+                if len(parts) == 2 and parts[0] == "num_ctx":
+                    length = int(parts[1])
+        if length is None:
+            length = RUNNER_DEFAULT_NUM_CTX
+        for key, value in (data.get("model_info") or {}).items():
+            if key.endswith(".context_length"):
+                length = min(length, int(value))
+        return length
+
+    def _options(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        options = _options(kwargs)
+        if self.num_ctx:
+            options["num_ctx"] = self.num_ctx
+        return options
+
+    def _generate_payload(
+        self,
+        prompt: str,
+        model_name: str,
+        system: Optional[str],
+        stream: bool,
+        kwargs: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        payload = {"model": model_name, "prompt": prompt, "stream": stream}
+        if system:
+            payload["system"] = system
+        options = self._options(kwargs)
+        if options:
+            payload["options"] = options
+        return payload
+
     async def generate(
         self,
         prompt: str,
@@ -65,33 +130,97 @@ class OllamaBackend(BaseBackend):
         **kwargs,
     ) -> str:
         """Non-streaming generation."""
-        payload = {"model": model_name, "prompt": prompt, "stream": False}
-        if system:
-            payload["system"] = system
+        payload = self._generate_payload(prompt, model_name, system, False, kwargs)
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/api/generate", json=payload, timeout=None
-            )
-            response.raise_for_status()
-            return response.json().get("response", "")
+        response = await self.client.post(
+            f"{self.base_url}/api/generate", json=payload, timeout=None
+        )
+        response.raise_for_status()
+        return response.json().get("response", "")
 
     async def generate_stream(
-        self, prompt: str, model_name: str, system: Optional[str] = None, **kwargs
+        self,
+        prompt: str,
+        model_name: str,
+        system: Optional[str] = None,
+        stats: Optional[Dict[str, Any]] = None,
+        **kwargs,
     ) -> AsyncGenerator[str, None]:
         """Streaming generation."""
-        payload = {"model": model_name, "prompt": prompt, "stream": True}
-        if system:
-            payload["system"] = system
+        payload = self._generate_payload(prompt, model_name, system, True, kwargs)
+
+        async with self.client.stream(
+            "POST", f"{self.base_url}/api/generate", json=payload, timeout=None
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line:
+                    data = json.loads(line)
+                    yield data.get("response", "")
+                    if data.get("done", False):
+                        if stats is not None:
+                            # Ollama reports durations in nanoseconds
+                            stats["prompt_tokens"] = data.get("prompt_eval_count")
+                            stats["completion_tokens"] = data.get("eval_count")
+                            if data.get("eval_duration"):
+                                stats["eval_duration"] = data["eval_duration"] / 1e9
+                        break
+
+    def _chat_payload(
+        self,
+        messages: List[Dict[str, str]],
+        model_name: str,
+        stream: bool,
+        kwargs: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        payload = {
+            "model": model_name,
+            "messages": messages,
+            "stream": stream,
+            # Keep the model, and the KV cache of this conversation, loaded between turns
+            "keep_alive": config.get("backends", {}).get("ollama_keep_alive", "30m"),
+        }
+        options = self._options(kwargs)
+        if options:
+            payload["options"] = options
+        return payload
 
-        async with httpx.AsyncClient() as client:
-            async with client.stream(
-                "POST", f"{self.base_url}/api/generate", json=payload, timeout=None
-            ) as response:
-                response.raise_for_status()
-                async for line in response.aiter_lines():
-                    if line:
-                        data = json.loads(line)
-                        yield data.get("response", "")
-                        if data.get("done", False):
-                            break
+    async def chat(
+        self, messages: List[Dict[str, str]], model_name: str, **kwargs
+    ) -> str:
+        """Non-streaming chat via /api/chat."""
+        response = await self.client.post(
+            f"{self.base_url}/api/chat",
+            json=self._chat_payload(messages, model_name, False, kwargs),
+            timeout=None,
+        )
+        response.raise_for_status()
+        return response.json().get("message", {}).get("content", "")
+
+    async def chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        model_name: str,
+        stats: Optional[Dict[str, Any]] = None,
+        **kwargs,
+    ) -> AsyncGenerator[str, None]:
+        """Streaming chat via /api/chat."""
+        async with self.client.stream(
+            "POST",
+            f"{self.base_url}/api/chat",
+            json=self._chat_payload(messages, model_name, True, kwargs),
+            timeout=None,
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line:
+                    data = json.loads(line)
+                    yield data.get("message", {}).get("content", "")
+                    if data.get("done", False):
+                        if stats is not None:
+                            # prompt_eval_count only covers the part of the prompt not already cached
+                            stats["prompt_tokens"] = data.get("prompt_eval_count")
+                            stats["completion_tokens"] = data.get("eval_count")
+                            if data.get("eval_duration"):
+                                stats["eval_duration"] = data["eval_duration"] / 1e9
+                        break
@@ -0,0 +1,144 @@
+"""
+In-flight request deduplication for Flint backends.
+Identical generations that overlap in time share one upstream call, and its
+stream is fanned out to every caller.
+"""
+
+import asyncio
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+
+from flint.backends.base import BackendWrapper, BaseBackend
+from flint.backends.cache import ResponseCache
+
+
+class _Flight:
+    """One upstream generation and the callers waiting on it."""
+
+    def __init__(self):
+        self.task: Optional[asyncio.Future] = None
+        self.subscribers = 0
+        # Streams only: every chunk so far, so late joiners replay from the start
+        self.chunks: List[str] = []
+        self.stats: Dict[str, Any] = {}
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self._changed = asyncio.Event()
+
+    def notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait(self, seen: int) -> None:
+        """Until there are more than ``seen`` chunks or the stream has ended."""
+        changed = self._changed
+        if len(self.chunks) <= seen and not self.done:
+            await changed.wait()
+
+
+class SingleFlightBackend(BackendWrapper):
+    """
+    Wraps a backend so that concurrent identical ``generate`` or
+    ``generate_stream`` calls (same model, system prompt, prompt and sampling
+    options) run once upstream. Callers that join a stream late first get the
+    chunks produced so far. The upstream call is cancelled only once every
+    caller waiting on it has gone away.
+    """
+
+    def __init__(self, backend: BaseBackend):
+        super().__init__(backend)
+        self._flights: Dict[Tuple[str, str], _Flight] = {}
+
+    def _key(self, prompt: str, model_name: str, system: Optional[str], kwargs) -> str:
+        return ResponseCache.key(self.name, model_name, system, prompt, kwargs)
+
+    @property
+    def in_flight(self) -> int:
+        """Upstream generations currently running."""
+        return len(self._flights)
+
+    def _leave(self, key: Tuple[str, str], flight: _Flight) -> None:
+        flight.subscribers -= 1
+        if flight.subscribers == 0 and not flight.task.done():
+            flight.task.cancel()
+            # A new caller must not join a generation that is being torn down
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def _finish(self, key: Tuple[str, str], flight: _Flight) -> None:
+        flight.done = True
+        flight.notify()
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    async def generate(
+        self,
+        prompt: str,
+        model_name: str,
+        stream: bool = False,
+        system: Optional[str] = None,
+        **kwargs,
+    ) -> str:
+        key = ("generate", self._key(prompt, model_name, system, kwargs))
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _Flight()
+            flight.task = asyncio.ensure_future(
+                self.backend.generate(
+                    prompt, model_name, stream=stream, system=system, **kwargs
+                )
+            )
+            flight.task.add_done_callback(lambda _: self._finish(key, flight))
+        flight.subscribers += 1
+        try:
+            # Shielded so one caller being cancelled doesn't cancel the others
+            return await asyncio.shield(flight.task)
+        finally:
+            self._leave(key, flight)
+
+    async def _produce(
+        self, key: Tuple[str, str], flight: _Flight, inner: AsyncGenerator[str, None]
+    ) -> None:
+        try:
+            async for chunk in inner:
+                flight.chunks.append(chunk)
+                flight.notify()
+        except asyncio.CancelledError:
+            flight.error = asyncio.CancelledError()
+            raise
+        except Exception as e:
+            flight.error = e
+        finally:
+            await inner.aclose()
+            self._finish(key, flight)
+
+    async def generate_stream(
+        self, prompt: str, model_name: str, system: Optional[str] = None, **kwargs
+    ) -> AsyncGenerator[str, None]:
+        stats = kwargs.pop("stats", None)
+        key = ("stream", self._key(prompt, model_name, system, kwargs))
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _Flight()
+            inner = self.backend.generate_stream(
+                prompt, model_name, system=system, stats=flight.stats, **kwargs
+            )
+            flight.task = asyncio.ensure_future(self._produce(key, flight, inner))
+        elif stats is not None:
+            stats["shared"] = True
+        flight.subscribers += 1
+
+        seen = 0
+        try:
+            while True:
+                while seen < len(flight.chunks):
+                    seen += 1
+                    yield flight.chunks[seen - 1]
+                if flight.done:
+                    break
+                await flight.wait(seen)
+            if flight.error is not None:
+                raise flight.error
+            if stats is not None:
+                stats.update(flight.stats)
+        finally:
+            self._leave(key, flight)
@@ -1,76 +1,152 @@
 import typer
-import time
 import asyncio
-from typing import List
+from typing import List, Optional
 from rich.console import Console
-from rich.progress import Progress, SpinnerColumn, TextColumn
-from rich.table import Table
-from flint.backends.ollama import OllamaBackend
+from flint.core.benchmark import run_benchmark, write_results
 
 console = Console()
 
+TASK_PROMPTS = {
+    "summarize": "Explain quantum computing in exactly 50 words.",
+    "coding": "Write a Python function that checks whether a string is a palindrome.",
+    "chat": "What are three tips for writing readable code?",
+}
+
+
+def _parse_concurrency(value: str) -> List[int]:
+    """'4' sweeps 1..4, '1,2,8' runs exactly those levels."""
+    try:
+        if "," in value:
+            levels = [int(v) for v in value.split(",") if v.strip()]
+        else:
+            levels = list(range(1, int(value) + 1))
+    except ValueError:
+        raise typer.BadParameter(f"Invalid concurrency: {value}")
+    if not levels or min(levels) < 1:
+        raise typer.BadParameter("Concurrency levels must be >= 1")
+    return levels
+
+
+def _fmt(seconds: Optional[float]) -> str:
+    return f"{seconds * 1000:.0f} ms" if seconds is not None else "-"
+
 
 def bench(
     models: str = typer.Option(
         ..., "--models", "-m", help="Comma separated list of models to benchmark"
     ),
     task: str = typer.Option(
-        "summarize", "--task", "-t", help="Task type (summarize, coding, etc.)"
+        "summarize", "--task", "-t", help="Task type (summarize, coding, chat)"
+    ),
+    prompt: Optional[str] = typer.Option(
+        None, "--prompt", "-p", help="Custom prompt (overrides --task)"
+    ),
+    backend_name: str = typer.Option(
+        "ollama", "--backend", "-b", help="Backend to use (ollama, lmstudio, llamacpp)"
+    ),
+    runs: int = typer.Option(
+        5, "--runs", "-n", help="Measured requests per concurrency level"
+    ),
+    warmup: int = typer.Option(1, "--warmup", help="Discarded warm-up runs per model"),
+    concurrency: str = typer.Option(
+        "1", "--concurrency", "-c", help="Max level N to sweep 1..N, or a list (1,2,8)"
+    ),
+    output: Optional[str] = typer.Option(
+        None, "--output", "-o", help="Write results to a .json or .csv file"
     ),
 ):
     """
-    Run speed/quality benchmarks across models.
+    Run speed benchmarks across models: TTFT, inter-token latency and throughput.
     """
+    from rich.progress import Progress, SpinnerColumn, TextColumn
+    from rich.table import Table
+    from flint.backends import get_backend
+
+    label = task if prompt is None else "custom"
+    if prompt is None:
+        if task not in TASK_PROMPTS:
+            console.print(
+                f" [bold red]Error:[/bold red] Unknown task '{task}'. Choose from: {', '.join(TASK_PROMPTS)}"
+            )
+            raise typer.Exit(1)
+        prompt = TASK_PROMPTS[task]
+
+    levels = _parse_concurrency(concurrency)
     model_list = [m.strip() for m in models.split(",")]
-    backend = OllamaBackend()
+
+    try:
+        backend = get_backend(
+            backend_name, max_connections=max(levels), cache=False, single_flight=False
+        )
+    except ValueError as e:
+        console.print(f" [bold red]Error:[/bold red] {e}")
+        raise typer.Exit(1)
 
     console.print(
-        f" Starting Benchmark: [bold]{task}[/bold] across {len(model_list)} models"
+        f" Starting Benchmark: [bold]{label}[/bold] "
+        f"across {len(model_list)} models via {backend.name} "
+        f"({runs} runs, concurrency {', '.join(map(str, levels))})"
     )
 
-    # Very simple stub benchmark logic to measure tokens/sec roughly
-    prompt = "Explain quantum computing in exactly 50 words."
-
     results = []
 
     async def _run_bench():
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            transient=True,
-        ) as progress:
-
-            for m in model_list:
-                progress.add_task(description=f"Benchmarking {m}...", total=None)
-                start_time = time.time()
-                try:
-                    text = await backend.generate(prompt=prompt, model_name=m)
-
-                    elapsed = time.time() - start_time
-                    words = len(text.split())
-                    # Rough token estimate
-                    tokens = words * 1.3
-                    tps = tokens / elapsed
-
-                    results.append(
-                        {"model": m, "tps": round(tps, 2), "status": "Success"}
-                    )
-                except Exception as e:
-                    results.append({"model": m, "tps": 0.0, "status": "Failed"})
-
-        # Print results
+        async with backend:
+            with Progress(
+                SpinnerColumn(),
+                TextColumn("[progress.description]{task.description}"),
+                transient=True,
+            ) as progress:
+
+                for m in model_list:
+                    progress.add_task(description=f"Benchmarking {m}...", total=None)
+                    try:
+                        results.extend(
+                            await run_benchmark(
+                                backend,
+                                m,
+                                prompt,
+                                repetitions=runs,
+                                warmup=warmup,
+                                concurrency_levels=levels,
+                            )
+                        )
+                    except Exception as e:
+                        console.print(f" [red]{m} failed:[/red] {e}")
+
         table = Table(
             title="Benchmark Results", show_header=True, header_style="bold green"
         )
         table.add_column("Model Name", style="cyan")
-        table.add_column("Est. Tokens/sec", justify="right")
-        table.add_column("Status")
+        table.add_column("Conc.", justify="right")
+        table.add_column("TTFT p50/p95", justify="right")
+        table.add_column("ITL p50/p99", justify="right")
+        table.add_column("Latency p50/p95/p99", justify="right")
+        table.add_column("Tokens/sec", justify="right")
+        table.add_column("Total t/s", justify="right")
+        table.add_column("Errors", justify="right")
 
         for r in results:
             table.add_row(
-                r["model"], f"{r['tps']} t/s" if r["tps"] > 0 else "-", r["status"]
+                r["model"],
+                str(r["concurrency"]),
+                f"{_fmt(r['ttft_p50'])} / {_fmt(r['ttft_p95'])}",
+                f"{_fmt(r['itl_p50'])} / {_fmt(r['itl_p99'])}",
+                f"{_fmt(r['latency_p50'])} / {_fmt(r['latency_p95'])} / {_fmt(r['latency_p99'])}",
+                f"{r['tokens_per_sec']:.1f}" if r["requests"] else "-",
+                f"{r['throughput_tokens_per_sec']:.1f}" if r["requests"] else "-",
+                f"{r['errors']}/{r['requests'] + r['errors']}",
             )
 
         console.print(table)
+        if any(r["token_source"] == "chunks" for r in results):
+            console.print(
+                "[yellow]Note:[/yellow] some backends did not report token counts; "
+                "streamed chunks were counted instead."
+            )
+
+        if output and results:
+            write_results(results, output)
+            console.print(f" Results written to [bold green]{output}[/bold green]")
 
     asyncio.run(_run_bench())
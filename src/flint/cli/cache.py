@@ -0,0 +1,55 @@
+import typer
+from rich.console import Console
+
+app = typer.Typer(help="Inspect and clear the response cache.")
+console = Console()
+
+
+@app.command("stats")
+def stats():
+    """
+    Show how many responses (including map-reduce partial results) are cached
+    and how often the cache was hit.
+    """
+    from rich.table import Table
+    from flint.backends.cache import ResponseCache
+
+    cache = ResponseCache()
+    try:
+        info = cache.stats()
+    finally:
+        cache.close()
+
+    lookups = info["hits"] + info["misses"]
+    table = Table(title="Response Cache")
+    table.add_column("Entries", justify="right")
+    table.add_column("Size", justify="right")
+    table.add_column("Hits", justify="right", style="green")
+    table.add_column("Misses", justify="right")
+    table.add_column("Hit Rate", justify="right")
+    table.add_column("Evictions", justify="right")
+    table.add_row(
+        f"{info['entries']:,}",
+        f"{info['bytes'] / (1024 * 1024):.1f} MB",
+        f"{info['hits']:,}",
+        f"{info['misses']:,}",
+        f"{info['hits'] / lookups:.0%}" if lookups else "-",
+        f"{info['evictions']:,}",
+    )
+    console.print(table)
+    console.print(f" [dim]{cache.path}[/dim]")
+
+
+@app.command("clear")
+def clear():
+    """
+    Remove all cached responses and map-reduce partial results.
+    """
+    from flint.backends.cache import ResponseCache
+
+    cache = ResponseCache()
+    try:
+        cache.clear()
+    finally:
+        cache.close()
+    console.print(" [bold green]Response cache cleared.[/bold green]")
@@ -2,12 +2,9 @@ import typer
 import asyncio
 import os
 import re
-import difflib
 from pathlib import Path
 from rich.console import Console
-from rich.syntax import Syntax
 from rich.prompt import Confirm
-from flint.backends import get_backend
 
 console = Console()
 
@@ -43,6 +40,11 @@ def code(
         )
         raise typer.Exit(1)
 
+    import difflib
+    from rich.syntax import Syntax
+    from flint.backends import get_backend
+    from flint.core.context import ContextBuilder, context_window, count_tokens
+
     try:
         backend = get_backend(backend_name)
     except ValueError as e:
@@ -64,61 +66,79 @@ def code(
         "Your output must be completely ready to overwrite the original file."
     )
 
-    user_prompt = (
-        f"File Contents:\n```\n{file_content}\n```\n\nInstruction: {instruction}"
-    )
-
     async def _run():
-        try:
-            # We don't stream here because we want to parse the final output block cleanly
-            # and write it to disk all at once.
-            response = await backend.generate(
-                prompt=user_prompt,
-                model_name=model_name,
-                system=system_prompt,
-                stream=False,
+        async with backend:
+            # The answer repeats the whole file, so it needs as much room as the file
+            window = await context_window(backend, model_name)
+            answer_tokens = count_tokens(file_content)
+            builder = ContextBuilder(
+                window - answer_tokens - count_tokens(system_prompt)
             )
-
-            new_code = extract_code_block(response)
-
-            # Simple safety check: if the model returned nothing or just garbage
-            if not new_code:
+            builder.add(
+                "file", f"File Contents:\n```\n{file_content}\n```", required=True
+            )
+            builder.add("instruction", f"Instruction: {instruction}", required=True)
+            user_prompt, report = builder.build()
+            if report.over_budget:
+                needed = window - report.budget + report.used
                 console.print(
-                    " [bold red]Error:[/bold red] The model returned an empty script."
+                    f" [bold red]Error:[/bold red] {file_path.name} is too large for {model_name}: "
+                    f"the prompt and the rewritten file need ~{needed:,} tokens, but its context window is {window:,}."
                 )
                 raise typer.Exit(1)
 
-            # Generate diff
-            original_lines = file_content.splitlines(keepends=True)
-            new_lines = new_code.splitlines(keepends=True)
-            diff = "".join(
-                difflib.unified_diff(
-                    original_lines,
-                    new_lines,
-                    fromfile=f"a/{file_path.name}",
-                    tofile=f"b/{file_path.name}",
+            try:
+                # We don't stream here because we want to parse the final output block cleanly
+                # and write it to disk all at once.
+                response = await backend.generate(
+                    prompt=user_prompt,
+                    model_name=model_name,
+                    system=system_prompt,
+                    stream=False,
                 )
-            )
-
-            if not diff:
-                console.print(" [yellow]No changes were suggested by the AI.[/yellow]")
-                raise typer.Exit(0)
-
-            console.print("\n[bold cyan]Proposed Changes:[/bold cyan]")
-            console.print(Syntax(diff, "diff", theme="monokai", padding=1))
 
-            if Confirm.ask("\nApply these changes?"):
-                with open(file_path, "w", encoding="utf-8") as f:
-                    f.write(new_code)
-                console.print(
-                    f" Success! In-place modification written to [bold green]{file_path}[/bold green]."
+                new_code = extract_code_block(response)
+
+                # Simple safety check: if the model returned nothing or just garbage
+                if not new_code:
+                    console.print(
+                        " [bold red]Error:[/bold red] The model returned an empty script."
+                    )
+                    raise typer.Exit(1)
+
+                # Generate diff
+                original_lines = file_content.splitlines(keepends=True)
+                new_lines = new_code.splitlines(keepends=True)
+                diff = "".join(
+                    difflib.unified_diff(
+                        original_lines,
+                        new_lines,
+                        fromfile=f"a/{file_path.name}",
+                        tofile=f"b/{file_path.name}",
+                    )
                 )
-            else:
-                console.print(" [yellow]Operation aborted by user.[/yellow]")
-                raise typer.Exit(0)
 
-        except Exception as e:
-            console.print(f"\n[red]Error generating code:[/red] {e}")
-            raise typer.Exit(1)
+                if not diff:
+                    console.print(
+                        " [yellow]No changes were suggested by the AI.[/yellow]"
+                    )
+                    raise typer.Exit(0)
+
+                console.print("\n[bold cyan]Proposed Changes:[/bold cyan]")
+                console.print(Syntax(diff, "diff", theme="monokai", padding=1))
+
+                if Confirm.ask("\nApply these changes?"):
+                    with open(file_path, "w", encoding="utf-8") as f:
+                        f.write(new_code)
+                    console.print(
+                        f" Success! In-place modification written to [bold green]{file_path}[/bold green]."
+                    )
+                else:
+                    console.print(" [yellow]Operation aborted by user.[/yellow]")
+                    raise typer.Exit(0)
+
+            except Exception as e:
+                console.print(f"\n[red]Error generating code:[/red] {e}")
+                raise typer.Exit(1)
 
     asyncio.run(_run())
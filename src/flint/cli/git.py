@@ -1,8 +1,8 @@
 import typer
 import asyncio
 import subprocess
+from typing import Optional
 from rich.console import Console
-from flint.backends import get_backend
 
 console = Console()
 app = typer.Typer(help="Git-integrated local AI commands.")
@@ -26,6 +26,147 @@ def _get_git_diff(staged: bool = True) -> str:
         raise typer.Exit(1)
 
 
+# Diffs of these files are packed last when a diff exceeds the context budget
+LOW_PRIORITY_SUFFIXES = (".lock", "-lock.json", ".min.js", ".min.css", ".svg", ".map")
+
+
+async def _diff_prompt(backend, model_name: str, header: str, diff: str, footer: str):
+    """
+    Build a prompt around ``diff`` that fits the model's context budget.
+    Files that do not fit are summarized, truncated or dropped; returns the
+    prompt and the ContextReport describing what was cut.
+    """
+    from flint.core.context import ContextBuilder, prompt_budget
+    from flint.core.diff import split_files, summarize_file
+
+    builder = ContextBuilder(await prompt_budget(backend, model_name), separator="\n")
+    builder.add("header", f"{header}\n```diff".lstrip(), required=True)
+    for path, file_diff in split_files(diff):
+        builder.add(
+            path,
+            file_diff,
+            priority=0 if path.endswith(LOW_PRIORITY_SUFFIXES) else 1,
+            truncate=True,
+            summary=summarize_file(path, file_diff),
+        )
+    builder.add("footer", f"```\n\n{footer}".rstrip(), required=True)
+    return builder.build()
+
+
+# Map-phase chunks are kept at or below this size even for large context windows,
+# so they run in parallel and an edit only invalidates the cached results nearby
+MAP_CHUNK_TOKENS = 2048
+
+
+async def _map_reduce_prompt(
+    backend,
+    model_name: str,
+    diff: str,
+    instruction: str,
+    system: str,
+    header: str,
+    footer: str,
+    concurrency: int,
+    use_cache: bool,
+):
+    """
+    Run ``instruction`` over each file or hunk of ``diff`` concurrently, then
+    build a prompt around the partial results that fits the context budget.
+    Partial results are cached by chunk content, so re-running after a small
+    change only sends the chunks that changed.
+    """
+    from flint.core.context import ContextBuilder, count_tokens, prompt_budget
+    from flint.core.diff import diff_chunks
+    from flint.backends.cache import ResponseCache
+    from flint.core.mapreduce import map_chunks
+
+    def make_prompt(chunk):
+        return f"{instruction} ({chunk['path']})\n```diff\n{chunk['text']}\n```"
+
+    budget = await prompt_budget(backend, model_name)
+    room = budget - count_tokens(make_prompt({"path": "", "text": ""}) + system)
+    chunks = diff_chunks(diff, max(min(room, MAP_CHUNK_TOKENS), 1))
+    cache = ResponseCache() if use_cache else None
+    done = {"count": 0, "cached": 0}
+
+    with console.status(f" Processing {len(chunks)} part(s) of the diff...") as status:
+
+        def on_result(chunk, cached):
+            done["count"] += 1
+            done["cached"] += cached
+            status.update(
+                f" Processed {done['count']}/{len(chunks)} part(s) of the diff"
+                f" ({done['cached']} cached)..."
+            )
+
+        try:
+            results = await map_chunks(
+                backend,
+                model_name,
+                chunks,
+                make_prompt,
+                system=system,
+                concurrency=concurrency,
+                cache=cache,
+                on_result=on_result,
+            )
+        finally:
+            if cache is not None:
+                cache.close()
+    console.print(
+        f" Processed {len(chunks)} part(s) of the diff ({done['cached']} cached)."
+    )
+
+    builder = ContextBuilder(budget)
+    builder.add("header", header, required=True)
+    for i, (chunk, result) in enumerate(zip(chunks, results)):
+        builder.add(
+            f"{chunk['path']} #{i + 1}",
+            f"### {chunk['path']}\n{result.strip()}",
+            truncate=True,
+        )
+    builder.add("footer", footer, required=True)
+    return builder.build()
+
+
+async def _build_prompt(
+    backend,
+    model_name: str,
+    diff: str,
+    header: str,
+    footer: str,
+    map_reduce: Optional[bool],
+    map_reduce_args: dict,
+):
+    """
+    A prompt for the whole diff when it fits the context budget, else one
+    built from per-chunk partial results. ``map_reduce`` forces either way.
+    """
+    from flint.core.context import count_tokens, prompt_budget
+
+    if map_reduce is None:
+        map_reduce = count_tokens(diff) > await prompt_budget(backend, model_name)
+    if map_reduce:
+        prompt, report = await _map_reduce_prompt(
+            backend, model_name, diff, **map_reduce_args
+        )
+        _print_context_report(report, model_name, "The partial results")
+    else:
+        prompt, report = await _diff_prompt(backend, model_name, header, diff, footer)
+        _print_context_report(report, model_name)
+    return prompt
+
+
+def _print_context_report(report, model_name: str, what: str = "The diff") -> None:
+    if not report.cuts:
+        return
+    console.print(
+        f" [yellow]{what} exceeded {model_name}'s context budget ({report.budget:,} tokens); shortened:[/yellow]"
+    )
+    for line in report.describe():
+        console.print(f"   [yellow]- {line}[/yellow]")
+
+
 @app.command("commit")
 def generate_commit(
     auto_commit: bool = typer.Option(
@@ -37,6 +178,19 @@ def generate_commit(
     model_name: str = typer.Option(
         "qwen2.5:0.5b", "--model", "-m", help="Model to use"
     ),
+    map_reduce: Optional[bool] = typer.Option(
+        None,
+        "--map-reduce/--single-prompt",
+        help="Process the diff in parts and combine the results (default: only when it doesn't fit the context window)",
+    ),
+    concurrency: int = typer.Option(
+        4, "--concurrency", "-j", help="Parts of the diff to process at once"
+    ),
+    no_cache: bool = typer.Option(
+        False,
+        "--no-cache",
+        help="Don't reuse earlier results for unchanged (parts of) diffs",
+    ),
 ):
     """
     Generate a commit message based on your staged changes using a local AI model.
@@ -53,8 +207,10 @@ def generate_commit(
             console.print("[cyan]No changes found to commit.[/cyan]")
         raise typer.Exit(0)
 
+    from flint.backends import get_backend
+
     try:
-        backend = get_backend(backend_name)
+        backend = get_backend(backend_name, cache=False if no_cache else None)
     except ValueError as e:
         console.print(f" [bold red]Error:[/bold red] {e}")
         raise typer.Exit(1)
@@ -67,55 +223,75 @@ def generate_commit(
         "OUTPUT ONLY the commit message. "
         "Do not wrap it in a code block or include greetings."
     )
-    user_prompt = f"```diff\n{diff}\n```\n\nGenerate the commit message."
 
     async def _run():
-        try:
-            commit_message = await backend.generate(
-                prompt=user_prompt,
-                model_name=model_name,
-                system=system_prompt,
-                stream=False,
-            )
-            commit_message = commit_message.strip()
-            # Remove any markdown code blocks the model might have still injected
-            if commit_message.startswith("```") and commit_message.endswith("```"):
-                lines = commit_message.split("\n")[1:-1]
-                commit_message = "\n".join(lines).strip()
-
-            console.print("\n[bold green]Suggested Commit Message:[/bold green]")
-            console.print("-" * 40)
-            console.print(commit_message)
-            console.print("-" * 40 + "\n")
-
-            if auto_commit:
-                result = subprocess.run(
-                    ["git", "commit", "-m", commit_message],
-                    capture_output=True,
-                    text=True,
+        async with backend:
+            try:
+                user_prompt = await _build_prompt(
+                    backend,
+                    model_name,
+                    diff,
+                    "",
+                    "Generate the commit message.",
+                    map_reduce,
+                    dict(
+                        instruction="Summarize in one or two short sentences what this part of a diff changes",
+                        system="You are an expert developer summarizing code changes. Output only the summary.",
+                        header="These are summaries of the parts of one change:",
+                        footer="Generate the commit message for the whole change.",
+                        concurrency=concurrency,
+                        use_cache=not no_cache,
+                    ),
                 )
-                if result.returncode == 0:
-                    console.print(" [bold green]Successfully committed![/bold green]")
-                else:
-                    console.print(
-                        f" [bold red]Git commit failed:[/bold red]\n{result.stderr}"
-                    )
-            elif typer.confirm("Would you like to commit with this message now?"):
-                result = subprocess.run(
-                    ["git", "commit", "-m", commit_message],
-                    capture_output=True,
-                    text=True,
+                commit_message = await backend.generate(
+                    prompt=user_prompt,
+                    model_name=model_name,
+                    system=system_prompt,
+                    stream=False,
                 )
-                if result.returncode == 0:
-                    console.print(" [bold green]Successfully committed![/bold green]")
-                else:
-                    console.print(
-                        f" [bold red]Git commit failed:[/bold red]\n{result.stderr}"
+                commit_message = commit_message.strip()
+                # Remove any markdown code blocks the model might have still injected
+                if commit_message.startswith("```") and commit_message.endswith("```"):
+                    lines = commit_message.split("\n")[1:-1]
+                    commit_message = "\n".join(lines).strip()
+
+                console.print("\n[bold green]Suggested Commit Message:[/bold green]")
+                console.print("-" * 40)
+                console.print(commit_message)
+                console.print("-" * 40 + "\n")
+
+                if auto_commit:
+                    result = subprocess.run(
+                        ["git", "commit", "-m", commit_message],
+                        capture_output=True,
+                        text=True,
                     )
+                    if result.returncode == 0:
+                        console.print(
+                            " [bold green]Successfully committed![/bold green]"
+                        )
+                    else:
+                        console.print(
+                            f" [bold red]Git commit failed:[/bold red]\n{result.stderr}"
+                        )
+                elif typer.confirm("Would you like to commit with this message now?"):
+                    result = subprocess.run(
+                        ["git", "commit", "-m", commit_message],
+                        capture_output=True,
+                        text=True,
+                    )
+                    if result.returncode == 0:
+                        console.print(
+                            " [bold green]Successfully committed![/bold green]"
+                        )
+                    else:
+                        console.print(
+                            f" [bold red]Git commit failed:[/bold red]\n{result.stderr}"
+                        )
 
-        except Exception as e:
-            console.print(f"\n[red]Error generating commit message:[/red] {e}")
-            raise typer.Exit(1)
+            except Exception as e:
+                console.print(f"\n[red]Error generating commit message:[/red] {e}")
+                raise typer.Exit(1)
 
     asyncio.run(_run())
 
@@ -131,6 +307,19 @@ def code_review(
     model_name: str = typer.Option(
         "qwen2.5:0.5b", "--model", "-m", help="Model to use"
     ),
+    map_reduce: Optional[bool] = typer.Option(
+        None,
+        "--map-reduce/--single-prompt",
+        help="Process the diff in parts and combine the results (default: only when it doesn't fit the context window)",
+    ),
+    concurrency: int = typer.Option(
+        4, "--concurrency", "-j", help="Parts of the diff to process at once"
+    ),
+    no_cache: bool = typer.Option(
+        False,
+        "--no-cache",
+        help="Don't reuse earlier results for unchanged (parts of) diffs",
+    ),
 ):
     """
     Perform an AI code review on your current git diff.
@@ -140,8 +329,11 @@ def code_review(
         console.print("[cyan]No changes found to review.[/cyan]")
         raise typer.Exit(0)
 
+    from flint.backends import get_backend
+    from flint.core.cancellation import run_cancellable
+
     try:
-        backend = get_backend(backend_name)
+        backend = get_backend(backend_name, cache=False if no_cache else None)
     except ValueError as e:
         console.print(f" [bold red]Error:[/bold red] {e}")
         raise typer.Exit(1)
@@ -153,17 +345,57 @@ def code_review(
         "Focus on pointing out potential bugs, security vulnerabilities, or anti-patterns.\n"
         "Provide constructive and concise feedback. If the code looks perfect, say so briefly.\n"
     )
-    user_prompt = f"Please review this diff:\n```diff\n{diff}\n```"
 
     async def _run():
-        try:
-            async for chunk in backend.generate_stream(
-                prompt=user_prompt, model_name=model_name, system=system_prompt
-            ):
-                console.print(chunk, end="")
-            console.print("\n")
-        except Exception as e:
-            console.print(f"\n[red]Error generating review:[/red] {e}")
-            raise typer.Exit(1)
+        async with backend:
+            stats = {}
+            try:
+                user_prompt = await _build_prompt(
+                    backend,
+                    model_name,
+                    diff,
+                    "Please review this diff:",
+                    "",
+                    map_reduce,
+                    dict(
+                        instruction=(
+                            "Review this part of a larger change. List concrete problems "
+                            "with the lines they concern, or reply only 'No issues.'"
+                        ),
+                        system=system_prompt,
+                        header="These are reviews of the parts of one change:",
+                        footer=(
+                            "Merge them into one concise review grouped by file. "
+                            "Drop duplicates and parts without issues."
+                        ),
+                        concurrency=concurrency,
+                        use_cache=not no_cache,
+                    ),
+                )
+            except Exception as e:
+                console.print(f"\n[red]Error generating review:[/red] {e}")
+                raise typer.Exit(1)
+
+            async def _print():
+                stream = backend.stream(
+                    user_prompt, model_name, system=system_prompt, stats=stats
+                )
+                try:
+                    async for chunk in stream:
+                        console.print(chunk, end="")
+                finally:
+                    await stream.aclose()
+
+            try:
+                # Ctrl+C stops the review and closes the backend stream
+                completed, _ = await run_cancellable(_print())
+                console.print("\n")
+                if not completed:
+                    console.print(
+                        f"[yellow]Review cancelled (~{stats.get('tokens_saved', 0)} tokens saved).[/yellow]"
+                    )
+            except Exception as e:
+                console.print(f"\n[red]Error generating review:[/red] {e}")
+                raise typer.Exit(1)
 
     asyncio.run(_run())
@@ -1,11 +1,6 @@
 import typer
 from rich.console import Console
 
-try:
-    from memory.vector_store import VectorStore
-except ImportError:
-    VectorStore = None
-
 app = typer.Typer(help="Manage and query the local codebase vector memory.")
 console = Console()
 
@@ -13,17 +8,55 @@ console = Console()
 @app.command()
 def index(
     directory: str = typer.Argument(".", help="The directory to index."),
+    force: bool = typer.Option(
+        False, "--force", help="Re-index every file, even if unchanged."
+    ),
+    workers: int = typer.Option(
+        0, "--workers", "-w", help="Chunking processes (default: one per CPU core)."
+    ),
+    chunking: str = typer.Option(
+        "syntax",
+        "--chunking",
+        help="Chunking mode: 'syntax' (functions/classes, blocks) or 'tokens' (raw windows).",
+    ),
+    max_memory: int = typer.Option(
+        64,
+        "--max-memory",
+        help="Memory ceiling in MB for files in flight and buffered chunks.",
+    ),
 ):
     """Index a directory into the local vector store."""
-    if VectorStore is None:
+    # Checked before loading chromadb and tiktoken, which takes seconds
+    if chunking not in ("syntax", "tokens"):
+        console.print(f"[red]Unknown chunking mode: {chunking}[/red]")
+        raise typer.Exit(1)
+
+    from memory.vector_store import VectorStore, dependencies_available
+
+    if not dependencies_available():
         console.print(
             "[red]VectorStore dependencies are missing. Please ensure chromadb and tiktoken are installed.[/red]"
         )
         raise typer.Exit(1)
 
-    console.print(f"Indexing directory: [bold]{directory}[/bold]")
+    # index_directory announces the directory itself
     store = VectorStore()
-    store.index_directory(directory)
+    if workers > 0:
+        store.workers = workers
+    store.chunk_mode = chunking
+    store.max_buffer_bytes = max_memory * 1024 * 1024
+
+    with console.status("Scanning files...") as status:
+
+        def on_progress(stats):
+            rate = stats["files"] / stats["elapsed"] if stats["elapsed"] else 0.0
+            failed = f", {stats['failed']} failed" if stats["failed"] else ""
+            status.update(
+                f"Indexed {stats['files']} files, {stats['chunks']} chunks{failed} "
+                f"({rate:.1f} files/s)"
+            )
+
+        store.index_directory(directory, force=force, on_progress=on_progress)
     console.print("[green]Indexing complete![/green]")
 
 
@@ -31,14 +64,33 @@ def index(
 def search(
     query: str = typer.Argument(..., help="The search query."),
     k: int = typer.Option(5, "--results", "-k", help="Number of results to return."),
+    mode: str = typer.Option(
+        "hybrid",
+        "--mode",
+        "-m",
+        help="Retrieval mode: 'vector', 'lexical' (BM25, no embedding model) or 'hybrid'.",
+    ),
 ):
     """Search the vector store for relevant code context."""
-    if VectorStore is None:
-        console.print("[red]VectorStore dependencies are missing.[/red]")
+    if mode not in ("vector", "lexical", "hybrid"):
+        console.print(f"[red]Unknown search mode: {mode}[/red]")
         raise typer.Exit(1)
 
-    store = VectorStore()
-    results = store.search(query, k=k)
+    import os
+    from memory.lexical import LexicalIndex
+
+    if mode == "lexical" and os.path.exists(LexicalIndex.store_path()):
+        # Fast path: reads the on-disk inverted index only
+        with LexicalIndex.for_store() as lexical:
+            results = lexical.search(query, k=k)
+    else:
+        from memory.vector_store import VectorStore, dependencies_available
+
+        if not dependencies_available():
+            console.print("[red]VectorStore dependencies are missing.[/red]")
+            raise typer.Exit(1)
+        store = VectorStore()
+        results = store.search(query, k=k, mode=mode)
 
     if not results:
         console.print("No results found.")
@@ -47,9 +99,12 @@ def search(
     console.print(f"\n[bold]Top {len(results)} matches for '{query}':[/bold]\n")
     for i, res in enumerate(results, 1):
         meta = res.get("metadata", {})
-        console.print(
-            f"[bold cyan]{i}. File:[/bold cyan] {meta.get('file', 'Unknown')}"
-        )
+        location = meta.get("file", "Unknown")
+        if meta.get("start_line"):
+            location += f":{meta['start_line']}-{meta['end_line']}"
+        if meta.get("symbol"):
+            location += f" ({meta['symbol']})"
+        console.print(f"[bold cyan]{i}. File:[/bold cyan] {location}")
 
         # Print a snippet of the document
         doc = res.get("document", "")
@@ -1,9 +1,6 @@
 import typer
 import asyncio
 from rich.console import Console
-from rich.table import Table
-from flint.backends.ollama import OllamaBackend
-from flint.core.model import Model
 
 console = Console()
 
@@ -60,6 +57,7 @@ def list_models():
     """
     List downloaded local models across all supported backends.
     """
+    from rich.table import Table
     from flint.backends import get_all_backends
 
     async def _list():
@@ -68,6 +66,7 @@ def list_models():
         # Concurrently fetch models from all backends
         tasks = [b.list_models() for b in backends]
         results = await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.gather(*(b.aclose() for b in backends))
 
         models = []
         for result in results:
@@ -109,6 +108,7 @@ def run(
     Run a model with a prompt or start an interactive chat.
     """
     from flint.backends import get_backend
+    from flint.core.cancellation import run_cancellable
 
     try:
         backend = get_backend(backend_name)
@@ -116,34 +116,66 @@ def run(
         console.print(f" [bold red]Error:[/bold red] {e}")
         raise typer.Exit(1)
 
-    async def _run():
-        if prompt:
-            console.print(
-                f" [bold cyan]{model_name}[/bold cyan] (via {backend.name}): ", end=""
-            )
-            # Streaming output
+    async def _generate(open_stream) -> str:
+        # Ctrl+C cancels this generation (closing the backend stream) instead of exiting
+        stats = {}
+        parts = []
+
+        async def _print():
+            stream = open_stream(stats)
             try:
-                async for chunk in backend.generate_stream(prompt, model_name):
+                async for chunk in stream:
+                    parts.append(chunk)
                     console.print(chunk, end="")
-                console.print()  # newline
-            except Exception as e:
-                console.print(f"\n[red]Error:[/red] {e}")
+            finally:
+                await stream.aclose()
 
-        else:
+        completed, _ = await run_cancellable(_print())
+        console.print()  # newline
+        if not completed:
             console.print(
-                f" Starting interactive chat with [bold cyan]{model_name}[/bold cyan] via {backend.name}. Type 'exit' to quit."
+                f"[yellow]Generation cancelled (~{stats.get('tokens_saved', 0)} tokens saved).[/yellow]"
             )
-            while True:
-                user_input = typer.prompt("You")
-                if user_input.lower() in ["exit", "quit"]:
-                    break
+        return "".join(parts)
 
-                console.print(f" [bold cyan]{model_name}[/bold cyan]: ", end="")
+    async def _run():
+        async with backend:
+            if prompt:
+                console.print(
+                    f" [bold cyan]{model_name}[/bold cyan] (via {backend.name}): ",
+                    end="",
+                )
+                # Streaming output
                 try:
-                    async for chunk in backend.generate_stream(user_input, model_name):
-                        console.print(chunk, end="")
-                    console.print()
+                    await _generate(
+                        lambda stats: backend.stream(prompt, model_name, stats=stats)
+                    )
                 except Exception as e:
                     console.print(f"\n[red]Error:[/red] {e}")
 
+            else:
+                console.print(
+                    f" Starting interactive chat with [bold cyan]{model_name}[/bold cyan] via {backend.name}. Type 'exit' to quit."
+                )
+                # The conversation is only ever appended to, so the backend can
+                # reuse its cached prefix and each turn prefills just the new messages
+                messages = []
+                while True:
+                    user_input = typer.prompt("You")
+                    if user_input.lower() in ["exit", "quit"]:
+                        break
+
+                    console.print(f" [bold cyan]{model_name}[/bold cyan]: ", end="")
+                    messages.append({"role": "user", "content": user_input})
+                    try:
+                        reply = await _generate(
+                            lambda stats: backend.stream_chat(
+                                messages, model_name, stats=stats
+                            )
+                        )
+                        messages.append({"role": "assistant", "content": reply})
+                    except Exception as e:
+                        messages.pop()
+                        console.print(f"\n[red]Error:[/red] {e}")
+
     asyncio.run(_run())
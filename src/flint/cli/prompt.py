@@ -1,9 +1,8 @@
 import typer
 import asyncio
-from typing import List
+from typing import List, Optional
 from rich.console import Console
 from flint.core.prompt import Prompt
-from flint.backends.ollama import OllamaBackend
 
 app = typer.Typer()
 console = Console()
@@ -26,6 +25,96 @@ def save_prompt(name: str, file_path: str):
         raise typer.Exit(1)
 
 
+def _read_records(path: str, defaults: dict):
+    """Variables for each line of a JSON lines file, over ``defaults``."""
+    import json
+
+    with open(path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise typer.BadParameter(f"{path} line {number}: invalid JSON ({e})")
+            if not isinstance(record, dict):
+                raise typer.BadParameter(
+                    f"{path} line {number}: expected a JSON object of variables, "
+                    f"got {type(record).__name__}"
+                )
+            yield {**defaults, **record}
+
+
+def _run_batch(
+    p: Prompt,
+    model: str,
+    defaults: dict,
+    input_path: str,
+    output_path: Optional[str],
+    concurrency: int,
+    retries: int,
+    ordered: bool,
+):
+    """Run the prompt once per input record, writing JSON lines results."""
+    import json
+    import os
+    from flint.core.chain import Chain
+    from flint.core.model import Model
+
+    if not os.path.exists(input_path):
+        console.print(f" Could not find input file {input_path}")
+        raise typer.Exit(1)
+
+    chain = Chain().add(p).add(Model(model))
+    # Results go to stdout unless written to a file, so progress goes to stderr
+    status_console = Console(stderr=True)
+    counts = {"done": 0, "failed": 0}
+
+    async def _run():
+        stream = chain.stream_map(
+            _read_records(input_path, defaults),
+            concurrency=concurrency,
+            ordered=ordered,
+            retries=retries,
+            # The output file doubles as the checkpoint, so re-running resumes
+            checkpoint=output_path,
+            return_exceptions=True,
+        )
+        with status_console.status(
+            f" Running [bold cyan]{model}[/bold cyan]..."
+        ) as status:
+            try:
+                async for index, result in stream:
+                    if isinstance(result, Exception):
+                        counts["failed"] += 1
+                        status_console.print(
+                            f" [red]Record {index} failed:[/red] {result}"
+                        )
+                    else:
+                        counts["done"] += 1
+                        if output_path is None:
+                            print(json.dumps({"index": index, "result": result}))
+                    status.update(
+                        f" Running [bold cyan]{model}[/bold cyan]: "
+                        f"{counts['done']} done, {counts['failed']} failed..."
+                    )
+            finally:
+                await stream.aclose()
+
+    try:
+        asyncio.run(_run())
+    except ValueError as e:
+        status_console.print(f" [red]Invalid input:[/red] {e}")
+        raise typer.Exit(1)
+
+    status_console.print(
+        f" {counts['done']} record(s) done, {counts['failed']} failed"
+        + (f"; results in {output_path}" if output_path else "")
+    )
+    if counts["failed"]:
+        raise typer.Exit(1)
+
+
 @app.command("run")
 def run_prompt(
     name: str = typer.Argument(..., help="Name of the prompt or path to file"),
@@ -33,6 +122,31 @@ def run_prompt(
     var: List[str] = typer.Option(
         [], "--var", "-v", help="Variables for interpolation (e.g. -v attr=value)"
     ),
+    input_path: Optional[str] = typer.Option(
+        None,
+        "--input",
+        "-i",
+        help="JSON lines file with the variables for one run per line",
+    ),
+    output_path: Optional[str] = typer.Option(
+        None,
+        "--output",
+        "-o",
+        help="Write --input results here (re-running resumes) instead of stdout",
+    ),
+    concurrency: int = typer.Option(
+        4, "--concurrency", "-j", help="Records to run at once with --input"
+    ),
+    retries: int = typer.Option(
+        2,
+        "--retries",
+        help="Times to retry a record with --input after a connection error, timeout or 5xx",
+    ),
+    ordered: bool = typer.Option(
+        True,
+        "--ordered/--unordered",
+        help="Emit --input results in input order, or as they finish",
+    ),
 ):
     """
     Execute a saved prompt template.
@@ -43,6 +157,17 @@ def run_prompt(
             key, val = v.split("=", 1)
             kwargs[key] = val
 
+    if input_path is not None:
+        try:
+            p = Prompt.load(name)
+        except FileNotFoundError as e:
+            console.print(f" Failed to load prompt: {e}")
+            raise typer.Exit(1)
+        _run_batch(
+            p, model, kwargs, input_path, output_path, concurrency, retries, ordered
+        )
+        return
+
     try:
         p = Prompt.load(name)
         formatted_prompt = p.format(**kwargs)
@@ -50,17 +175,20 @@ def run_prompt(
         console.print(f" Failed to load/format prompt: {e}")
         raise typer.Exit(1)
 
-    backend = OllamaBackend()
+    from flint.backends import get_backend
+
+    backend = get_backend("ollama")
 
     async def _run():
-        console.print(
-            f" Running [bold cyan]{model}[/bold cyan] with prompt '{name}'..."
-        )
-        try:
-            async for chunk in backend.generate_stream(formatted_prompt, model):
-                console.print(chunk, end="")
-            console.print()
-        except Exception as e:
-            console.print(f"\n[red]Error:[/red] {e}")
+        async with backend:
+            console.print(
+                f" Running [bold cyan]{model}[/bold cyan] with prompt '{name}'..."
+            )
+            try:
+                async for chunk in backend.generate_stream(formatted_prompt, model):
+                    console.print(chunk, end="")
+                console.print()
+            except Exception as e:
+                console.print(f"\n[red]Error:[/red] {e}")
 
     asyncio.run(_run())
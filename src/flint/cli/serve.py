@@ -1,6 +1,4 @@
 import typer
-import asyncio
-from typing import Optional
 from rich.console import Console
 
 console = Console()
@@ -12,23 +10,46 @@ def serve(
     host: str = typer.Option(
         "127.0.0.1", "--host", "-h", help="Host ID to bind the REST API"
     ),
+    backend_name: str = typer.Option(
+        "ollama", "--backend", "-b", help="Backend to use (ollama, lmstudio, llamacpp)"
+    ),
+    max_queue: int = typer.Option(
+        64, "--max-queue", help="Maximum requests waiting or running before 429"
+    ),
+    concurrency: int = typer.Option(
+        1, "--concurrency", "-c", help="Concurrent generations allowed per model"
+    ),
 ):
     """
     Spin up an OpenAI-compatible REST API in front of the local model.
     """
-    console.print(f" Starting OpenAI-compatible API Server on http://{host}:{port}/v1")
-    console.print(f" Default model routing to: [bold cyan]{model}[/bold cyan]")
+    import uvicorn
+    from flint.backends import get_backend
+    from flint.server import create_app, RequestScheduler
 
-    # In a full implementation, this uses uvicorn and fastapi:
-    # import uvicorn
-    # from flint.server.app import app
-    # uvicorn.run(app, host=host, port=port)
+    try:
+        backend = get_backend(backend_name)
+    except ValueError as e:
+        console.print(f" [bold red]Error:[/bold red] {e}")
+        raise typer.Exit(1)
 
-    console.print("[yellow]Note: this is a stub for the architecture demo.[/yellow]")
+    try:
+        scheduler = RequestScheduler(
+            max_queue=max_queue, max_concurrency_per_model=concurrency
+        )
+    except ValueError as e:
+        console.print(f" [bold red]Error:[/bold red] {e}")
+        raise typer.Exit(1)
+
+    console.print(f" Starting OpenAI-compatible API Server on http://{host}:{port}/v1")
+    console.print(
+        f" Default model routing to: [bold cyan]{model}[/bold cyan] via {backend.name}"
+    )
+    console.print(
+        f" Queue limit: {max_queue} requests, {concurrency} concurrent per model"
+    )
     console.print("Press Ctrl+C to exit.")
 
-    # Stub wait
-    try:
-        asyncio.run(asyncio.sleep(3600))
-    except KeyboardInterrupt:
-        console.print("\nServer shutting down.")
+    app = create_app(backend, default_model=model, scheduler=scheduler)
+    uvicorn.run(app, host=host, port=port, log_level="warning")
+    console.print("\nServer shutting down.")
@@ -0,0 +1,153 @@
+"""
+Benchmark engine for Flint.
+Streams generations through any backend and records latency and throughput.
+"""
+
+import asyncio
+import csv
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values: Sequence[float], p: float) -> Optional[float]:
+    """Linearly interpolated percentile of ``values`` (None if empty)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+async def measure_stream(
+    backend, model_name: str, prompt: str, system: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Run one streaming generation and time it.
+
+    Returns time-to-first-token, the gaps between streamed chunks, end-to-end
+    latency and token counts. Counts reported by the backend are preferred;
+    otherwise each streamed chunk is counted as one token.
+    """
+    stats: Dict[str, Any] = {}
+    chunk_times: List[float] = []
+
+    start = time.perf_counter()
+    async for chunk in backend.generate_stream(
+        prompt, model_name, system=system, stats=stats
+    ):
+        if chunk:
+            chunk_times.append(time.perf_counter())
+    end = time.perf_counter()
+
+    ttft = chunk_times[0] - start if chunk_times else None
+    itl = [b - a for a, b in zip(chunk_times, chunk_times[1:])]
+
+    completion_tokens = stats.get("completion_tokens")
+    token_source = "backend"
+    if not completion_tokens:
+        completion_tokens = len(chunk_times)
+        token_source = "chunks"
+
+    # Prefer the backend's own decode time, else time spent after the first token
+    decode_time = stats.get("eval_duration") or (
+        end - chunk_times[0] if chunk_times else 0.0
+    )
+    tps = completion_tokens / decode_time if decode_time > 0 else 0.0
+
+    return {
+        "ttft": ttft,
+        "itl": itl,
+        "latency": end - start,
+        "prompt_tokens": stats.get("prompt_tokens"),
+        "completion_tokens": completion_tokens,
+        "token_source": token_source,
+        "tokens_per_sec": tps,
+    }
+
+
+def summarize(
+    model_name: str,
+    concurrency: int,
+    samples: List[Dict[str, Any]],
+    errors: int,
+    wall: float,
+) -> Dict[str, Any]:
+    """Aggregate per-request samples into one result row."""
+    ttfts = [s["ttft"] for s in samples if s["ttft"] is not None]
+    itls = [gap for s in samples for gap in s["itl"]]
+    latencies = [s["latency"] for s in samples]
+    total_tokens = sum(s["completion_tokens"] for s in samples)
+
+    row: Dict[str, Any] = {
+        "model": model_name,
+        "concurrency": concurrency,
+        "requests": len(samples),
+        "errors": errors,
+        "completion_tokens": total_tokens,
+        "token_source": samples[0]["token_source"] if samples else None,
+        "tokens_per_sec": (
+            sum(s["tokens_per_sec"] for s in samples) / len(samples) if samples else 0.0
+        ),
+        "throughput_tokens_per_sec": total_tokens / wall if wall > 0 else 0.0,
+    }
+    for name, values in (("ttft", ttfts), ("itl", itls), ("latency", latencies)):
+        for p in PERCENTILES:
+            row[f"{name}_p{p}"] = percentile(values, p)
+    return row
+
+
+async def run_benchmark(
+    backend,
+    model_name: str,
+    prompt: str,
+    system: Optional[str] = None,
+    repetitions: int = 5,
+    warmup: int = 1,
+    concurrency_levels: Sequence[int] = (1,),
+) -> List[Dict[str, Any]]:
+    """
+    Benchmark one model: ``warmup`` discarded runs, then ``repetitions``
+    measured requests at each concurrency level. Returns one summary row per level.
+    """
+    for _ in range(warmup):
+        await measure_stream(backend, model_name, prompt, system)
+
+    rows = []
+    for concurrency in concurrency_levels:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def _one():
+            async with semaphore:
+                return await measure_stream(backend, model_name, prompt, system)
+
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *(_one() for _ in range(repetitions)), return_exceptions=True
+        )
+        wall = time.perf_counter() - start
+
+        samples = [r for r in results if not isinstance(r, BaseException)]
+        errors = len(results) - len(samples)
+        rows.append(summarize(model_name, concurrency, samples, errors, wall))
+    return rows
+
+
+def write_results(rows: List[Dict[str, Any]], path: str) -> None:
+    """Write summary rows as JSON, or as CSV when ``path`` ends in ``.csv``."""
+    out = Path(path)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    if out.suffix.lower() == ".csv":
+        fieldnames = list(rows[0].keys()) if rows else []
+        with open(out, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump({"created": time.time(), "results": rows}, f, indent=2)
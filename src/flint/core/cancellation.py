@@ -0,0 +1,97 @@
+"""
+Cancellation support for Flint generations.
+Tracks how much decoding cancelled generations avoided, and lets the CLI
+turn Ctrl+C into cancelling the running generation.
+"""
+
+import asyncio
+import signal
+import threading
+from typing import Any, Awaitable, Dict, Optional, Tuple
+
+
+class GenerationMetrics:
+    """
+    Process-wide counters for streamed generations.
+
+    The tokens saved by a cancellation are estimated as the requested
+    ``max_tokens`` minus what was generated, or, without a limit, as the
+    average length of that model's completed generations minus what was
+    generated.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.completed = 0
+            self.cancelled = 0
+            self.cancelled_tokens = 0
+            self.tokens_saved = 0
+            # model -> (completed generations, their total tokens)
+            self._lengths: Dict[str, Tuple[int, int]] = {}
+
+    def record_completed(self, model_name: str, tokens: int) -> None:
+        with self._lock:
+            self.completed += 1
+            count, total = self._lengths.get(model_name, (0, 0))
+            self._lengths[model_name] = (count + 1, total + tokens)
+
+    def record_cancelled(
+        self, model_name: str, tokens: int, max_tokens: Optional[int] = None
+    ) -> int:
+        """Record a cancelled generation and return its estimated tokens saved."""
+        with self._lock:
+            expected = max_tokens
+            if expected is None and model_name in self._lengths:
+                count, total = self._lengths[model_name]
+                expected = total / count
+            saved = max(0, int(expected - tokens)) if expected is not None else 0
+            self.cancelled += 1
+            self.cancelled_tokens += tokens
+            self.tokens_saved += saved
+            return saved
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "completed": self.completed,
+                "cancelled": self.cancelled,
+                "cancelled_tokens": self.cancelled_tokens,
+                "tokens_saved": self.tokens_saved,
+            }
+
+
+generation_metrics = GenerationMetrics()
+
+
+async def run_cancellable(coro: Awaitable[Any]) -> Tuple[bool, Any]:
+    """
+    Await ``coro`` with Ctrl+C bound to cancelling it rather than the program.
+
+    Returns ``(True, result)`` when it finishes and ``(False, None)`` when it
+    was cancelled by Ctrl+C. Where signal handlers are unavailable (Windows),
+    Ctrl+C still raises KeyboardInterrupt as usual.
+    """
+    loop = asyncio.get_running_loop()
+    task = asyncio.ensure_future(coro)
+    handler_installed = False
+    try:
+        loop.add_signal_handler(signal.SIGINT, task.cancel)
+        handler_installed = True
+    except (NotImplementedError, RuntimeError, ValueError):
+        pass
+
+    try:
+        await asyncio.wait({task})
+    finally:
+        if handler_installed:
+            loop.remove_signal_handler(signal.SIGINT)
+        if not task.done():
+            task.cancel()
+
+    if task.cancelled():
+        return False, None
+    return True, task.result()
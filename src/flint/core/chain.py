@@ -3,17 +3,43 @@ Chain abstraction for Flint.
 A simple way to string prompts and models together, avoiding LangChain bloat.
 """
 
-from typing import List, Dict, Any, Union, Callable
+from typing import (
+    List,
+    Dict,
+    Any,
+    Optional,
+    Tuple,
+    Set,
+    Union,
+    Iterable,
+    AsyncIterable,
+    AsyncGenerator,
+    Callable,
+)
+from string import Formatter
+import asyncio
 import inspect
+import json
+import os
 
 
 class Chain:
     """
     A simple pipeline for executing prompts against models and parsing outputs.
+
+    Steps added with ``add()`` run one after another. Independent work can be
+    declared as named nodes with ``node()``: each node is its own small
+    pipeline whose result is stored under its name, and nodes that don't
+    depend on each other run concurrently. The ``add()`` steps then run last,
+    with every node's output available to their prompts.
     """
 
-    def __init__(self):
+    def __init__(self, concurrency: int = 4):
         self.steps: List[Any] = []
+        # name -> {"steps": [...], "inputs": [...]}, in the order they were added
+        self.nodes: Dict[str, Dict[str, Any]] = {}
+        # Most model calls in flight at once across the whole chain
+        self.concurrency = concurrency
 
     def add(self, step: Any) -> "Chain":
         """
@@ -26,20 +52,84 @@ class Chain:
         self.steps.append(step)
         return self
 
-    async def run(self, **initial_kwargs) -> Any:
+    def node(
+        self, name: str, *steps: Any, inputs: Optional[List[str]] = None
+    ) -> "Chain":
         """
-        Execute the chain sequentially.
+        Add a named node made of ``steps`` (the same kinds ``add()`` takes).
+        Its result is available to later prompts as ``{name}``.
+
+        A node depends on the nodes its prompts reference and on any listed
+        in ``inputs``; a callable that starts a node receives a dict of the
+        chain's variables and its dependencies' outputs.
         """
+        if name in self.nodes:
+            raise ValueError(f"Chain already has a node named '{name}'.")
+        if not steps:
+            raise ValueError(f"Node '{name}' needs at least one step.")
+        self.nodes[name] = {"steps": list(steps), "inputs": list(inputs or [])}
+        return self
+
+    def dependencies(self) -> Dict[str, List[str]]:
+        """The nodes each node waits for, from its prompts and ``inputs``."""
         from flint.core.prompt import Prompt
-        from flint.core.model import Model
-        from flint.backends.ollama import (
-            OllamaBackend,
-        )  # Import here to avoid circular logic initially
 
-        current_state = initial_kwargs
-        current_text = None
+        deps = {}
+        for name, node in self.nodes.items():
+            needed = list(node["inputs"])
+            for step in node["steps"]:
+                if isinstance(step, Prompt):
+                    needed += [
+                        field.split(".")[0].split("[")[0]
+                        for _, field, _, _ in Formatter().parse(step.template)
+                        if field
+                    ]
+            unknown = [d for d in node["inputs"] if d not in self.nodes]
+            if unknown:
+                raise ValueError(
+                    f"Node '{name}' depends on unknown node(s): {', '.join(unknown)}"
+                )
+            deps[name] = list(
+                dict.fromkeys(d for d in needed if d in self.nodes and d != name)
+            )
+        return deps
+
+    def _order(self) -> List[str]:
+        """Nodes in an order that respects their dependencies."""
+        deps = self.dependencies()
+        order: List[str] = []
+        visiting = set()
+
+        def visit(name: str, path: Tuple[str, ...]):
+            if name in order:
+                return
+            if name in visiting:
+                cycle = " -> ".join(path[path.index(name) :] + (name,))
+                raise ValueError(f"Chain nodes form a cycle: {cycle}")
+            visiting.add(name)
+            for dep in deps[name]:
+                visit(dep, path + (name,))
+            visiting.discard(name)
+            order.append(name)
+
+        for name in self.nodes:
+            visit(name, ())
+        return order
 
-        for idx, step in enumerate(self.steps):
+    async def _run_steps(
+        self,
+        steps: List[Any],
+        current_state: Dict[str, Any],
+        backends: Dict[str, Any],
+        semaphore: asyncio.Semaphore,
+        label: str = "",
+        current_text: Any = None,
+    ) -> Tuple[Any, Dict[str, Any]]:
+        """Run ``steps`` in order; returns the final text and state."""
+        from flint.core.prompt import Prompt
+        from flint.core.model import Model
+
+        for idx, step in enumerate(steps):
             if isinstance(step, Prompt):
                 # Format prompt and set it as the current text
                 current_text = step.format(**current_state)
@@ -48,23 +138,26 @@ class Chain:
                 # Execute generation using the model
                 if not current_text:
                     raise ValueError(
-                        f"Model step at index {idx} requires a preceding Prompt step to generate text."
+                        f"Model step at index {idx}{label} requires a preceding Prompt step to generate text."
                     )
 
-                # Use dynamic backend registry
-                from flint.backends import get_backend
-
-                backend = get_backend(step.backend_name)
+                backend = _get_backend(step.backend_name, backends)
 
                 # The generate call returns string text
-                model_output = await backend.generate(
-                    prompt=current_text, model_name=step.name
-                )
+                async with semaphore:
+                    model_output = await backend.generate(
+                        prompt=current_text, model_name=step.name
+                    )
 
                 current_text = model_output
                 # Update state so subsequent prompts can use it if needed, often under 'text' or 'output'
                 current_state["output"] = model_output
 
+            elif is_incremental(step):
+                # Given the whole text as a single chunk when not streaming
+                current_text = await _collect(step(_single(current_text)))
+                current_state["output"] = current_text
+
             elif callable(step):
                 # Call a custom function
                 # if the function is async, await it
@@ -84,7 +177,363 @@ class Chain:
             else:
                 raise TypeError(f"Unsupported chain step type: {type(step)}")
 
-        return current_text
+        return current_text, current_state
+
+    async def _run_nodes(
+        self,
+        initial_kwargs: Dict[str, Any],
+        backends: Dict[str, Any],
+        semaphore: asyncio.Semaphore,
+    ) -> Dict[str, Any]:
+        """Run every node once its dependencies are done; returns their outputs."""
+        deps = self.dependencies()
+        outputs: Dict[str, Any] = {}
+        tasks: Dict[str, asyncio.Future] = {}
+
+        async def run_node(name: str) -> None:
+            if deps[name]:
+                await asyncio.gather(*(tasks[dep] for dep in deps[name]))
+            state = dict(initial_kwargs)
+            state.update({dep: outputs[dep] for dep in deps[name]})
+            text, state = await self._run_steps(
+                self.nodes[name]["steps"],
+                state,
+                backends,
+                semaphore,
+                label=f" of node '{name}'",
+            )
+            outputs[name] = text if text is not None else state
+
+        for name in self._order():
+            tasks[name] = asyncio.ensure_future(run_node(name))
+        try:
+            await asyncio.gather(*tasks.values())
+        finally:
+            # One failed node stops the rest
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+        return outputs
+
+    async def _execute(
+        self,
+        initial_kwargs: Dict[str, Any],
+        backends: Dict[str, Any],
+        semaphore: asyncio.Semaphore,
+    ) -> Dict[str, Any]:
+        """One run of the chain with the given backends and model-call limit."""
+        outputs = await self._run_nodes(initial_kwargs, backends, semaphore)
+        if self.steps:
+            state = {**initial_kwargs, **outputs}
+            current_text, _ = await self._run_steps(
+                self.steps, state, backends, semaphore
+            )
+            outputs["output"] = current_text
+        return outputs
+
+    def _result(self, outputs: Dict[str, Any]) -> Any:
+        """What ``run()`` returns for a run's outputs."""
+        if self.steps or not self.nodes:
+            return outputs.get("output")
+        return outputs[list(self.nodes)[-1]]
+
+    async def run_all(self, **initial_kwargs) -> Dict[str, Any]:
+        """
+        Execute the chain and return every named output: one per node, plus
+        ``output`` for the result of the ``add()`` steps, if there are any.
+        """
+        semaphore = asyncio.Semaphore(max(1, self.concurrency))
+        backends: Dict[str, Any] = {}
+
+        try:
+            return await self._execute(initial_kwargs, backends, semaphore)
+        finally:
+            for backend in backends.values():
+                await backend.aclose()
+
+    async def run(self, **initial_kwargs) -> Any:
+        """
+        Execute the chain: nodes first, as concurrently as their dependencies
+        allow, then the ``add()`` steps in order. Returns the result of the
+        last ``add()`` step, or of the last node added if there are none.
+        """
+        return self._result(await self.run_all(**initial_kwargs))
+
+    async def run_stream(self, **initial_kwargs) -> AsyncGenerator[Any, None]:
+        """
+        Execute the chain like ``run()``, but stream the last Model step of the
+        ``add()`` steps: its tokens are yielded as the backend produces them.
+
+        Steps after it that are marked ``@incremental`` receive the stream as
+        an async iterator and can start work before generation completes;
+        whatever they yield is yielded in turn. The first step after it that
+        is not incremental (or an incremental one that returns a value
+        instead of yielding) ends the streaming: the rest of the chain runs on
+        the collected output and its result is yielded as the final item.
+        Closing the stream early cancels the generation.
+        """
+        from flint.core.model import Model
+
+        models = [i for i, step in enumerate(self.steps) if isinstance(step, Model)]
+        semaphore = asyncio.Semaphore(max(1, self.concurrency))
+        backends: Dict[str, Any] = {}
+
+        try:
+            if not models:
+                yield self._result(
+                    await self._execute(initial_kwargs, backends, semaphore)
+                )
+                return
+
+            last = models[-1]
+            outputs = await self._run_nodes(initial_kwargs, backends, semaphore)
+            state = {**initial_kwargs, **outputs}
+            text, state = await self._run_steps(
+                self.steps[:last], state, backends, semaphore
+            )
+            if not text:
+                raise ValueError(
+                    f"Model step at index {last} requires a preceding Prompt step to generate text."
+                )
+            model = self.steps[last]
+            backend = _get_backend(model.backend_name, backends)
+
+            async with semaphore:
+                stream = backend.stream(text, model.name)
+                chunks: Any = stream
+                rest = self.steps[last + 1 :]
+                try:
+                    while rest and is_incremental(rest[0]):
+                        chunks = rest.pop(0)(chunks)
+                        if inspect.isawaitable(chunks):
+                            break
+                    if not rest and not inspect.isawaitable(chunks):
+                        async for item in chunks:
+                            yield item
+                        return
+                    collected = await _collect(chunks)
+                finally:
+                    if chunks is not stream and hasattr(chunks, "aclose"):
+                        await chunks.aclose()
+                    await stream.aclose()
+
+            state["output"] = collected
+            result, _ = await self._run_steps(
+                rest, state, backends, semaphore, current_text=collected
+            )
+            yield result
+
+        finally:
+            for backend in backends.values():
+                await backend.aclose()
+
+    async def stream_map(
+        self,
+        inputs: Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]],
+        concurrency: int = 4,
+        ordered: bool = True,
+        retries: int = 0,
+        retry_delay: float = 1.0,
+        retry_on: Optional[Callable[[BaseException], bool]] = None,
+        checkpoint: Optional[str] = None,
+        return_exceptions: bool = False,
+    ) -> AsyncGenerator[Tuple[int, Any], None]:
+        """
+        Run the chain once per input (a dict of variables) and yield
+        ``(index, result)`` pairs, in input order or, with ``ordered=False``,
+        as they complete.
+
+        Inputs are read lazily and at most ``concurrency`` model calls run at
+        once, with backends shared across all runs. Only a bounded window of
+        inputs is held in memory, so both iterables and async iterables of
+        any length work. An input that fails with an error ``retry_on``
+        accepts (by default ``is_transient``: connection problems, timeouts
+        and 5xx responses) is retried ``retries`` times with exponential
+        backoff; other errors, such as a missing prompt variable, fail it
+        straight away. Its exception is then raised, or yielded as the result
+        with ``return_exceptions``.
+
+        With ``checkpoint``, each successful result is appended to that JSON
+        lines file as it completes, and inputs already recorded there are
+        skipped (and not yielded again), so an interrupted run resumes where
+        it stopped.
+        """
+        concurrency = max(1, concurrency)
+        semaphore = asyncio.Semaphore(concurrency)
+        backends: Dict[str, Any] = {}
+        done = set(_read_checkpoint(checkpoint)) if checkpoint else set()
+        records = _numbered(inputs, done)
+        # Finished results wait here for slower earlier ones when ordered
+        window = concurrency * 2 if ordered else concurrency
+        pending: Dict[asyncio.Future, int] = {}
+        exhausted = False
+        retry_on = retry_on or is_transient
+
+        async def run_one(kwargs: Dict[str, Any]) -> Any:
+            for attempt in range(retries + 1):
+                try:
+                    return self._result(
+                        await self._execute(dict(kwargs), backends, semaphore)
+                    )
+                except Exception as e:
+                    if attempt == retries or not retry_on(e):
+                        raise
+                    await asyncio.sleep(retry_delay * 2**attempt)
+
+        out = open(checkpoint, "a", encoding="utf-8") if checkpoint else None
+        try:
+            while True:
+                while not exhausted and len(pending) < window:
+                    try:
+                        index, kwargs = await records.__anext__()
+                    except StopAsyncIteration:
+                        exhausted = True
+                        break
+                    pending[asyncio.ensure_future(run_one(kwargs))] = index
+                if not pending:
+                    break
+
+                if ordered:
+                    task = min(pending, key=pending.get)
+                    await asyncio.wait([task])
+                    finished = [task]
+                else:
+                    finished, _ = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                for task in sorted(finished, key=pending.get):
+                    index = pending.pop(task)
+                    if task.exception() is not None:
+                        if not return_exceptions:
+                            raise task.exception()
+                        yield index, task.exception()
+                        continue
+                    result = task.result()
+                    if out is not None:
+                        out.write(
+                            json.dumps({"index": index, "result": result}, default=str)
+                            + "\n"
+                        )
+                        out.flush()
+                    yield index, result
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            await records.aclose()
+            if out is not None:
+                out.close()
+            for backend in backends.values():
+                await backend.aclose()
+
+    async def map(
+        self,
+        inputs: Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]],
+        concurrency: int = 4,
+        **kwargs,
+    ) -> List[Any]:
+        """
+        ``stream_map`` collected into a list of results in input order.
+        Results recorded in a ``checkpoint`` by an earlier run are included.
+        """
+        results: Dict[int, Any] = {}
+        if kwargs.get("checkpoint"):
+            results.update(_read_checkpoint(kwargs["checkpoint"]))
+        stream = self.stream_map(inputs, concurrency=concurrency, **kwargs)
+        try:
+            async for index, result in stream:
+                results[index] = result
+        finally:
+            await stream.aclose()
+        return [results[i] for i in sorted(results)]
 
     def __repr__(self) -> str:
+        if self.nodes:
+            return f"<Chain steps={len(self.steps)} nodes={len(self.nodes)}>"
         return f"<Chain steps={len(self.steps)}>"
+
+
+def is_transient(error: BaseException) -> bool:
+    """Whether retrying might help: a connection error, a timeout or a 5xx response."""
+    import httpx
+
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return isinstance(error, (httpx.TransportError, asyncio.TimeoutError))
+
+
+def incremental(step: Callable) -> Callable:
+    """
+    Mark a chain step as incremental: it is called with an async iterator of
+    text chunks instead of the full text, and either yields its own chunks
+    (an async generator) or returns its result (a coroutine). Under
+    ``Chain.run_stream()`` it starts on the first token of the model step
+    before it.
+    """
+    step.incremental = True
+    return step
+
+
+def is_incremental(step: Any) -> bool:
+    return callable(step) and getattr(step, "incremental", False) is True
+
+
+def _get_backend(name: str, backends: Dict[str, Any]):
+    """The run's backend for ``name``, created on first use."""
+    # Use dynamic backend registry, reusing one pooled backend per name
+    from flint.backends import get_backend
+
+    if name not in backends:
+        backends[name] = get_backend(name)
+    return backends[name]
+
+
+async def _single(text: Any) -> AsyncGenerator[Any, None]:
+    yield text
+
+
+async def _collect(chunks: Any) -> Any:
+    """
+    The result of an incremental step: its return value, or what it yielded,
+    joined when it yielded text and as a list otherwise.
+    """
+    if inspect.isawaitable(chunks):
+        return await chunks
+    items = [item async for item in chunks]
+    if all(isinstance(item, str) for item in items):
+        return "".join(items)
+    return items
+
+
+def _read_checkpoint(path: str) -> Dict[int, Any]:
+    """Results recorded in a stream_map checkpoint file, by input index."""
+    results: Dict[int, Any] = {}
+    if not os.path.exists(path):
+        return results
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # The last line of an interrupted run may be cut short
+                continue
+            results[record["index"]] = record["result"]
+    return results
+
+
+async def _numbered(
+    inputs: Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]],
+    skip: Set[int],
+) -> AsyncGenerator[Tuple[int, Dict[str, Any]], None]:
+    """``(index, input)`` pairs from either kind of iterable, minus ``skip``."""
+    if hasattr(inputs, "__aiter__"):
+        index = 0
+        async for kwargs in inputs:
+            if index not in skip:
+                yield index, kwargs
+            index += 1
+    else:
+        for index, kwargs in enumerate(inputs):
+            if index not in skip:
+                yield index, kwargs
@@ -13,8 +13,29 @@ except ImportError:
 
 # Default Configuration
 DEFAULT_CONFIG = {
-    "backends": {"ollama_port": 11434, "lmstudio_port": 1234},
+    "backends": {
+        "ollama_port": 11434,
+        "lmstudio_port": 1234,
+        # How long Ollama keeps a chat model (and its prompt cache) loaded between turns
+        "ollama_keep_alive": "30m",
+        # Context size to request from Ollama for every model (0: the model's or runner's own)
+        "ollama_num_ctx": 0,
+        "max_connections": 10,
+        "max_keepalive_connections": 5,
+        "keepalive_expiry": 30.0,
+        # Let concurrent identical generations share one upstream call
+        "single_flight": True,
+    },
     "defaults": {"model": None},
+    # Opt-in cache of generated responses (flint.backends.cache)
+    "cache": {
+        "enabled": False,
+        "path": "~/.flint/response_cache.db",
+        "max_entries": 10000,
+        "max_bytes": 64 * 1024 * 1024,
+        # Seconds a response stays valid; 0 keeps it until evicted
+        "ttl": 7 * 24 * 3600,
+    },
 }
 
 
@@ -33,6 +54,8 @@ def load_config() -> Dict[str, Any]:
             config_obj["backends"].update(user_config["backends"])
         if "defaults" in user_config:
             config_obj["defaults"].update(user_config["defaults"])
+        if "cache" in user_config:
+            config_obj["cache"].update(user_config["cache"])
         return config_obj
     except Exception as e:
         print(f"Warning: Failed to parse ~/.flint/config.toml: {e}")
@@ -0,0 +1,242 @@
+"""
+Token-budgeted context assembly for Flint.
+Packs prompt sections into a model's context window by priority and reports
+what had to be summarized, truncated or left out.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+# Loaded on first use: importing tiktoken is slow and its encoding may need a download
+tiktoken = None
+ENCODING_NAME = "cl100k_base"
+
+# Used when a backend does not report the model's context window
+DEFAULT_CONTEXT_WINDOW = 4096
+# Tokens left free for the model's answer (at most a quarter of the window)
+DEFAULT_RESERVE = 1024
+# Below this many tokens a truncated section is not worth keeping
+MIN_TRUNCATED_TOKENS = 64
+# Rough per-message cost of chat formatting (role markers, separators)
+MESSAGE_OVERHEAD = 4
+
+_tokenizer = None
+# (backend, base url, model) -> context window reported by the backend
+_windows: Dict[Tuple[str, str, str], int] = {}
+
+
+class _ApproxTokenizer:
+    """About four characters per token; stands in when tiktoken can't be loaded."""
+
+    def encode(self, text: str) -> List[str]:
+        return [text[i : i + 4] for i in range(0, len(text), 4)]
+
+    def decode(self, tokens: List[str]) -> str:
+        return "".join(tokens)
+
+
+def get_tokenizer():
+    """The tiktoken encoder used by VectorStore, or an estimate if it is unavailable."""
+    global tiktoken, _tokenizer
+    if _tokenizer is None:
+        try:
+            if tiktoken is None:
+                import tiktoken as _tiktoken
+
+                tiktoken = _tiktoken
+            _tokenizer = tiktoken.get_encoding(ENCODING_NAME)
+        except Exception:
+            # Missing package, or no network to fetch the encoding on first use
+            _tokenizer = _ApproxTokenizer()
+    return _tokenizer
+
+
+def count_tokens(text: str) -> int:
+    return len(get_tokenizer().encode(text))
+
+
+async def context_window(backend, model_name: str) -> int:
+    """
+    Context window of ``model_name`` from the backend's model metadata,
+    cached per backend and model. Falls back to ``DEFAULT_CONTEXT_WINDOW``.
+    """
+    key = (backend.name, getattr(backend, "base_url", ""), model_name)
+    if key not in _windows:
+        try:
+            length = await backend.context_length(model_name)
+        except Exception:
+            length = None
+        if not length:
+            # Not cached, so a backend that was offline is asked again next time
+            return DEFAULT_CONTEXT_WINDOW
+        _windows[key] = length
+    return _windows[key]
+
+
+async def prompt_budget(
+    backend, model_name: str, reserve: int = DEFAULT_RESERVE
+) -> int:
+    """Tokens available for the prompt once room for the answer is set aside."""
+    window = await context_window(backend, model_name)
+    return window - min(reserve, window // 4)
+
+
+class ContextReport:
+    """What a ContextBuilder kept, and every section it had to cut."""
+
+    def __init__(self, budget: int):
+        self.budget = budget
+        self.used = 0
+        # {"name", "action" (summarized/truncated/dropped), "tokens", "kept"}
+        self.cuts: List[Dict[str, Any]] = []
+
+    @property
+    def over_budget(self) -> bool:
+        """Required sections alone did not fit."""
+        return self.used > self.budget
+
+    def describe(self) -> List[str]:
+        """One human-readable line per cut section."""
+        lines = []
+        for cut in self.cuts:
+            if cut["action"] == "dropped":
+                lines.append(f"{cut['name']}: dropped ({cut['tokens']:,} tokens)")
+            else:
+                lines.append(
+                    f"{cut['name']}: {cut['action']} ({cut['tokens']:,} -> {cut['kept']:,} tokens)"
+                )
+        return lines
+
+
+class ContextBuilder:
+    """
+    Collects prompt sections and packs them into a token budget.
+
+    Sections are considered from the highest priority down, each taking what
+    is left of the budget. A section that does not fit is replaced by its
+    ``summary`` when that fits, else dropped; the budget left over then goes
+    to the head of cut sections that allow ``truncate``, again by priority.
+    ``required`` sections are always kept in full. The packed sections keep
+    the order they were added in.
+    """
+
+    def __init__(self, budget: int, separator: str = "\n\n", tokenizer=None):
+        self.budget = budget
+        self.separator = separator
+        self.tokenizer = tokenizer or get_tokenizer()
+        self.sections: List[Dict[str, Any]] = []
+
+    def add(
+        self,
+        name: str,
+        text: str,
+        priority: int = 0,
+        required: bool = False,
+        truncate: bool = False,
+        summary: Optional[str] = None,
+    ) -> None:
+        self.sections.append(
+            {
+                "name": name,
+                "text": text,
+                "priority": priority,
+                "required": required,
+                "truncate": truncate,
+                "summary": summary,
+            }
+        )
+
+    def pack(self) -> Tuple[List[Tuple[str, str]], ContextReport]:
+        """``(name, text)`` of every kept section, in insertion order, and the report."""
+        report = ContextReport(self.budget)
+        encode = self.tokenizer.encode
+        separator_cost = len(encode(self.separator))
+        marker = "\n... [truncated to fit the context window]"
+        marker_cost = len(encode(marker))
+
+        order = sorted(
+            range(len(self.sections)),
+            key=lambda i: (
+                not self.sections[i]["required"],
+                -self.sections[i]["priority"],
+            ),
+        )
+        tokens = {i: encode(self.sections[i]["text"]) for i in order}
+        # index -> (text, cost including its separator, action or None when kept whole)
+        kept: Dict[int, Tuple[str, int, Optional[str]]] = {}
+        used = 0
+
+        # First pass: whole sections by priority, else their summary if it fits
+        for i in order:
+            section = self.sections[i]
+            cost = len(tokens[i]) + separator_cost
+            if section["required"] or used + cost <= self.budget:
+                kept[i] = (section["text"], cost, None)
+                used += cost
+            elif section["summary"] is not None:
+                summary_cost = len(encode(section["summary"])) + separator_cost
+                if used + summary_cost <= self.budget:
+                    kept[i] = (section["summary"], summary_cost, "summarized")
+                    used += summary_cost
+
+        # Second pass: spend what is left on truncated text of the sections cut above
+        for i in order:
+            section = self.sections[i]
+            if not section["truncate"] or (i in kept and kept[i][2] is None):
+                continue
+            freed = kept[i][1] if i in kept else 0
+            keep = self.budget - used + freed - separator_cost - marker_cost
+            if keep >= MIN_TRUNCATED_TOKENS and (i not in kept or keep > kept[i][1]):
+                text = self.tokenizer.decode(tokens[i][:keep]) + marker
+                kept[i] = (text, keep + marker_cost + separator_cost, "truncated")
+                used += kept[i][1] - freed
+
+        for i in order:
+            if i not in kept:
+                action, kept_tokens = "dropped", 0
+            elif kept[i][2] is not None:
+                action, kept_tokens = kept[i][2], kept[i][1] - separator_cost
+            else:
+                continue
+            report.cuts.append(
+                {
+                    "name": self.sections[i]["name"],
+                    "action": action,
+                    "tokens": len(tokens[i]),
+                    "kept": kept_tokens,
+                }
+            )
+        # The first section needs no separator
+        report.used = used - separator_cost if kept else 0
+
+        packed = [(self.sections[i]["name"], kept[i][0]) for i in sorted(kept)]
+        return packed, report
+
+    def build(self) -> Tuple[str, ContextReport]:
+        """The packed prompt text and the report."""
+        packed, report = self.pack()
+        return self.separator.join(text for _, text in packed), report
+
+
+def fit_messages(
+    messages: List[Dict[str, str]], budget: int, tokenizer=None
+) -> Tuple[List[Dict[str, str]], int]:
+    """
+    Drop the oldest turns of a conversation until it fits ``budget``.
+    System messages and the latest message are always kept. Returns the
+    messages to send and how many were dropped; a conversation that already
+    fits is returned as is, so its prefix stays cacheable.
+    """
+    tokenizer = tokenizer or get_tokenizer()
+    costs = [len(tokenizer.encode(m["content"])) + MESSAGE_OVERHEAD for m in messages]
+    total = sum(costs)
+    if total <= budget:
+        return messages, 0
+
+    dropped = set()
+    for i, message in enumerate(messages[:-1]):
+        if total <= budget:
+            break
+        if message["role"] != "system":
+            dropped.add(i)
+            total -= costs[i]
+    return [m for i, m in enumerate(messages) if i not in dropped], len(dropped)
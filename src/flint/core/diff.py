@@ -0,0 +1,96 @@
+"""
+Unified diff splitting for Flint.
+Breaks `git diff` output into per-file and per-hunk chunks that can be sent
+to a model independently.
+"""
+
+import hashlib
+import re
+from typing import Any, Dict, List, Tuple
+
+from flint.core.context import count_tokens
+
+_FILE_RE = re.compile(r"(?m)^(?=diff --git )")
+_HUNK_RE = re.compile(r"(?m)^(?=@@ )")
+# Line numbers shift whenever something above a hunk changes; its content does not
+_HUNK_RANGE_RE = re.compile(r"(?m)^@@ -\d+(?:,\d+)? \+\d+(?:,\d+)? @@")
+
+
+def split_files(diff: str) -> List[Tuple[str, str]]:
+    """Split ``git diff`` output into ``(path, file_diff)`` pairs."""
+    files = []
+    for part in _FILE_RE.split(diff):
+        if not part.strip():
+            continue
+        match = re.match(r"diff --git a/(\S+) b/(\S+)", part)
+        files.append((match.group(2) if match else "diff", part.rstrip("\n")))
+    return files
+
+
+def split_hunks(file_diff: str) -> Tuple[str, List[str]]:
+    """A file diff's header (``diff --git``, ``---``/``+++`` lines) and its hunks."""
+    parts = _HUNK_RE.split(file_diff)
+    return parts[0].rstrip("\n"), [p.rstrip("\n") for p in parts[1:]]
+
+
+def summarize_file(path: str, file_diff: str) -> str:
+    """One-line stand-in for a file diff that does not fit the context window."""
+    lines = file_diff.splitlines()
+    added = sum(
+        1 for line in lines if line.startswith("+") and not line.startswith("+++")
+    )
+    removed = sum(
+        1 for line in lines if line.startswith("-") and not line.startswith("---")
+    )
+    return (
+        f"# {path}: +{added} -{removed} lines (diff omitted to fit the context window)"
+    )
+
+
+def chunk_key(text: str) -> str:
+    """Content hash of a diff chunk that ignores hunk line numbers."""
+    normalized = _HUNK_RANGE_RE.sub("@@", text)
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def _split_lines(hunk: str, max_tokens: int) -> List[str]:
+    """Cut an oversized hunk into pieces by line, repeating its @@ line on each."""
+    first, _, body = hunk.partition("\n")
+    pieces, current, size = [], [], 0
+    for line in body.splitlines():
+        cost = count_tokens(line) + 1
+        if current and size + cost > max_tokens:
+            pieces.append("\n".join([first] + current))
+            current, size = [], 0
+        current.append(line)
+        size += cost
+    if current or not pieces:
+        pieces.append("\n".join([first] + current))
+    return pieces
+
+
+def diff_chunks(diff: str, max_tokens: int) -> List[Dict[str, Any]]:
+    """
+    Split a diff into chunks of at most about ``max_tokens`` tokens.
+
+    A file whose diff fits is one chunk; larger files are split per hunk,
+    and hunks that are still too large are split by line. Every chunk keeps
+    its file header and carries ``path``, ``text`` and a ``key`` for caching.
+    """
+    chunks = []
+    for path, file_diff in split_files(diff):
+        if count_tokens(file_diff) <= max_tokens:
+            pieces = [file_diff]
+        else:
+            header, hunks = split_hunks(file_diff)
+            room = max(max_tokens - count_tokens(header), 1)
+            pieces = [
+                f"{header}\n{piece}"
+                for hunk in hunks
+                for piece in (
+                    [hunk] if count_tokens(hunk) <= room else _split_lines(hunk, room)
+                )
+            ] or [file_diff]
+        for piece in pieces:
+            chunks.append({"path": path, "text": piece, "key": chunk_key(piece)})
+    return chunks
@@ -0,0 +1,54 @@
+"""
+Map-reduce generation for Flint.
+Runs one prompt per chunk of a large input concurrently, with results cached
+by content, so a caller can reduce them into a single answer.
+"""
+
+import asyncio
+from typing import Any, Callable, Dict, List, Optional
+
+from flint.backends.cache import ResponseCache
+
+
+async def map_chunks(
+    backend,
+    model_name: str,
+    chunks: List[Dict[str, Any]],
+    make_prompt: Callable[[Dict[str, Any]], str],
+    system: Optional[str] = None,
+    concurrency: int = 4,
+    cache: Optional[ResponseCache] = None,
+    on_result: Optional[Callable[[Dict[str, Any], bool], None]] = None,
+) -> List[str]:
+    """
+    Generate one answer per chunk, at most ``concurrency`` at a time.
+
+    Each chunk is a dict with its ``text`` and a ``key`` identifying its
+    content; with a ``cache`` (the response cache, whose size and age limits
+    apply), chunks answered before by the same backend, model and prompts are
+    not sent again. ``on_result(chunk, cached)`` is
+    called as each one finishes. Results are returned in chunk order.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def _one(chunk: Dict[str, Any]) -> str:
+        prompt = make_prompt(chunk)
+        # The prompt minus the chunk text identifies the task; the chunk's own key its content
+        template = make_prompt({**chunk, "text": ""})
+        key = ResponseCache.key(
+            backend.name, model_name, system, template, {"chunk": chunk["key"]}
+        )
+        result = cache.get(key) if cache is not None else None
+        cached = result is not None
+        if not cached:
+            async with semaphore:
+                result = await backend.generate(
+                    prompt=prompt, model_name=model_name, system=system
+                )
+            if cache is not None:
+                cache.put(key, result)
+        if on_result is not None:
+            on_result(chunk, cached)
+        return result
+
+    return await asyncio.gather(*(_one(chunk) for chunk in chunks))
@@ -0,0 +1,4 @@
+from flint.server.app import create_app
+from flint.server.scheduler import RequestScheduler, QueueFullError
+
+__all__ = ["create_app", "RequestScheduler", "QueueFullError"]
@@ -0,0 +1,274 @@
+"""
+OpenAI-compatible REST API for Flint.
+Exposes /v1/models, /v1/completions and /v1/chat/completions in front of any backend.
+"""
+
+import json
+import time
+import uuid
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, List, Optional, Union
+
+import httpx
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+from flint.backends.base import BaseBackend
+from flint.core.cancellation import generation_metrics
+from flint.server.scheduler import QueueFullError, RequestScheduler
+
+
+class ChatMessage(BaseModel):
+    role: str
+    content: str
+
+
+class _SamplingRequest(BaseModel):
+    model: Optional[str] = None
+    stream: bool = False
+    temperature: Optional[float] = None
+    top_p: Optional[float] = None
+    max_tokens: Optional[int] = None
+    stop: Optional[Union[str, List[str]]] = None
+
+    def options(self) -> Dict[str, Any]:
+        """Sampling parameters that were explicitly set, passed to the backend."""
+        fields = ("temperature", "top_p", "max_tokens", "stop")
+        return {f: getattr(self, f) for f in fields if getattr(self, f) is not None}
+
+
+class ChatCompletionRequest(_SamplingRequest):
+    messages: List[ChatMessage]
+
+
+class CompletionRequest(_SamplingRequest):
+    prompt: str
+    system: Optional[str] = None
+
+
+class _TicketStreamingResponse(StreamingResponse):
+    """
+    A streaming response that gives back its scheduler ticket once it has been
+    sent, or failed to send, even if the body generator never started.
+    """
+
+    def __init__(self, content, ticket, **kwargs):
+        super().__init__(content, **kwargs)
+        self.ticket = ticket
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.ticket.release()
+
+
+def _sse(payload: Dict[str, Any]) -> str:
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+def create_app(
+    backend: BaseBackend,
+    default_model: str,
+    scheduler: Optional[RequestScheduler] = None,
+) -> FastAPI:
+    """
+    Build the API application around a backend instance.
+    Requests are admitted through ``scheduler``; when it is full the server
+    answers 429 with ``Retry-After`` and ``X-Queue-Depth`` headers.
+    """
+    scheduler = scheduler or RequestScheduler()
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        yield
+        await backend.aclose()
+
+    app = FastAPI(title="Flint", lifespan=lifespan)
+    app.state.backend = backend
+    app.state.scheduler = scheduler
+
+    def _reserve(model: str):
+        try:
+            return scheduler.reserve(model)
+        except QueueFullError as e:
+            raise HTTPException(
+                status_code=429,
+                detail=str(e),
+                headers={"Retry-After": "1", "X-Queue-Depth": str(e.depth)},
+            )
+
+    def _headers() -> Dict[str, str]:
+        return {"X-Queue-Depth": str(scheduler.depth)}
+
+    async def _generate(ticket, call: Callable[[], Awaitable[str]]) -> str:
+        """Run ``call`` (``backend.generate`` or ``backend.chat``) once admitted."""
+        async with ticket:
+            try:
+                return await call()
+            except httpx.HTTPError as e:
+                raise HTTPException(status_code=502, detail=f"Backend error: {e}")
+
+    async def _stream(
+        http_request: Request,
+        ticket,
+        open_stream: Callable[[], AsyncGenerator[str, None]],
+        make_chunk,
+    ) -> AsyncGenerator[str, None]:
+        """Relay ``open_stream()`` (``backend.stream`` or ``stream_chat``) as SSE."""
+        async with ticket:
+            stream = open_stream()
+            try:
+                async for text in stream:
+                    # Stop decoding as soon as the client goes away
+                    if await http_request.is_disconnected():
+                        return
+                    if text:
+                        yield _sse(make_chunk(text, None))
+                yield _sse(make_chunk("", "stop"))
+            except httpx.HTTPError as e:
+                yield _sse({"error": {"message": f"Backend error: {e}"}})
+            finally:
+                await stream.aclose()
+        yield "data: [DONE]\n\n"
+
+    @app.get("/v1/models")
+    async def list_models():
+        models = await backend.list_models()
+        return {
+            "object": "list",
+            "data": [
+                {
+                    "id": m.name,
+                    "object": "model",
+                    "created": 0,
+                    "owned_by": backend.name,
+                }
+                for m in models
+            ],
+        }
+
+    @app.get("/metrics")
+    async def metrics():
+        return {"queue_depth": scheduler.depth, **generation_metrics.snapshot()}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: ChatCompletionRequest, http_request: Request):
+        model = request.model or default_model
+        # Sent as structured turns, so the backend applies the model's chat
+        # template and can reuse its prompt cache across a conversation
+        messages = [m.model_dump() for m in request.messages]
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        ticket = _reserve(model)
+
+        if request.stream:
+
+            def make_chunk(text: str, finish_reason: Optional[str]) -> Dict[str, Any]:
+                delta = {"role": "assistant", "content": text} if text else {}
+                return {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [
+                        {"index": 0, "delta": delta, "finish_reason": finish_reason}
+                    ],
+                }
+
+            return _TicketStreamingResponse(
+                _stream(
+                    http_request,
+                    ticket,
+                    partial(backend.stream_chat, messages, model, **request.options()),
+                    make_chunk,
+                ),
+                ticket,
+                media_type="text/event-stream",
+                headers=_headers(),
+            )
+
+        headers = _headers()
+        text = await _generate(
+            ticket, partial(backend.chat, messages, model, **request.options())
+        )
+        return JSONResponse(
+            {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": text},
+                        "finish_reason": "stop",
+                    }
+                ],
+            },
+            headers=headers,
+        )
+
+    @app.post("/v1/completions")
+    async def completions(request: CompletionRequest, http_request: Request):
+        model = request.model or default_model
+        completion_id = f"cmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        ticket = _reserve(model)
+
+        if request.stream:
+
+            def make_chunk(text: str, finish_reason: Optional[str]) -> Dict[str, Any]:
+                return {
+                    "id": completion_id,
+                    "object": "text_completion",
+                    "created": created,
+                    "model": model,
+                    "choices": [
+                        {"index": 0, "text": text, "finish_reason": finish_reason}
+                    ],
+                }
+
+            return _TicketStreamingResponse(
+                _stream(
+                    http_request,
+                    ticket,
+                    partial(
+                        backend.stream,
+                        request.prompt,
+                        model,
+                        system=request.system,
+                        **request.options(),
+                    ),
+                    make_chunk,
+                ),
+                ticket,
+                media_type="text/event-stream",
+                headers=_headers(),
+            )
+
+        headers = _headers()
+        text = await _generate(
+            ticket,
+            partial(
+                backend.generate,
+                request.prompt,
+                model,
+                system=request.system,
+                **request.options(),
+            ),
+        )
+        return JSONResponse(
+            {
+                "id": completion_id,
+                "object": "text_completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "text": text, "finish_reason": "stop"}],
+            },
+            headers=headers,
+        )
+
+    return app
@@ -0,0 +1,89 @@
+"""
+Request scheduler for the Flint API server.
+Bounds how many requests may wait for a model and how many run against it at once.
+"""
+
+import asyncio
+from typing import Dict
+
+
+class QueueFullError(Exception):
+    """Raised when the scheduler cannot admit another request."""
+
+    def __init__(self, depth: int):
+        super().__init__(f"Request queue is full ({depth} requests pending).")
+        self.depth = depth
+
+
+class _Ticket:
+    """
+    An admitted request. Entering it waits for a free slot on the model;
+    exiting releases both the slot and the queue reservation.
+    """
+
+    def __init__(self, scheduler: "RequestScheduler", model: str):
+        self._scheduler = scheduler
+        self._model = model
+        self._released = False
+
+    async def __aenter__(self) -> "_Ticket":
+        try:
+            await self._scheduler._semaphore(self._model).acquire()
+        except BaseException:
+            self.release()
+            raise
+        self._scheduler._active[self._model] = (
+            self._scheduler._active.get(self._model, 0) + 1
+        )
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._scheduler._active[self._model] -= 1
+        self._scheduler._semaphore(self._model).release()
+        self.release()
+
+    def release(self) -> None:
+        """Give back the queue reservation (idempotent)."""
+        if not self._released:
+            self._released = True
+            self._scheduler._pending -= 1
+
+
+class RequestScheduler:
+    """
+    A bounded admission queue with per-model concurrency limits.
+
+    ``reserve()`` either admits a request or raises ``QueueFullError`` straight
+    away, so callers can answer with backpressure (HTTP 429) instead of piling
+    up work the local model cannot keep up with.
+    """
+
+    def __init__(self, max_queue: int = 64, max_concurrency_per_model: int = 1):
+        if max_queue < 1 or max_concurrency_per_model < 1:
+            raise ValueError("max_queue and max_concurrency_per_model must be >= 1")
+        self.max_queue = max_queue
+        self.max_concurrency_per_model = max_concurrency_per_model
+        self._pending = 0
+        self._active: Dict[str, int] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _semaphore(self, model: str) -> asyncio.Semaphore:
+        if model not in self._semaphores:
+            self._semaphores[model] = asyncio.Semaphore(self.max_concurrency_per_model)
+        return self._semaphores[model]
+
+    @property
+    def depth(self) -> int:
+        """Number of admitted requests, running or waiting."""
+        return self._pending
+
+    def active(self, model: str) -> int:
+        """Number of requests currently running against a model."""
+        return self._active.get(model, 0)
+
+    def reserve(self, model: str) -> _Ticket:
+        """Admit a request for ``model`` or raise ``QueueFullError``."""
+        if self._pending >= self.max_queue:
+            raise QueueFullError(self._pending)
+        self._pending += 1
+        return _Ticket(self, model)
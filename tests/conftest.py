@@ -0,0 +1,58 @@
+import asyncio
+import pytest
+from flint.backends.base import BaseBackend
+from flint.core.model import Model
+
+
+async def echo(backend, prompt, **kwargs):
+    for word in ["echo:", " ", prompt]:
+        yield word
+
+
+class StubBackend(BaseBackend):
+    """
+    A backend with no server behind it. Answers come from ``stream``, an async
+    generator function called as ``stream(backend, prompt, system=..., **kwargs)``
+    that echoes the prompt by default; ``generate`` joins what it yields.
+    Counts upstream calls and closed streams, and has a ``release`` event for
+    streams that pause until the test lets them go on.
+    """
+
+    def __init__(self, stream=echo, name: str = "stub", models=()):
+        super().__init__()
+        self._stream = stream
+        self._name = name
+        self.models = list(models)
+        self.calls = 0
+        self.closed = 0
+        self.release = asyncio.Event()
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    async def list_models(self):
+        return [Model(name=m, backend_name=self.name) for m in self.models]
+
+    async def pull_model(self, model_name: str) -> None:
+        pass
+
+    async def generate(self, prompt, model_name, stream=False, system=None, **kwargs):
+        chunks = self.generate_stream(prompt, model_name, system=system, **kwargs)
+        return "".join([chunk async for chunk in chunks])
+
+    async def generate_stream(self, prompt, model_name, system=None, **kwargs):
+        self.calls += 1
+        inner = self._stream(self, prompt, system=system, **kwargs)
+        try:
+            async for chunk in inner:
+                yield chunk
+        finally:
+            await inner.aclose()
+            self.closed += 1
+
+
+@pytest.fixture
+def stub_backend():
+    """Builds StubBackend instances: ``stub_backend(stream=..., name=..., models=...)``."""
+    return StubBackend
@@ -0,0 +1,116 @@
+import sqlite3
+import pytest
+from flint.backends import get_backend
+from flint.backends.cache import CachedBackend, ResponseCache
+from flint.core.config import config
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.db"), ttl=0)
+    yield cache
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_identical_generations_are_served_from_cache(cache, stub_backend):
+    inner = stub_backend()
+    backend = CachedBackend(inner, cache)
+
+    assert await backend.generate("hi there", "m") == "echo: hi there"
+    # Trailing whitespace and line endings don't make a new prompt
+    assert await backend.generate("hi there \r\n", "m") == "echo: hi there"
+    assert inner.calls == 1
+
+    await backend.generate("hi there", "m", temperature=0.2)
+    await backend.generate("hi there", "m", system="Be brief.")
+    await backend.generate("hi there", "other")
+    assert inner.calls == 4
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 4
+
+
+@pytest.mark.asyncio
+async def test_cache_hits_replay_through_generate_stream(cache, stub_backend):
+    inner = stub_backend()
+    backend = CachedBackend(inner, cache)
+
+    first = [c async for c in backend.stream("one two three", "m")]
+    stats = {}
+    second = [c async for c in backend.stream("one two three", "m", stats=stats)]
+
+    assert "".join(first) == "".join(second) == "echo: one two three"
+    assert len(second) > 1
+    assert stats["cached"] is True
+    assert inner.calls == 1
+    # Non-streaming callers share the entry
+    assert await backend.generate("one two three", "m") == "echo: one two three"
+    assert inner.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_abandoned_streams_are_not_cached(cache, stub_backend):
+    backend = CachedBackend(stub_backend(), cache)
+    stream = backend.stream("partial", "m")
+    async for _ in stream:
+        break
+    await stream.aclose()
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.db"), max_entries=2, ttl=0)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    assert cache.get("a") == "1"
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+    assert cache.stats()["evictions"] == 1
+
+    cache.clear()
+    small = ResponseCache(str(tmp_path / "small.db"), max_bytes=10, ttl=0)
+    small.put("a", "x" * 6)
+    small.put("b", "y" * 6)
+    assert small.get("a") is None and small.get("b") == "y" * 6
+    small.close()
+    cache.close()
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.db"), ttl=60)
+    cache.put("a", "1")
+    cache.conn.execute("UPDATE responses SET created_at = created_at - 120")
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+    cache.close()
+
+
+def test_get_backend_wraps_only_when_asked(tmp_path, monkeypatch):
+    monkeypatch.setitem(config["cache"], "path", str(tmp_path / "responses.db"))
+    monkeypatch.setitem(config["cache"], "enabled", False)
+    assert not isinstance(get_backend("ollama", single_flight=False), CachedBackend)
+    backend = get_backend("ollama", cache=True, single_flight=False)
+    assert isinstance(backend, CachedBackend)
+    assert backend.name == "ollama" and backend.base_url.startswith("http")
+    backend.cache.close()
+
+    monkeypatch.setitem(config["cache"], "enabled", True)
+    backend = get_backend("ollama", single_flight=False)
+    assert isinstance(backend, CachedBackend)
+    backend.cache.close()
+
+
+@pytest.mark.asyncio
+async def test_aclose_closes_only_a_cache_the_backend_opened(
+    cache, stub_backend, tmp_path, monkeypatch
+):
+    monkeypatch.setitem(config["cache"], "path", str(tmp_path / "owned.db"))
+    owned = CachedBackend(stub_backend())
+    await owned.aclose()
+    with pytest.raises(sqlite3.ProgrammingError):
+        owned.cache.stats()
+
+    shared = CachedBackend(stub_backend(), cache)
+    await shared.aclose()
+    assert cache.stats()["entries"] == 0
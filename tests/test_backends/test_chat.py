@@ -0,0 +1,158 @@
+import asyncio
+import json
+import httpx
+import pytest
+from flint.backends.llamacpp import LlamaCppBackend
+from flint.backends.ollama import OllamaBackend
+
+
+def use_transport(backend, handler):
+    """Point the backend's pooled client at an in-process handler."""
+    backend._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    backend._client_loop = asyncio.get_running_loop()
+
+
+CONVERSATION = [
+    {"role": "system", "content": "Be brief."},
+    {"role": "user", "content": "hi"},
+    {"role": "assistant", "content": "hello"},
+    {"role": "user", "content": "again"},
+]
+
+
+@pytest.mark.asyncio
+async def test_ollama_chat_stream_uses_chat_endpoint():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        lines = [
+            {"message": {"role": "assistant", "content": "ok"}, "done": False},
+            {"message": {"role": "assistant", "content": ""}, "done": True,
+             "prompt_eval_count": 3, "eval_count": 1},
+        ]
+        return httpx.Response(200, text="\n".join(json.dumps(l) for l in lines))
+
+    backend = OllamaBackend()
+    use_transport(backend, handler)
+    stats = {}
+    chunks = [c async for c in backend.stream_chat(CONVERSATION, "llama3", stats=stats)]
+    await backend.aclose()
+
+    assert "".join(chunks) == "ok"
+    assert requests[0].url.path == "/api/chat"
+    payload = json.loads(requests[0].content)
+    assert payload["messages"] == CONVERSATION
+    assert payload["keep_alive"]
+    assert stats["prompt_tokens"] == 3
+
+
+@pytest.mark.asyncio
+async def test_llamacpp_chat_sends_messages_with_prompt_cache():
+    payloads = []
+
+    def handler(request):
+        payloads.append(json.loads(request.content))
+        return httpx.Response(200, json={"choices": [{"message": {"content": "fine"}}]})
+
+    backend = LlamaCppBackend()
+    use_transport(backend, handler)
+    assert await backend.chat(CONVERSATION, "local") == "fine"
+    # Single-turn generation goes through the same endpoint
+    assert await backend.generate("hi", "local", system="Be brief.") == "fine"
+    await backend.aclose()
+
+    assert payloads[0]["messages"] == CONVERSATION
+    assert payloads[0]["cache_prompt"] is True
+    assert payloads[1]["messages"] == CONVERSATION[:2]
+
+
+async def show_prompt(backend, prompt, system=None, **kwargs):
+    yield f"{system}|{prompt}"
+
+
+@pytest.mark.asyncio
+async def test_default_chat_flattens_conversation(stub_backend):
+    backend = stub_backend(show_prompt)
+    assert await backend.chat(CONVERSATION[:2], "m") == "Be brief.|hi"
+    chunks = [c async for c in backend.chat_stream(CONVERSATION, "m")]
+    assert chunks == ["Be brief.|User: hi\n\nAssistant: hello\n\nUser: again\n\nAssistant:"]
+
+
+@pytest.mark.asyncio
+async def test_context_length_from_model_metadata():
+    def ollama(request):
+        assert request.url.path == "/api/show"
+        return httpx.Response(200, json={
+            "parameters": "stop \"<|im_end|>\"\nnum_ctx 8192",
+            "model_info": {"qwen2.context_length": 32768},
+        })
+
+    def llamacpp(request):
+        assert request.url.path == "/props"
+        return httpx.Response(200, json={"default_generation_settings": {"n_ctx": 4096}})
+
+    backend = OllamaBackend()
+    use_transport(backend, ollama)
+    assert await backend.context_length("qwen2.5") == 8192
+    await backend.aclose()
+
+    backend = LlamaCppBackend()
+    use_transport(backend, llamacpp)
+    assert await backend.context_length("local") == 4096
+    await backend.aclose()
+
+
+@pytest.mark.asyncio
+async def test_ollama_context_matches_what_the_runner_allocates():
+    payloads = []
+
+    def handler(request):
+        if request.url.path == "/api/show":
+            return httpx.Response(200, json={"model_info": {"llama.context_length": 8192}})
+        payloads.append(json.loads(request.content))
+        return httpx.Response(200, json={"response": "ok"})
+
+    # Without num_ctx anywhere the runner uses its default, not the trained window
+    backend = OllamaBackend()
+    use_transport(backend, handler)
+    assert await backend.context_length("llama3") == 4096
+    await backend.generate("hi", "llama3")
+    await backend.aclose()
+    assert "options" not in payloads[0]
+
+    # An opted-in num_ctx is sent with every request, capped by the trained window
+    backend = OllamaBackend(num_ctx=16384)
+    use_transport(backend, handler)
+    await backend.generate("hi", "llama3")
+    assert await backend.context_length("llama3") == 8192
+    await backend.aclose()
+    assert payloads[1]["options"] == {"num_ctx": 16384}
+
+
+@pytest.mark.asyncio
+async def test_sampling_options_reach_the_request_payload():
+    payloads = []
+
+    def handler(request):
+        payloads.append(json.loads(request.content))
+        if request.url.path == "/api/generate":
+            return httpx.Response(200, json={"response": "ok"})
+        return httpx.Response(200, json={"choices": [{"message": {"content": "ok"}}]})
+
+    options = {"temperature": 0.2, "top_p": 0.9, "max_tokens": 16, "stop": "\n"}
+    ollama, llamacpp = OllamaBackend(), LlamaCppBackend()
+    use_transport(ollama, handler)
+    use_transport(llamacpp, handler)
+    await ollama.generate("hi", "llama3", **options)
+    await llamacpp.generate("hi", "local", **options)
+    await ollama.aclose()
+    await llamacpp.aclose()
+
+    assert payloads[0]["options"] == {
+        "temperature": 0.2,
+        "top_p": 0.9,
+        "num_predict": 16,
+        "stop": ["\n"],
+    }
+    assert {k: payloads[1][k] for k in options} == options
@@ -0,0 +1,20 @@
+import pytest
+from flint.backends import get_backend
+from flint.backends.ollama import OllamaBackend
+
+
+@pytest.mark.asyncio
+async def test_backend_reuses_pooled_client():
+    backend = OllamaBackend()
+    client = backend.client
+    assert backend.client is client
+    await backend.aclose()
+    assert client.is_closed
+
+
+@pytest.mark.asyncio
+async def test_backend_context_manager_closes_client():
+    async with get_backend("lmstudio", max_connections=2) as backend:
+        client = backend.client
+        assert backend.limits.max_connections == 2
+    assert client.is_closed
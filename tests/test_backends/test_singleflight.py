@@ -0,0 +1,93 @@
+import asyncio
+import pytest
+from flint.backends import get_backend
+from flint.backends.cache import CachedBackend
+from flint.backends.singleflight import SingleFlightBackend
+from flint.core.config import config
+
+
+async def gated(backend, prompt, stats=None, **kwargs):
+    """Streams a fixed answer once the backend is released."""
+    yield "answer"
+    await backend.release.wait()
+    yield " to "
+    yield prompt
+    if stats is not None:
+        stats["completion_tokens"] = 3
+
+
+async def collect(backend, prompt, stats=None, **kwargs):
+    stream = backend.stream(prompt, "m", stats=stats, **kwargs)
+    try:
+        return "".join([chunk async for chunk in stream])
+    finally:
+        await stream.aclose()
+
+
+@pytest.mark.asyncio
+async def test_identical_streams_share_one_generation(stub_backend):
+    inner = stub_backend(gated)
+    backend = SingleFlightBackend(inner)
+    stats = [{} for _ in range(3)]
+
+    tasks = [asyncio.ensure_future(collect(backend, "q", s)) for s in stats]
+    await asyncio.sleep(0.01)
+    # A different prompt is its own generation
+    other = asyncio.ensure_future(collect(backend, "other"))
+    await asyncio.sleep(0.01)
+    inner.release.set()
+
+    assert await asyncio.gather(*tasks) == ["answer to q"] * 3
+    assert await other == "answer to other"
+    assert inner.calls == 2
+    assert all(s["completion_tokens"] == 3 for s in stats)
+    assert sum(bool(s.get("shared")) for s in stats) == 2
+    assert backend.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_identical_generate_calls_share_one_generation(stub_backend):
+    inner = stub_backend(gated)
+    backend = SingleFlightBackend(inner)
+    tasks = [asyncio.ensure_future(backend.generate("q", "m")) for _ in range(4)]
+    await asyncio.sleep(0.01)
+    inner.release.set()
+    assert await asyncio.gather(*tasks) == ["answer to q"] * 4
+    assert inner.calls == 1
+
+    # Once finished, the next call generates again
+    assert await backend.generate("q", "m") == "answer to q"
+    assert inner.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_upstream_is_cancelled_only_when_every_caller_left(stub_backend):
+    inner = stub_backend(gated)
+    backend = SingleFlightBackend(inner)
+    first = asyncio.ensure_future(collect(backend, "q"))
+    second = asyncio.ensure_future(collect(backend, "q"))
+    await asyncio.sleep(0.01)
+
+    first.cancel()
+    await asyncio.sleep(0.01)
+    assert inner.closed == 0
+    inner.release.set()
+    assert await second == "answer to q"
+
+    inner.release.clear()
+    third = asyncio.ensure_future(collect(backend, "q"))
+    await asyncio.sleep(0.01)
+    third.cancel()
+    await asyncio.sleep(0.01)
+    assert inner.closed == 2
+    assert backend.in_flight == 0
+
+
+def test_get_backend_coalesces_by_default(tmp_path, monkeypatch):
+    monkeypatch.setitem(config["cache"], "path", str(tmp_path / "responses.db"))
+    monkeypatch.setitem(config["backends"], "single_flight", True)
+    backend = get_backend("ollama", cache=True)
+    assert isinstance(backend, SingleFlightBackend)
+    assert isinstance(backend.backend, CachedBackend)
+    backend.cache.close()
+    assert not isinstance(get_backend("ollama", single_flight=False), SingleFlightBackend)
@@ -0,0 +1,23 @@
+import subprocess
+import sys
+
+BAD_CHUNKING_SCRIPT = (
+    "import sys; sys.argv = ['flint', 'memory', 'index', '.', '--chunking', 'sytnax']\n"
+    "from flint.cli.main import app\n"
+    "try:\n"
+    "    app()\n"
+    "finally:\n"
+    "    print('loaded store:', 'memory.vector_store' in sys.modules)\n"
+)
+
+
+def test_bad_chunking_mode_fails_before_loading_the_store():
+    result = subprocess.run(
+        [sys.executable, "-c", BAD_CHUNKING_SCRIPT],
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert "Unknown chunking mode: sytnax" in result.stdout
+    assert "loaded store: False" in result.stdout
+    assert result.returncode == 1
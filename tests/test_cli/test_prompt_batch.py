@@ -0,0 +1,18 @@
+import pytest
+import typer
+from flint.cli.prompt import _read_records
+
+
+def test_records_are_merged_over_defaults(tmp_path):
+    path = tmp_path / "inputs.jsonl"
+    path.write_text('{"name": "a"}\n\n{"name": "b", "tone": "dry"}\n')
+    records = list(_read_records(str(path), {"tone": "warm"}))
+    assert records == [{"tone": "warm", "name": "a"}, {"tone": "dry", "name": "b"}]
+
+
+@pytest.mark.parametrize("line", ["[1, 2]", '"x"', "{not json"])
+def test_records_that_are_not_objects_name_their_line(tmp_path, line):
+    path = tmp_path / "inputs.jsonl"
+    path.write_text('{"name": "a"}\n' + line + "\n")
+    with pytest.raises(typer.BadParameter, match="line 2"):
+        list(_read_records(str(path), {}))
@@ -0,0 +1,43 @@
+"""
+Startup-time regression checks: `flint --version` must not pay for heavy
+optional dependencies, which are imported by the commands that need them.
+"""
+
+import re
+import subprocess
+import sys
+
+# Cumulative import time of flint.cli.main, as reported by `-X importtime`
+STARTUP_BUDGET_MS = 500
+
+HEAVY_MODULES = ("chromadb", "tiktoken", "pathspec", "rich.syntax", "httpx", "uvicorn", "fastapi")
+
+VERSION_SCRIPT = "import sys; sys.argv = ['flint', '--version']; from flint.cli.main import app; app()"
+
+
+def _run_with_importtime():
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", VERSION_SCRIPT],
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert "Flint version" in result.stdout, result.stderr
+    imports = {}
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$", line)
+        if match:
+            imports[match.group(4)] = int(match.group(2))
+    return imports
+
+
+def test_version_does_not_import_heavy_dependencies():
+    imports = _run_with_importtime()
+    loaded = [name for name in imports if name.split(".")[0] in HEAVY_MODULES or name in HEAVY_MODULES]
+    assert loaded == []
+
+
+def test_version_stays_within_startup_budget():
+    # Best of three to keep a noisy machine from failing the check
+    cumulative_us = min(_run_with_importtime()["flint.cli.main"] for _ in range(3))
+    assert cumulative_us / 1000 < STARTUP_BUDGET_MS
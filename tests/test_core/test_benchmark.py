@@ -0,0 +1,37 @@
+import pytest
+from flint.core.benchmark import percentile, run_benchmark, write_results
+
+
+async def counted(backend, prompt, system=None, stats=None):
+    for token in ["a", "b", "c"]:
+        yield token
+    if stats is not None:
+        stats["completion_tokens"] = 3
+        stats["eval_duration"] = 0.5
+
+
+def test_percentile_interpolates():
+    assert percentile([1, 2, 3, 4], 50) == 2.5
+    assert percentile([5], 99) == 5
+    assert percentile([], 50) is None
+
+
+@pytest.mark.asyncio
+async def test_run_benchmark_uses_backend_token_counts(tmp_path, stub_backend):
+    rows = await run_benchmark(
+        stub_backend(stream=counted),
+        "stub",
+        "hi",
+        repetitions=4,
+        warmup=1,
+        concurrency_levels=[1, 2],
+    )
+    assert [r["concurrency"] for r in rows] == [1, 2]
+    assert rows[0]["requests"] == 4
+    assert rows[0]["token_source"] == "backend"
+    assert rows[0]["tokens_per_sec"] == pytest.approx(6.0)
+    assert rows[0]["ttft_p50"] is not None
+
+    out = tmp_path / "bench.csv"
+    write_results(rows, str(out))
+    assert out.read_text().startswith("model,concurrency")
@@ -0,0 +1,92 @@
+import asyncio
+import pytest
+from flint.core.cancellation import GenerationMetrics, generation_metrics, run_cancellable
+
+
+async def endless(backend, prompt, **kwargs):
+    """Streams tokens forever until the consumer goes away."""
+    while True:
+        yield "tok"
+        await asyncio.sleep(0)
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    generation_metrics.reset()
+    yield
+    generation_metrics.reset()
+
+
+def test_tokens_saved_estimate():
+    metrics = GenerationMetrics()
+    assert metrics.record_cancelled("m", 5) == 0  # nothing to compare against yet
+    metrics.record_completed("m", 100)
+    assert metrics.record_cancelled("m", 30) == 70
+    assert metrics.record_cancelled("other", 30, max_tokens=50) == 20
+    assert metrics.snapshot() == {
+        "completed": 1,
+        "cancelled": 3,
+        "cancelled_tokens": 65,
+        "tokens_saved": 90,
+    }
+
+
+@pytest.mark.asyncio
+async def test_cancelling_stream_closes_backend_stream(stub_backend):
+    backend = stub_backend(endless)
+    stats = {}
+
+    async def consume():
+        stream = backend.stream("hi", "m", stats=stats, max_tokens=100)
+        try:
+            async for _ in stream:
+                if stats["chunks"] >= 10:
+                    await asyncio.sleep(10)
+        finally:
+            await stream.aclose()
+
+    task = asyncio.ensure_future(consume())
+    while stats.get("chunks", 0) < 10:
+        await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert backend.closed
+    assert stats["cancelled"] is True
+    assert stats["tokens_saved"] == 90
+    assert generation_metrics.snapshot()["cancelled"] == 1
+
+
+@pytest.mark.asyncio
+async def test_abandoned_stream_counts_as_cancelled(stub_backend):
+    backend = stub_backend(endless)
+    stats = {}
+    stream = backend.stream("hi", "m", stats=stats)
+    async for _ in stream:
+        break
+    await stream.aclose()
+
+    assert backend.closed
+    assert stats["cancelled"] is True
+
+
+@pytest.mark.asyncio
+async def test_run_cancellable():
+    async def answer():
+        return 42
+
+    assert await run_cancellable(answer()) == (True, 42)
+
+    async def forever():
+        await asyncio.sleep(10)
+
+    async def interrupt():
+        await asyncio.sleep(0)
+        # What the SIGINT handler does
+        for task in asyncio.all_tasks():
+            if task.get_coro().__name__ == "forever":
+                task.cancel()
+
+    asyncio.ensure_future(interrupt())
+    assert await run_cancellable(forever()) == (False, None)
@@ -0,0 +1,282 @@
+import asyncio
+import httpx
+import pytest
+from flint.core.chain import Chain, incremental
+from flint.core.model import Model
+from flint.core.prompt import Prompt
+
+
+class RecordingBackend:
+    """Answers after a short delay, tracking how many calls overlap."""
+
+    name = "stub"
+
+    def __init__(self):
+        self.prompts = []
+        self.running = 0
+        self.peak = 0
+        self.closed = False
+
+    async def generate(self, prompt, model_name, **kwargs):
+        self.prompts.append(prompt)
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        return f"<{prompt}>"
+
+    async def aclose(self):
+        self.closed = True
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    backend = RecordingBackend()
+    monkeypatch.setattr("flint.backends.get_backend", lambda name: backend)
+    return backend
+
+
+@pytest.mark.asyncio
+async def test_linear_chain_is_unchanged(backend):
+    chain = Chain().add(Prompt("Say {word}")).add(Model("m")).add(str.upper)
+    assert await chain.run(word="hi") == "<SAY HI>"
+    assert backend.closed
+
+
+@pytest.mark.asyncio
+async def test_independent_nodes_run_concurrently_then_fan_in(backend):
+    chain = Chain(concurrency=2)
+    for doc in ("a", "b", "c"):
+        chain.node(f"sum_{doc}", Prompt(f"Summarize {{{doc}}}"), Model("m"))
+    chain.add(Prompt("Merge {sum_a} {sum_b} {sum_c}")).add(Model("m"))
+
+    outputs = await chain.run_all(a="A", b="B", c="C")
+    assert outputs["sum_b"] == "<Summarize B>"
+    assert outputs["output"] == "<Merge <Summarize A> <Summarize B> <Summarize C>>"
+    assert backend.peak == 2
+    assert backend.prompts[-1].startswith("Merge")
+
+
+@pytest.mark.asyncio
+async def test_dependencies_are_resolved_from_prompts_and_inputs(backend):
+    chain = Chain()
+    chain.node("final", Prompt("Polish {draft}"), Model("m"))
+    chain.node("draft", Prompt("Write about {topic}"), Model("m"))
+    chain.node("stats", lambda state: {"words": len(state["draft"].split())}, inputs=["draft"])
+
+    assert chain.dependencies() == {"final": ["draft"], "draft": [], "stats": ["draft"]}
+    outputs = await chain.run_all(topic="owls")
+    assert outputs["final"] == "<Polish <Write about owls>>"
+    assert outputs["stats"]["words"] == 3
+    # Without add() steps, run() returns the last node added
+    assert await chain.run(topic="owls") == outputs["stats"]
+
+
+def test_cycles_and_unknown_inputs_are_rejected():
+    chain = Chain()
+    chain.node("a", Prompt("{b}"))
+    chain.node("b", Prompt("{a}"))
+    with pytest.raises(ValueError, match="cycle"):
+        chain._order()
+
+    chain = Chain().node("a", str, inputs=["missing"])
+    with pytest.raises(ValueError, match="unknown node"):
+        chain.dependencies()
+    with pytest.raises(ValueError, match="already"):
+        chain.node("a", str)
+
+
+@pytest.mark.asyncio
+async def test_a_failing_node_cancels_the_rest(backend):
+    started = []
+
+    async def slow(state):
+        started.append("slow")
+        await asyncio.sleep(10)
+
+    def broken(state):
+        raise RuntimeError("boom")
+
+    chain = Chain().node("slow", slow).node("broken", broken)
+    with pytest.raises(RuntimeError, match="boom"):
+        await asyncio.wait_for(chain.run_all(), timeout=1)
+    assert started == ["slow"]
+
+
+class FlakyBackend(RecordingBackend):
+    """Takes longer for longer prompts and fails the first time it sees 'flaky'."""
+
+    def __init__(self):
+        super().__init__()
+        self.failed = set()
+
+    async def generate(self, prompt, model_name, **kwargs):
+        self.prompts.append(prompt)
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(0.001 * len(prompt))
+            if "flaky" in prompt and prompt not in self.failed:
+                self.failed.add(prompt)
+                raise httpx.ConnectError("backend hiccup")
+            return prompt.upper()
+        finally:
+            self.running -= 1
+
+
+@pytest.fixture
+def flaky(monkeypatch):
+    backend = FlakyBackend()
+    created = []
+
+    def get_backend(name):
+        created.append(name)
+        return backend
+
+    monkeypatch.setattr("flint.backends.get_backend", get_backend)
+    backend.created = created
+    return backend
+
+
+def echo_chain():
+    return Chain().add(Prompt("{word}")).add(Model("m"))
+
+
+@pytest.mark.asyncio
+async def test_map_keeps_input_order_and_reuses_backends(flaky):
+    words = ["x" * n for n in (30, 5, 20, 1, 10)]
+    results = await echo_chain().map(({"word": w} for w in words), concurrency=2)
+    assert results == [w.upper() for w in words]
+    assert flaky.peak == 2
+    assert flaky.created == ["ollama"]
+    assert flaky.closed
+
+
+@pytest.mark.asyncio
+async def test_stream_map_yields_as_completed_from_async_iterables(flaky):
+    async def inputs():
+        for n in (40, 1, 20):
+            yield {"word": "y" * n}
+
+    stream = echo_chain().stream_map(inputs(), concurrency=3, ordered=False)
+    indexes = [index async for index, _ in stream]
+    assert indexes == [1, 2, 0]
+
+
+@pytest.mark.asyncio
+async def test_stream_map_retries_and_reports_failures(flaky):
+    chain = echo_chain()
+    assert await chain.map([{"word": "flaky one"}], retries=1, retry_delay=0) == ["FLAKY ONE"]
+
+    results = await chain.map(
+        [{"word": "ok"}, {"word": "flaky two"}, {}],
+        retries=0,
+        return_exceptions=True,
+    )
+    assert results[0] == "OK"
+    assert isinstance(results[1], httpx.ConnectError)
+    assert isinstance(results[2], ValueError)  # missing prompt variable
+
+    with pytest.raises(httpx.ConnectError):
+        await chain.map([{"word": "flaky three"}])
+
+
+@pytest.mark.asyncio
+async def test_stream_map_fails_fast_on_errors_retrying_cannot_fix(flaky):
+    chain = echo_chain()
+    # A missing prompt variable would fail again: no retries, no backoff sleeps
+    results = await asyncio.wait_for(
+        chain.map([{}], retries=2, return_exceptions=True), timeout=0.5
+    )
+    assert isinstance(results[0], ValueError)
+
+    # retry_on decides what counts as transient
+    flaky.prompts.clear()
+    results = await chain.map(
+        [{"word": "flaky four"}],
+        retries=2,
+        retry_delay=0,
+        retry_on=lambda e: False,
+        return_exceptions=True,
+    )
+    assert isinstance(results[0], httpx.ConnectError)
+    assert flaky.prompts == ["flaky four"]
+
+
+@pytest.mark.asyncio
+async def test_checkpoint_resumes_an_interrupted_run(flaky, tmp_path):
+    checkpoint = str(tmp_path / "results.jsonl")
+    inputs = [{"word": w} for w in ("a", "b", "flaky c", "d")]
+
+    with pytest.raises(httpx.ConnectError):
+        await echo_chain().map(inputs, concurrency=1, checkpoint=checkpoint)
+    assert flaky.prompts[:3] == ["a", "b", "flaky c"]
+
+    flaky.prompts.clear()
+    results = await echo_chain().map(inputs, concurrency=1, checkpoint=checkpoint)
+    assert results == ["A", "B", "FLAKY C", "D"]
+    assert flaky.prompts == ["flaky c", "d"]
+
+
+async def lines_of_words(backend, prompt, **kwargs):
+    """Streams one line per word, pausing after the first until released."""
+    yield "first\n"
+    await backend.release.wait()
+    for word in prompt.split():
+        yield f"{word}\n"
+
+
+@pytest.fixture
+def streaming(monkeypatch, stub_backend):
+    backend = stub_backend(lines_of_words)
+    monkeypatch.setattr("flint.backends.get_backend", lambda name: backend)
+    return backend
+
+
+@incremental
+async def lines(chunks):
+    buffer = ""
+    async for chunk in chunks:
+        buffer += chunk
+        *done, buffer = buffer.split("\n")
+        for line in done:
+            yield line.upper()
+    if buffer:
+        yield buffer.upper()
+
+
+@pytest.mark.asyncio
+async def test_run_stream_yields_tokens_before_generation_completes(streaming):
+    chain = Chain().add(Prompt("{a} {b}")).add(Model("m")).add(lines)
+    stream = chain.run_stream(a="x", b="y")
+    # The parser sees the first line while the model is still generating
+    assert await stream.__anext__() == "FIRST"
+    assert not streaming.release.is_set()
+    streaming.release.set()
+    assert [item async for item in stream] == ["X", "Y"]
+
+
+@pytest.mark.asyncio
+async def test_non_incremental_steps_end_the_stream(streaming):
+    streaming.release.set()
+    chain = Chain().add(Prompt("{a} {b}")).add(Model("m")).add(lines).add(str.lower)
+    assert [item async for item in chain.run_stream(a="x", b="y")] == ["firstxy"]
+
+    # Without streaming, an incremental step gets the whole text at once
+    assert await chain.run(a="x", b="y") == "firstxy"
+
+
+@pytest.mark.asyncio
+async def test_closing_run_stream_cancels_generation(streaming):
+    stream = Chain().add(Prompt("hi")).add(Model("m")).run_stream()
+    assert await stream.__anext__() == "first\n"
+    await stream.aclose()
+    assert streaming.closed
+
+
+@pytest.mark.asyncio
+async def test_run_stream_without_model_yields_the_result():
+    chain = Chain().add(lambda state: {**state, "n": 1})
+    assert [item async for item in chain.run_stream(x=1)] == [None]
+    chain = Chain().node("sum", lambda state: state["a"] + state["b"])
+    assert [item async for item in chain.run_stream(a=1, b=2)] == [3]
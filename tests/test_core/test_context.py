@@ -0,0 +1,105 @@
+import pytest
+from flint.core import context
+from flint.core.context import ContextBuilder, fit_messages, prompt_budget
+
+
+class WordTokenizer:
+    """One token per space-separated word, so budgets are easy to reason about."""
+
+    def encode(self, text):
+        return text.split(" ") if text else []
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+
+def words(n, word="w"):
+    return " ".join([word] * n)
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    monkeypatch.setattr(context, "_tokenizer", WordTokenizer())
+    monkeypatch.setattr(context, "_windows", {})
+
+
+def test_sections_are_packed_by_priority_and_kept_in_order():
+    builder = ContextBuilder(budget=10, separator=" ")
+    builder.add("low", words(5, "low"), priority=1)
+    builder.add("high", words(5, "high"), priority=5)
+    builder.add("ask", "question", required=True)
+
+    prompt, report = builder.build()
+    assert prompt == f"{words(5, 'high')} question"
+    assert report.cuts == [{"name": "low", "action": "dropped", "tokens": 5, "kept": 0}]
+    assert report.describe() == ["low: dropped (5 tokens)"]
+    assert not report.over_budget
+
+
+def test_overflow_is_summarized_or_truncated():
+    builder = ContextBuilder(budget=100, separator=" ")
+    builder.add("ask", "question", required=True)
+    builder.add("a.py", words(80, "a"), priority=2, truncate=True)
+    builder.add("b.py", words(50, "b"), priority=1, summary="b.py: 50 lines changed")
+
+    packed, report = builder.pack()
+    names = [name for name, _ in packed]
+    assert names == ["ask", "a.py", "b.py"]
+    assert dict(packed)["b.py"] == "b.py: 50 lines changed"
+    assert [c["action"] for c in report.cuts] == ["summarized"]
+
+    builder = ContextBuilder(budget=100, separator=" ")
+    builder.add("ask", "question", required=True)
+    builder.add("big.py", words(500, "x"), truncate=True)
+    packed, report = builder.pack()
+    assert dict(packed)["big.py"].endswith("[truncated to fit the context window]")
+    assert report.cuts[0]["action"] == "truncated"
+    assert report.used <= report.budget
+
+
+def test_required_sections_are_never_cut():
+    builder = ContextBuilder(budget=3)
+    builder.add("file", words(10), required=True)
+    prompt, report = builder.build()
+    assert prompt == words(10)
+    assert report.over_budget
+
+
+def test_fit_messages_drops_oldest_turns_but_keeps_system_and_latest():
+    messages = [
+        {"role": "system", "content": "sys"},
+        {"role": "user", "content": words(20)},
+        {"role": "assistant", "content": words(20)},
+        {"role": "user", "content": "latest"},
+    ]
+    assert fit_messages(messages, budget=1000) == (messages, 0)
+
+    kept, dropped = fit_messages(messages, budget=40)
+    assert dropped == 1
+    assert [m["content"] for m in kept] == ["sys", words(20), "latest"]
+
+
+class WindowBackend:
+    name = "stub"
+    base_url = "http://stub"
+
+    def __init__(self, length):
+        self.length = length
+        self.calls = 0
+
+    async def context_length(self, model_name):
+        self.calls += 1
+        return self.length
+
+
+@pytest.mark.asyncio
+async def test_budget_comes_from_cached_model_metadata():
+    backend = WindowBackend(32768)
+    assert await prompt_budget(backend, "m") == 32768 - context.DEFAULT_RESERVE
+    assert await prompt_budget(backend, "m") == 32768 - context.DEFAULT_RESERVE
+    assert backend.calls == 1
+
+    unknown = WindowBackend(None)
+    unknown.base_url = "http://offline"
+    window = context.DEFAULT_CONTEXT_WINDOW
+    assert await prompt_budget(unknown, "m") == window - window // 4
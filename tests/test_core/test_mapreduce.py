@@ -0,0 +1,113 @@
+import asyncio
+import pytest
+from flint.core import context
+from flint.core.diff import chunk_key, diff_chunks, split_files, split_hunks
+from flint.backends.cache import ResponseCache
+from flint.core.mapreduce import map_chunks
+
+DIFF = """diff --git a/a.py b/a.py
+--- a/a.py
++++ b/a.py
+@@ -1,2 +1,2 @@
+-old one
++new one
+@@ -10,2 +10,2 @@
+-old two
++new two
+diff --git a/b.py b/b.py
+--- a/b.py
++++ b/b.py
+@@ -1 +1 @@
+-x
++y
+"""
+
+
+class WordTokenizer:
+    def encode(self, text):
+        return text.split() if text else []
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    monkeypatch.setattr(context, "_tokenizer", WordTokenizer())
+
+
+def test_diff_is_split_per_file_then_per_hunk():
+    assert [path for path, _ in split_files(DIFF)] == ["a.py", "b.py"]
+    header, hunks = split_hunks(split_files(DIFF)[0][1])
+    assert header.endswith("+++ b/a.py")
+    assert len(hunks) == 2
+
+    assert [c["path"] for c in diff_chunks(DIFF, max_tokens=100)] == ["a.py", "b.py"]
+
+    chunks = diff_chunks(DIFF, max_tokens=20)
+    assert [c["path"] for c in chunks] == ["a.py", "a.py", "b.py"]
+    assert all(c["text"].startswith("diff --git") for c in chunks)
+    assert "new two" in chunks[1]["text"] and "new one" not in chunks[1]["text"]
+
+
+def test_chunk_key_ignores_shifted_line_numbers():
+    hunk = "@@ -10,2 +10,2 @@\n-old two\n+new two"
+    assert chunk_key(hunk) == chunk_key(hunk.replace("10", "42"))
+    assert chunk_key(hunk) != chunk_key(hunk.replace("new", "newer"))
+
+
+class CountingBackend:
+    name = "stub"
+
+    def __init__(self):
+        self.prompts = []
+        self.running = 0
+        self.peak = 0
+
+    async def generate(self, prompt, model_name, system=None, **kwargs):
+        self.prompts.append(prompt)
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        return f"summary of {prompt.split()[-1]}"
+
+
+def make_prompt(chunk):
+    return f"Summarize {chunk['text']}"
+
+
+@pytest.mark.asyncio
+async def test_map_chunks_limits_concurrency_and_keeps_order():
+    backend = CountingBackend()
+    chunks = [{"path": "f", "text": str(i), "key": str(i)} for i in range(8)]
+    results = await map_chunks(backend, "m", chunks, make_prompt, concurrency=2)
+    assert results == [f"summary of {i}" for i in range(8)]
+    assert backend.peak == 2
+
+
+@pytest.mark.asyncio
+async def test_cached_chunks_are_not_sent_again(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"), ttl=0)
+    backend = CountingBackend()
+    seen = []
+    chunks = [{"path": "f", "text": t, "key": chunk_key(t)} for t in ("a", "b")]
+    await map_chunks(backend, "m", chunks, make_prompt, cache=cache)
+
+    chunks[1] = {"path": "f", "text": "c", "key": chunk_key("c")}
+    results = await map_chunks(
+        backend,
+        "m",
+        chunks,
+        make_prompt,
+        cache=cache,
+        on_result=lambda chunk, cached: seen.append((chunk["text"], cached)),
+    )
+    assert results == ["summary of a", "summary of c"]
+    assert len(backend.prompts) == 3
+    assert sorted(seen) == [("a", True), ("c", False)]
+
+    # Another model or instruction does not reuse the result
+    await map_chunks(backend, "other", chunks[:1], make_prompt, cache=cache)
+    assert len(backend.prompts) == 4
+    cache.close()
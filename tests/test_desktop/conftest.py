@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The desktop app is run from `desktop/` and imports itself as the `app` package
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "desktop"))
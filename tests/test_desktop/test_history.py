@@ -0,0 +1,213 @@
+import pytest
+
+from app.history import Attachment, HistoryStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(tmp_path / "history.db")
+    yield store
+    store.close()
+
+
+def test_messages_are_written_behind_and_read_back_in_order(store):
+    session_id = store.create_session("First")
+    for i in range(500):
+        store.add_message(session_id, "user", f"message {i}")
+
+    messages = store.get_messages(session_id)
+    assert len(messages) == 500
+    assert messages[0]["content"] == "message 0"
+
+    recent = store.get_messages(session_id, limit=3)
+    assert [m["content"] for m in recent] == [
+        "message 497",
+        "message 498",
+        "message 499",
+    ]
+
+
+def test_deleting_a_session_cascades_to_its_messages(store):
+    keep = store.create_session("Keep")
+    drop = store.create_session("Drop")
+    store.add_message(keep, "user", "hello")
+    store.add_message(drop, "user", "bye")
+    store.rename_session(keep, "Kept")
+    store.delete_session(drop)
+
+    assert [s["title"] for s in store.get_sessions()] == ["Kept"]
+    assert store.get_messages(drop) == []
+    assert [m["content"] for m in store.get_messages(keep)] == ["hello"]
+
+
+def test_session_page_uses_index(store):
+    plan = store._conn.execute(
+        "EXPLAIN QUERY PLAN SELECT id, role, content FROM messages "
+        "WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+        (1, 50),
+    ).fetchall()
+    assert any("idx_messages_session" in row[-1] for row in plan)
+
+
+def test_close_commits_pending_writes(tmp_path):
+    store = HistoryStore(tmp_path / "history.db")
+    session_id = store.create_session()
+    store.add_message(session_id, "assistant", "saved on exit")
+    store.close()
+
+    reopened = HistoryStore(tmp_path / "history.db")
+    assert reopened.get_messages(session_id)[0]["content"] == "saved on exit"
+    reopened.close()
+
+
+def test_keyset_pages_walk_back_through_a_session(store):
+    session_id = store.create_session()
+    for i in range(120):
+        store.add_message(session_id, "user", f"message {i}")
+
+    pages = []
+    before_id = None
+    while True:
+        page = store.get_messages(session_id, limit=50, before_id=before_id)
+        if not page:
+            break
+        pages.append([m["content"] for m in page])
+        before_id = page[0]["id"]
+
+    assert [len(p) for p in pages] == [50, 50, 20]
+    assert pages[0][-1] == "message 119"
+    assert pages[-1][0] == "message 0"
+
+
+def test_sessions_page_newest_first(store):
+    ids = [store.create_session(f"chat {i}") for i in range(5)]
+    first = store.get_sessions(limit=2)
+    assert [s["id"] for s in first] == [ids[4], ids[3]]
+    rest = store.get_sessions(limit=10, before_id=first[-1]["id"])
+    assert [s["id"] for s in rest] == [ids[2], ids[1], ids[0]]
+
+
+def test_attachments_are_stored_once_and_prompt_is_rebuilt(store):
+    session_id = store.create_session()
+    source = "def main():\n    pass\n" * 1000
+    parts = [
+        "--- BEGIN FILE: main.py ---\n",
+        Attachment(source),
+        "\n--- END FILE ---\n",
+        "Explain",
+    ]
+    store.add_message(session_id, "user", "Explain", prompt=parts)
+    store.add_message(session_id, "user", "Again", prompt=parts[:3] + ["Again"])
+
+    first, second = store.get_messages(session_id)
+    assert first["content"] == "Explain"
+    assert store.get_prompt(first["id"]) == "".join(parts)
+    assert store.get_prompt(second["id"]).endswith(source + "\n--- END FILE ---\nAgain")
+
+    size, stored = store._conn.execute(
+        "SELECT COUNT(*), SUM(LENGTH(content)) FROM blobs"
+    ).fetchone()
+    assert size == 1
+    assert stored < len(source) // 10
+
+
+def test_prompt_defaults_to_content(store):
+    session_id = store.create_session()
+    store.add_message(session_id, "assistant", "plain answer")
+    message_id = store.get_messages(session_id)[0]["id"]
+    assert store.get_prompt(message_id) == "plain answer"
+
+
+def test_deleting_sessions_drops_unreferenced_blobs(store):
+    keep = store.create_session()
+    drop = store.create_session()
+    shared, only_dropped = Attachment("shared file"), Attachment("dropped file")
+    store.add_message(keep, "user", "a", prompt=[shared])
+    store.add_message(drop, "user", "b", prompt=[shared, only_dropped])
+    store.delete_session(drop)
+    store.flush()
+
+    hashes = {row[0] for row in store._conn.execute("SELECT hash FROM blobs")}
+    assert hashes == {shared.hash}
+
+
+def test_existing_database_gains_prompt_column(tmp_path):
+    import sqlite3
+
+    path = tmp_path / "old.db"
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE sessions (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT, created_at TIMESTAMP)"
+    )
+    conn.execute(
+        "CREATE TABLE messages (id INTEGER PRIMARY KEY AUTOINCREMENT, session_id INTEGER, "
+        "role TEXT, content TEXT, created_at TIMESTAMP)"
+    )
+    conn.execute("INSERT INTO sessions (title) VALUES ('old')")
+    conn.execute(
+        "INSERT INTO messages (session_id, role, content) VALUES (1, 'user', 'full old prompt')"
+    )
+    conn.commit()
+    conn.close()
+
+    store = HistoryStore(path)
+    assert store.get_prompt(1) == "full old prompt"
+    store.close()
+
+
+def test_conversation_holds_the_exact_prompts(store):
+    session_id = store.create_session()
+    store.add_message(
+        session_id,
+        "user",
+        "Explain",
+        prompt=["File:\n", Attachment("x = 1"), "\nExplain"],
+    )
+    store.add_message(session_id, "assistant", "It sets x.")
+    assert store.get_conversation(session_id) == [
+        {"role": "user", "content": "File:\nx = 1\nExplain"},
+        {"role": "assistant", "content": "It sets x."},
+    ]
+
+
+def test_a_failed_write_does_not_lose_the_rest_of_its_batch(tmp_path):
+    errors = []
+    store = HistoryStore(tmp_path / "history.db", on_error=errors.append)
+    session = store.create_session()
+    # Held so every message lands in the same batch
+    with store._lock:
+        store.add_message(session, "user", "before")
+        store.add_message(
+            999, "assistant", "reply for a deleted session", prompt=[Attachment("file")]
+        )
+        store.add_message(session, "assistant", "after")
+    store.flush()
+
+    assert [m["content"] for m in store.get_messages(session)] == ["before", "after"]
+    assert len(errors) == 1 and "FOREIGN KEY" in errors[0]
+    # The failed message's attachment was rolled back with it
+    assert store._conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0] == 0
+    store.close()
+
+
+def test_existing_prompts_are_indexed_for_blob_cleanup_once(tmp_path):
+    path = tmp_path / "history.db"
+    store = HistoryStore(path)
+    session = store.create_session()
+    store.add_message(session, "user", "a", prompt=[Attachment("old file")])
+    store.close()
+    # A database from before message_blobs existed
+    import sqlite3
+
+    conn = sqlite3.connect(path)
+    conn.execute("DELETE FROM message_blobs")
+    conn.execute("PRAGMA user_version = 0")
+    conn.commit()
+    conn.close()
+
+    store = HistoryStore(path)
+    assert store._conn.execute("PRAGMA user_version").fetchone()[0] == 1
+    store.delete_session(session)
+    store.flush()
+    assert store._conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0] == 0
+    store.close()
@@ -0,0 +1,57 @@
+from app.render import RenderCache, closed_prefix, style_html
+
+
+def test_closed_prefix_stops_at_last_finished_block():
+    text = "First paragraph.\n\nSecond one still strea"
+    assert text[: closed_prefix(text)] == "First paragraph.\n\n"
+
+
+def test_closed_prefix_waits_for_code_fence_to_close():
+    open_fence = "Intro\n\n```python\ndef f():\n\n    return 1\n"
+    assert open_fence[: closed_prefix(open_fence)] == "Intro\n\n"
+
+    closed = open_fence + "```\nAfter"
+    assert closed[: closed_prefix(closed)] == open_fence + "```\n"
+
+
+def test_style_html_styles_pre_and_code_in_one_pass():
+    html = style_html("<pre><code>x = 1</code></pre><p><code>y</code></p>")
+    assert html.count('<code style="') == 2
+    assert html.startswith('<pre style="background-color: #0f172a;')
+
+
+def test_render_cache_evicts_least_recently_used():
+    cache = RenderCache(max_entries=2)
+    a, b, c = (RenderCache.key(t) for t in ("a", "b", "c"))
+    cache.put(a, "<p>a</p>")
+    cache.put(b, "<p>b</p>")
+    assert cache.get(a) == "<p>a</p>"
+    cache.put(c, "<p>c</p>")
+
+    assert cache.get(b) is None
+    assert cache.get(a) == "<p>a</p>"
+    assert cache.get(c) == "<p>c</p>"
+
+
+def stream_blocks(text, step=3):
+    """Cut ``text`` into blocks the way the chat view does while it streams."""
+    blocks, tail = [], ""
+    for i in range(0, len(text), step):
+        tail += text[i : i + step]
+        cut = closed_prefix(tail)
+        if cut:
+            blocks.append(tail[:cut])
+            tail = tail[cut:]
+    return blocks + [tail]
+
+
+def test_loose_lists_stay_in_one_block_while_streaming():
+    text = "Steps:\n\n1. Install it\n\n2. Configure it\n\n3. Run it\n\nDone."
+    assert stream_blocks(text) == [
+        "Steps:\n\n",
+        "1. Install it\n\n2. Configure it\n\n3. Run it\n\n",
+        "Done.",
+    ]
+
+    nested = "- item\n\n    continued\n\n  ```\n  code\n\n  ```\n\n- next\n\nAfter"
+    assert stream_blocks(nested) == [nested[: -len("After")], "After"]
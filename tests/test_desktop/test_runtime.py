@@ -0,0 +1,105 @@
+import asyncio
+import concurrent.futures
+import threading
+
+import pytest
+
+from app.runtime import AsyncRuntime
+
+
+@pytest.fixture
+def runtime():
+    runtime = AsyncRuntime()
+    yield runtime
+    runtime.shutdown()
+
+
+def test_coroutines_share_one_loop_thread(runtime):
+    async def thread_name():
+        return threading.current_thread().name
+
+    names = {runtime.submit(thread_name()).result(timeout=5) for _ in range(3)}
+    assert names == {"flint-async"}
+
+
+def test_backends_are_cached_per_name(runtime):
+    assert runtime.backend("ollama") is runtime.backend("ollama")
+    assert [b.name for b in runtime.backends()] == ["ollama", "lmstudio", "llamacpp"]
+
+
+def test_submitted_work_can_be_cancelled(runtime):
+    started = threading.Event()
+    cancelled = threading.Event()
+
+    async def long_running():
+        started.set()
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    future = runtime.submit(long_running())
+    assert started.wait(5)
+    future.cancel()
+    assert cancelled.wait(5)
+    with pytest.raises(concurrent.futures.CancelledError):
+        future.result(timeout=5)
+
+
+def test_run_blocking_keeps_the_loop_free(runtime):
+    release = threading.Event()
+
+    async def blocked_and_free():
+        blocked = runtime.run_blocking(release.wait, 5)
+        await asyncio.sleep(0)
+        # The loop still runs other work while the blocking call waits
+        release.set()
+        return await blocked
+
+    assert runtime.submit(blocked_and_free()).result(timeout=5) is True
+
+
+def test_shared_objects_are_built_once(runtime):
+    built = []
+    release = threading.Event()
+
+    class Store:
+        closed = False
+
+        def __init__(self):
+            release.wait(5)
+            built.append(self)
+
+        def close(self):
+            self.closed = True
+
+    async def two_callers():
+        first = runtime.shared("memory", Store)
+        second = runtime.shared("memory", Store)
+        release.set()
+        return await first, await second
+
+    first, second = runtime.submit(two_callers()).result(timeout=5)
+    assert first is second
+    assert len(built) == 1
+
+    runtime.shutdown()
+    assert first.closed
+
+
+def test_failed_shared_build_is_retried(runtime):
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise OSError("database locked")
+        return "store"
+
+    async def get():
+        return await runtime.shared("memory", factory)
+
+    with pytest.raises(OSError):
+        runtime.submit(get()).result(timeout=5)
+    assert runtime.submit(get()).result(timeout=5) == "store"
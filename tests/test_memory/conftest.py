@@ -0,0 +1,74 @@
+import pytest
+from memory import vector_store
+
+
+class FakeTokenizer:
+    """Character-level stand-in for tiktoken, which needs a network download."""
+
+    def encode(self, text):
+        return [ord(c) for c in text]
+
+    def decode(self, tokens):
+        return "".join(chr(t) for t in tokens)
+
+
+class FakeCollection:
+    def __init__(self):
+        self.records = {}
+
+    def count(self):
+        return len(self.records)
+
+    def upsert(self, documents, metadatas, ids):
+        for doc, meta, id_ in zip(documents, metadatas, ids):
+            self.records[id_] = (doc, meta)
+
+    def query(self, query_texts, n_results):
+        # Rank by shared words, a crude stand-in for embedding similarity
+        words = set(query_texts[0].lower().split())
+        ranked = sorted(
+            self.records.items(),
+            key=lambda item: len(words & set(item[1][0].lower().split())),
+            reverse=True,
+        )[:n_results]
+        return {
+            "ids": [[id_ for id_, _ in ranked]],
+            "documents": [[doc for _, (doc, _) in ranked]],
+            "metadatas": [[meta for _, (_, meta) in ranked]],
+        }
+
+    def delete(self, ids=None, where=None):
+        for id_ in list(ids or []):
+            self.records.pop(id_, None)
+        if where:
+            for id_, (_, meta) in list(self.records.items()):
+                if all(meta.get(k) == v for k, v in where.items()):
+                    del self.records[id_]
+
+
+class FakeClient:
+    def __init__(self, path):
+        self.collections = {}
+
+    def get_or_create_collection(self, name):
+        return self.collections.setdefault(name, FakeCollection())
+
+
+class FakeChroma:
+    PersistentClient = FakeClient
+
+
+class FakeTiktoken:
+    @staticmethod
+    def get_encoding(name):
+        return FakeTokenizer()
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_store, "chromadb", FakeChroma)
+    monkeypatch.setattr(vector_store, "tiktoken", FakeTiktoken)
+    store = vector_store.VectorStore(db_path=str(tmp_path / "db"))
+    # Chunk in-process: worker processes would load the real tokenizer
+    store.workers = 1
+    return store
@@ -0,0 +1,50 @@
+from memory.chunkers import chunk_blocks, chunk_python, get_chunker, register_chunker
+from conftest import FakeTokenizer
+
+SOURCE = '''import os
+
+
+def helper(x):
+    return x + 1
+
+
+class Service:
+    name = "svc"
+
+    @staticmethod
+    def run():
+        return helper(1)
+'''
+
+
+def test_python_chunks_follow_definitions():
+    chunks = chunk_python(SOURCE, FakeTokenizer(), 500)
+    by_symbol = {c["symbol"]: c for c in chunks}
+    assert by_symbol["helper"]["text"].startswith("def helper")
+    assert (by_symbol["helper"]["start_line"], by_symbol["helper"]["end_line"]) == (4, 5)
+    assert by_symbol["Service"]["end_line"] == 13
+
+
+def test_oversized_class_is_split_at_methods():
+    chunks = chunk_python(SOURCE, FakeTokenizer(), 60)
+    symbols = [c["symbol"] for c in chunks]
+    assert "Service.run" in symbols
+    assert all(len(c["text"]) <= 60 for c in chunks)
+
+
+def test_invalid_python_and_unknown_extensions_fall_back_to_blocks():
+    assert chunk_python("def broken(:\n", FakeTokenizer(), 500)[0]["symbol"] == ""
+    assert get_chunker("notes.md") is chunk_blocks
+
+    @register_chunker(".fake")
+    def fake_chunker(text, tokenizer, chunk_size):
+        return [{"text": text}]
+
+    assert get_chunker("x.FAKE") is fake_chunker
+
+
+def test_blocks_pack_paragraphs_without_overlap():
+    text = "a" * 30 + "\n\n" + "b" * 30 + "\n\n" + "c" * 30 + "\n"
+    chunks = chunk_blocks(text, FakeTokenizer(), 70)
+    assert "".join(c["text"] for c in chunks) == text
+    assert [(c["start_line"], c["end_line"]) for c in chunks] == [(1, 4), (5, 5)]
@@ -0,0 +1,136 @@
+import pytest
+from memory.manifest import FileManifest
+
+
+def test_unchanged_files_are_skipped(store, tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "a.py").write_text("print('a')\n")
+    (repo / "b.py").write_text("print('b')\n")
+
+    store.index_directory(str(repo))
+    assert store.collection.count() == 2
+
+    calls = []
+    store.chunk_file = lambda path, text: calls.append(text) or [{"text": text}]
+    store.index_directory(str(repo))
+    assert calls == []
+
+
+def test_shrunken_and_deleted_files_lose_stale_chunks(store, tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "big.py").write_text("x" * 1200)
+    (repo / "gone.py").write_text("y")
+    store.index_directory(str(repo))
+    assert "big.py_2" in store.collection.records
+
+    (repo / "big.py").write_text("x = 1\n")
+    (repo / "gone.py").unlink()
+    store.index_directory(str(repo))
+
+    assert sorted(store.collection.records) == ["big.py_0"]
+    manifest = FileManifest(store.manifest_path, root=str(repo.resolve()))
+    assert manifest.paths() == ["big.py"]
+
+
+def test_pipeline_streams_batches_and_reports_progress(store, tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    for i in range(20):
+        (repo / f"m{i}.py").write_text(f"value = {i}\n" * 60)
+    store.max_pending = 3
+    store.batch_size = 7
+    upserts = []
+    original_upsert = store.collection.upsert
+    store.collection.upsert = lambda **kw: upserts.append(len(kw["ids"])) or original_upsert(**kw)
+    progress = []
+
+    store.index_directory(str(repo), on_progress=progress.append)
+
+    assert store.collection.count() == 40
+    assert max(upserts) <= 7
+    assert progress[-1]["files"] == 20 and progress[-1]["chunks"] == 40
+
+
+def test_interrupted_run_resumes_from_last_committed_batch(store, tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    for i in range(6):
+        (repo / f"m{i}.py").write_text(f"value = {i}\n")
+    store.batch_size = 2
+    store.max_pending = 1
+    original_upsert = store.collection.upsert
+    calls = []
+
+    def flaky_upsert(**kw):
+        calls.append(kw["ids"])
+        if len(calls) == 2:
+            raise KeyboardInterrupt
+        original_upsert(**kw)
+
+    store.collection.upsert = flaky_upsert
+    try:
+        store.index_directory(str(repo))
+    except KeyboardInterrupt:
+        pass
+    store.collection.upsert = original_upsert
+
+    committed = FileManifest(store.manifest_path, root=str(repo.resolve())).paths()
+    assert len(committed) == 2
+
+    chunked = []
+    chunk_file = store.chunk_file
+    store.chunk_file = lambda path, text: chunked.append(text) or chunk_file(path, text)
+    store.index_directory(str(repo))
+    assert len(chunked) == 4
+    assert store.collection.count() == 6
+
+
+def test_chunker_crashes_are_reported_and_retried(store, tmp_path, capsys):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "good.py").write_text("x = 1\n")
+    (repo / "bad.py").write_text("y = 2\n")
+    (repo / "blob.txt").write_bytes(b"\xff\xfe\x00binary")
+    chunk_file = store.chunk_file
+
+    def flaky(path, text):
+        if path == "bad.py":
+            raise ValueError("chunker bug")
+        return chunk_file(path, text)
+
+    store.chunk_file = flaky
+    progress = []
+    store.index_directory(str(repo), on_progress=progress.append)
+
+    assert progress[-1]["failed"] == 1 and progress[-1]["skipped"] == 1
+    assert "bad.py: ValueError: chunker bug" in capsys.readouterr().out
+    assert sorted(store.collection.records) == ["good.py_0"]
+
+    store.chunk_file = chunk_file
+    store.index_directory(str(repo))
+    assert sorted(store.collection.records) == ["bad.py_0", "good.py_0"]
+
+
+def test_failed_deletes_of_removed_files_are_retried(store, tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "keep.py").write_text("x = 1\n")
+    (repo / "gone.py").write_text("y = 2\n")
+    store.index_directory(str(repo))
+    (repo / "gone.py").unlink()
+
+    delete = store._delete
+
+    def failing_delete(ids=None, file=None):
+        raise RuntimeError("collection unavailable")
+
+    store._delete = failing_delete
+    with pytest.raises(RuntimeError):
+        store.index_directory(str(repo))
+    assert "gone.py_0" in store.collection.records
+
+    store._delete = delete
+    store.index_directory(str(repo))
+    assert sorted(store.collection.records) == ["keep.py_0"]
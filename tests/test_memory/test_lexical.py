@@ -0,0 +1,80 @@
+import os
+import sqlite3
+
+import pytest
+
+from memory.lexical import LexicalIndex, tokenize
+
+
+def test_tokenize_splits_identifiers():
+    terms = tokenize("def getUserName(user_id): # in auth.py")
+    assert {"getusername", "get", "user", "name", "user_id", "id", "auth", "py"} <= set(terms)
+    assert "in" not in terms
+
+
+def test_bm25_ranks_exact_identifier_first(tmp_path):
+    index = LexicalIndex(str(tmp_path / "lexical.db"))
+    index.upsert(
+        ["def register(user):\n    save(user)\n", "def login(user):\n    check(user)\n", "# notes about users\n"],
+        [{"file": "auth.py"}, {"file": "session.py"}, {"file": "README.md"}],
+        ["auth.py_0", "session.py_0", "README.md_0"],
+    )
+
+    results = index.search("register() in auth.py", k=2)
+    assert results[0]["id"] == "auth.py_0"
+    assert results[0]["metadata"] == {"file": "auth.py"}
+    assert index.search("nothing matches this") == []
+
+    index.delete(file="auth.py")
+    assert index.count() == 2
+    assert all(r["id"] != "auth.py_0" for r in index.search("register"))
+
+
+def test_index_directory_keeps_lexical_index_in_sync(store, tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "auth.py").write_text("def register(user):\n    return user\n")
+    (repo / "util.py").write_text("def slugify(text):\n    return text\n")
+    store.index_directory(str(repo))
+    assert store.lexical.count() == 2
+
+    (repo / "auth.py").unlink()
+    store.index_directory(str(repo))
+    assert store.search("register", mode="lexical") == []
+    assert store.search("slugify", mode="lexical")[0]["metadata"]["file"] == "util.py"
+
+
+def test_lexical_mode_skips_vector_query(store, tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "auth.py").write_text("def register(user):\n    return user\n")
+    store.index_directory(str(repo))
+
+    def fail(**kwargs):
+        raise AssertionError("lexical search must not query the embedding index")
+
+    store.collection.query = fail
+    assert store.search("register", mode="lexical")[0]["id"] == "auth.py_0"
+
+
+def test_hybrid_fuses_both_rankings(store, tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "auth.py").write_text("def registerUser(name):\n    return name\n")
+    (repo / "notes.md").write_text("how to register a user account\n")
+    (repo / "misc.md").write_text("unrelated text\n")
+    store.index_directory(str(repo))
+
+    results = store.search("register user", k=2, mode="hybrid")
+    assert {r["metadata"]["file"] for r in results} == {"auth.py", "notes.md"}
+    assert results[0]["score"] >= results[1]["score"]
+
+
+def test_index_closes_as_a_context_manager(tmp_path):
+    path = LexicalIndex.store_path(str(tmp_path), "codebase")
+    assert not os.path.exists(path)
+    with LexicalIndex.for_store(str(tmp_path), "codebase") as index:
+        assert index.search("anything") == []
+    assert os.path.exists(path)
+    with pytest.raises(sqlite3.ProgrammingError):
+        index.count()
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import pytest
+from fastapi.testclient import TestClient
+from flint.server import create_app, RequestScheduler, QueueFullError
+
+
+@pytest.fixture
+def client(stub_backend):
+    app = create_app(stub_backend(models=["stub-model"]), default_model="stub-model")
+    with TestClient(app) as c:
+        yield c
+
+
+def test_models_endpoint(client):
+    data = client.get("/v1/models").json()
+    assert data["data"][0]["id"] == "stub-model"
+
+
+def test_chat_completion(client):
+    response = client.post(
+        "/v1/chat/completions", json={"messages": [{"role": "user", "content": "hi"}]}
+    )
+    assert response.status_code == 200
+    assert response.headers["X-Queue-Depth"] == "1"
+    assert response.json()["choices"][0]["message"]["content"] == "echo: hi"
+
+
+def test_chat_completion_stream(client):
+    response = client.post(
+        "/v1/chat/completions",
+        json={"stream": True, "messages": [{"role": "user", "content": "hi"}]},
+    )
+    events = [
+        line[6:] for line in response.text.splitlines() if line.startswith("data: ")
+    ]
+    assert events[-1] == "[DONE]"
+    chunks = [json.loads(e) for e in events[:-1]]
+    text = "".join(c["choices"][0]["delta"].get("content", "") for c in chunks)
+    assert text == "echo: hi"
+    assert chunks[-1]["choices"][0]["finish_reason"] == "stop"
+
+
+def test_completion_rejects_when_queue_full(stub_backend):
+    scheduler = RequestScheduler(max_queue=1)
+    app = create_app(stub_backend(), default_model="stub-model", scheduler=scheduler)
+    scheduler.reserve("stub-model")
+    with TestClient(app) as c:
+        response = c.post("/v1/completions", json={"prompt": "hi"})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+
+
+@pytest.mark.asyncio
+async def test_scheduler_limits_per_model_concurrency():
+    scheduler = RequestScheduler(max_queue=3, max_concurrency_per_model=1)
+    first = scheduler.reserve("a")
+    second = scheduler.reserve("a")
+    async with first:
+        waiter = asyncio.ensure_future(second.__aenter__())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        assert scheduler.active("a") == 1
+    await waiter
+    await second.__aexit__(None, None, None)
+    assert scheduler.depth == 0
+    scheduler.reserve("b")
+    scheduler.reserve("b")
+    scheduler.reserve("b")
+    with pytest.raises(QueueFullError):
+        scheduler.reserve("b")
+
+
+def test_metrics_endpoint_counts_streams(client):
+    before = client.get("/metrics").json()["completed"]
+    client.post(
+        "/v1/chat/completions",
+        json={"stream": True, "messages": [{"role": "user", "content": "hi"}]},
+    )
+    data = client.get("/metrics").json()
+    assert data["completed"] == before + 1
+    assert {"queue_depth", "cancelled", "tokens_saved"} <= data.keys()
+
+
+@pytest.mark.asyncio
+async def test_stream_ticket_is_released_when_the_body_never_starts(stub_backend):
+    scheduler = RequestScheduler()
+    app = create_app(stub_backend(), default_model="stub-model", scheduler=scheduler)
+    body = json.dumps({"stream": True, "prompt": "hi"}).encode()
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.4"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/v1/completions",
+        "raw_path": b"/v1/completions",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json")],
+        "server": ("test", 80),
+        "client": ("test", 1234),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        # The client is gone before the response headers go out
+        raise OSError("connection reset")
+
+    with pytest.raises(Exception):
+        await app(scope, receive, send)
+    assert scheduler.depth == 0
+
+
+def test_chat_completions_send_structured_messages(stub_backend):
+    backend = stub_backend()
+    seen = []
+
+    async def chat(messages, model_name, **kwargs):
+        seen.append(messages)
+        return "ok"
+
+    async def chat_stream(messages, model_name, **kwargs):
+        seen.append(messages)
+        yield "ok"
+
+    backend.chat, backend.chat_stream = chat, chat_stream
+    conversation = [
+        {"role": "system", "content": "Be brief."},
+        {"role": "user", "content": "hi"},
+        {"role": "assistant", "content": "hello"},
+        {"role": "user", "content": "again"},
+    ]
+    with TestClient(create_app(backend, default_model="stub-model")) as c:
+        reply = c.post("/v1/chat/completions", json={"messages": conversation})
+        c.post("/v1/chat/completions", json={"stream": True, "messages": conversation})
+
+    assert reply.json()["choices"][0]["message"]["content"] == "ok"
+    assert seen == [conversation, conversation]